@@ -2,31 +2,81 @@ from abc import ABC, abstractmethod
 import os
 import uuid
 from datetime import datetime
-import random
 import json
-import mysql.connector
 import logging
 from utils.grid_utils import GridUtils
 from utils.db_utils import DatabaseUtils
+from utils.metrics import generation_metrics
+from utils.lexicon_index import LexiconIndex
+from utils.puzzle_scorer import PuzzleScorer
 from base.word import Word
+from base.occupancy_map import OccupancyMap
+from base.beam_search import BeamSearch
 
 
 class BaseCrosswordGenerator(ABC):
     """Classe base astratta per il generatore di cruciverba."""
-    def __init__(self, grid_size=15, cell_size=75, db_config=None, max_attempts=3):
+
+    # Posizionamenti legali per un cruciverba (vedi OccupancyMap.can_place)
+    strict_placement = True
+
+    # Attributi di stato, oltre a griglia e parole, salvati da snapshot()
+    SNAPSHOT_FIELDS = ()
+
+    # Vero se il generatore definisce i passi di next_step usati dalla ricerca a fascio
+    supports_beam = False
+
+    def __init__(self, grid_size=15, cell_size=75, db_config=None, max_attempts=3,
+                 word_list=None, write_output=True):
         """
-        Inizializza il generatore di cruciverba
+        Inizializza il generatore di cruciverba.
+        Se viene passata una word_list (lessico offline) il database non viene interrogato;
+        con write_output=False non viene creata la directory di output.
         """
         self.grid_size = grid_size
         self.cell_size = cell_size
-        self.grid = [['_' for _ in range(grid_size)] for _ in range(grid_size)]
+        self.grid = self.create_grid()
+        self._occupancy = self.create_occupancy()
         self.placed_words = []
+        self.used_word_ids = []
+        # Voci del lessico piazzate (per il punteggio di qualità)
+        self.placed_entries = []
         self.db_config = db_config
         self.max_attempts = max_attempts
+        # Con record_usage=False l'utilizzo viene registrato dopo, da chi consegna il puzzle
+        self.record_usage = True
+        # Registro degli utilizzi condiviso dai generatori di un batch (vedi set_usage_ledger)
+        self.usage_ledger = None
+        self.write_output = write_output
+        self.metrics = generation_metrics
+        self._step_candidates = 0
+
+        # Ricerca: 'first' restituisce il primo cruciverba valido, 'beam' il migliore
+        # trovato entro time_budget secondi (vedi generate_crossword_beam)
+        self.search_mode = 'first'
+        self.beam_width = 8
+        self.beam_expansions = 3
+        self.time_budget = 2.0
+        self.score_weights = None
 
         self.guid = uuid.uuid4()
         self.timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.output_dir = None
+
+        if write_output:
+            self._create_output_dir()
 
+        if word_list is not None:
+            self.word_list = word_list
+        elif db_config:
+            self.word_list = DatabaseUtils.get_word_list_from_db(db_config, grid_size)
+        else:
+            raise ValueError("Database configuration or word list is required.")
+
+    def _create_output_dir(self):
+        """
+        Crea la directory di output e configura il log su file.
+        """
         # Ottieni il percorso assoluto della directory root del progetto
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -53,61 +103,147 @@ class BaseCrosswordGenerator(ABC):
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
 
-        if db_config:
-            self.word_list = DatabaseUtils.get_word_list_from_db(db_config, grid_size)
-        else:
-            raise ValueError("Database configuration is required.")
+    def create_grid(self):
+        """
+        Crea la griglia vuota; le sottoclassi possono usare una rappresentazione diversa.
+        """
+        return [['_' for _ in range(self.grid_size)] for _ in range(self.grid_size)]
+
+    def create_occupancy(self):
+        """
+        Crea la mappa di occupazione vuota associata alla griglia.
+        """
+        return OccupancyMap(self.grid_size)
+
+    @property
+    def occupancy(self):
+        """
+        Mappa di occupazione della griglia, aggiornata da place_word.
+        Dopo una modifica diretta della griglia viene ricostruita alla prima richiesta.
+        """
+        if self._occupancy is None:
+            self._occupancy = OccupancyMap.from_grid(self.grid, self.placed_words)
+        return self._occupancy
+
+    def invalidate_occupancy(self):
+        """
+        Segnala che la griglia è stata modificata senza passare da place_word.
+        """
+        self._occupancy = None
 
     def get_word_list_from_db(self):
-        try:
-            connection = mysql.connector.connect(**self.db_config)
-            cursor = connection.cursor(dictionary=True)
+        """
+        Recupera la lista di parole dal database configurato.
+        """
+        return DatabaseUtils.get_word_list_from_db(self.db_config, self.grid_size)
 
-            query = """
-            SELECT solution, clue, word_pattern, num_words 
-            FROM crossword_entries
-            WHERE LENGTH(solution) <= %s
-            """
-            cursor.execute(query, (self.grid_size,))
-            word_list = cursor.fetchall()
+    @property
+    def lexicon_index(self):
+        """
+        Indice del lessico (condiviso tra i generatori che usano la stessa word_list).
+        """
+        return LexiconIndex.for_word_list(self.word_list)
 
-            cursor.close()
-            connection.close()
+    def set_usage_ledger(self, ledger):
+        """
+        Condivide un UsageLedger: a ogni cruciverba generato registra le parole usate e,
+        con una finestra di esclusione, ne esclude il riuso dai candidati.
+        """
+        self.usage_ledger = ledger
+        ledger.attach(self.lexicon_index)
 
-            logging.info(f"Retrieved {len(word_list)} words from database")
-            return word_list
+    def is_nogood(self, key):
+        """
+        Vero se la query descritta dalla chiave è già fallita con questo lessico.
+        La chiave non deve dipendere dallo stato della griglia; il primo elemento ne indica il tipo.
+        """
+        if key in self.lexicon_index.nogoods:
+            self.metrics.record_nogood_hit(self.get_crossword_type(), self.grid_size, key[0])
+            return True
+        return False
 
-        except mysql.connector.Error as err:
-            logging.error(f"Database error: {err}")
-            raise
+    def add_nogood(self, key):
+        """
+        Registra una query senza soluzione, condivisa tra tentativi e cruciverba del processo.
+        Con parole escluse dal registro degli utilizzi il fallimento può essere temporaneo,
+        quindi non viene registrato.
+        """
+        index = self.lexicon_index
+        if index.available is None:
+            index.nogoods.add(key)
 
     def find_word(self, length_range, pattern=None):
         """
         Cerca una parola dalla lista che soddisfa i criteri specificati.
         """
-        matching_words = [
-            word for word in self.word_list
-            if length_range[0] <= len(word['solution']) <= length_range[1]
-        ]
+        key = ('word', tuple(length_range), pattern)
+        if self.is_nogood(key):
+            return None
+        word, candidates = self.lexicon_index.find_word(length_range, pattern)
+        self.count_candidates(candidates)
+        if word is None:
+            self.add_nogood(key)
+        return word
+
+    def count_candidates(self, count):
+        """
+        Accumula il numero di parole candidate considerate nel passo corrente.
+        """
+        self._step_candidates += count
 
-        if pattern:
-            matching_words = [
-                word for word in matching_words
-                if all(word['solution'][i] == pattern[i]
-                       for i in range(min(len(word['solution']), len(pattern)))
-                       if pattern[i] != '_')
-            ]
+    def run_step(self, step_name, step_func):
+        """
+        Esegue un passo di posizionamento registrandone esito e candidati considerati.
+        """
+        self._step_candidates = 0
+        success = False
+        try:
+            success = bool(step_func())
+            return success
+        finally:
+            crossword_type = self.get_crossword_type()
+            self.metrics.record_step(crossword_type, self.grid_size, step_name, success)
+            self.metrics.record_candidates(crossword_type, self.grid_size, step_name,
+                                           self._step_candidates)
+
+    def record_generation(self, attempts, success):
+        """
+        Registra l'esito della generazione, i tentativi usati e la densità della griglia.
+        """
+        crossword_type = self.get_crossword_type()
+        self.metrics.record_generation(crossword_type, self.grid_size, attempts, success)
+        if success:
+            self.metrics.record_density(crossword_type, self.grid_size, self.compute_density())
+            if self.usage_ledger is not None:
+                self.usage_ledger.record(self.used_solutions())
+
+    def used_solutions(self):
+        """
+        Soluzioni delle parole del cruciverba, registrate nel registro degli utilizzi.
+        """
+        return [word.text for word in self.placed_words]
 
-        return random.choice(matching_words) if matching_words else None
+    def compute_density(self):
+        """
+        Frazione di celle piene nel rettangolo che contiene tutte le lettere.
+        """
+        return GridUtils.compute_density(self.grid)
 
     def can_place_word(self, word, start_row, start_col, vertical=False):
-        return GridUtils.can_place_word(self.grid, word, start_row, start_col, vertical, self.grid_size)
+        """
+        Verifica un posizionamento sulla mappa di occupazione; con strict_placement
+        controlla anche adiacenze, celle prima e dopo la parola e parole parallele.
+        """
+        return self.occupancy.can_place(word, start_row, start_col, vertical,
+                                        strict=self.strict_placement)
 
     def place_word(self, word_info, start_row, start_col, vertical=False):
         """
         Posiziona una parola nella griglia.
         """
         word = word_info['solution']
+        if self.usage_ledger is not None and self.usage_ledger.is_excluded(word):
+            return False
         if not self.can_place_word(word, start_row, start_col, vertical):
             return False
 
@@ -118,7 +254,7 @@ class BaseCrosswordGenerator(ABC):
             else:
                 self.grid[start_row][start_col + i] = letter
 
-        self.placed_words.append(Word(
+        placed_word = Word(
             word,
             start_col,
             start_row,
@@ -126,10 +262,16 @@ class BaseCrosswordGenerator(ABC):
             word_info['clue'],
             word_info['word_pattern'],
             word_info['num_words']
-        ))
+        )
+        self.placed_words.append(placed_word)
+        self.placed_entries.append(word_info)
+        self.occupancy.place(word, start_row, start_col, vertical, placed_word)
 
-        # Aggiorna il contatore di utilizzo
         if 'id' in word_info:
+            self.used_word_ids.append(word_info['id'])
+
+        # Aggiorna il contatore di utilizzo
+        if self.record_usage and self.db_config and 'id' in word_info:
             try:
                 # Aggiungiamo self.output_dir come terzo parametro
                 DatabaseUtils.update_word_usage(
@@ -147,10 +289,82 @@ class BaseCrosswordGenerator(ABC):
         """
         Resetta la griglia e le parole piazzate.
         """
-        self.grid = [['_' for _ in range(self.grid_size)] for _ in range(self.grid_size)]
+        self.grid = self.create_grid()
+        self._occupancy = self.create_occupancy()
         self.placed_words = []
+        self.used_word_ids = []
+        self.placed_entries = []
         logging.info("Grid reset")
 
+    def snapshot(self):
+        """
+        Salva lo stato della generazione (griglia, mappa di occupazione, parole piazzate).
+        """
+        state = {
+            'grid': [list(row) for row in self.grid],
+            'occupancy': self.occupancy.copy(),
+            'placed_words': list(self.placed_words),
+            'used_word_ids': list(self.used_word_ids),
+            'placed_entries': list(self.placed_entries)
+        }
+        for field in self.SNAPSHOT_FIELDS:
+            state[field] = getattr(self, field)
+        return state
+
+    def restore(self, state):
+        """
+        Ripristina uno stato salvato da snapshot(); lo stato resta riutilizzabile.
+        """
+        self.grid = [list(row) for row in state['grid']]
+        self._occupancy = state['occupancy'].copy()
+        self.placed_words = list(state['placed_words'])
+        self.used_word_ids = list(state['used_word_ids'])
+        self.placed_entries = list(state['placed_entries'])
+        for field in self.SNAPSHOT_FIELDS:
+            setattr(self, field, state[field])
+
+    def next_step(self, depth):
+        """
+        Passo di posizionamento numero depth per la ricerca a fascio, come tupla
+        (nome, funzione, obbligatorio), o None se non ci sono altri passi.
+        Un passo non obbligatorio che fallisce viene saltato.
+        """
+        return None
+
+    def is_complete(self):
+        """
+        Vero se lo stato corrente è un cruciverba valido.
+        """
+        return False
+
+    def generate_crossword_beam(self):
+        """
+        Ricerca a fascio sui passi di posizionamento: tiene i beam_width stati parziali con il
+        punteggio di qualità più alto e restituisce il miglior cruciverba completo trovato
+        entro time_budget secondi. Se il tempo scade senza cruciverba completi ripiega sulla
+        ricerca first, con i suoi max_attempts tentativi.
+        """
+        scorer = PuzzleScorer(self.score_weights, self.usage_ledger)
+        search = BeamSearch(self, scorer, self.beam_width, self.beam_expansions,
+                            self.time_budget)
+        best = search.run()
+        if best is None:
+            logging.warning(f"Beam search found no complete crossword after {search.rounds} "
+                            f"rounds, falling back to first search")
+            # La ricerca first registra da sé i propri tentativi
+            self.search_mode = 'first'
+            try:
+                return self.generate_crossword()
+            finally:
+                self.search_mode = 'beam'
+
+        self.restore(best)
+        logging.info(f"Beam search: best score {search.best_score:.3f} after "
+                     f"{search.rounds} rounds and {search.expanded} expansions")
+        # Una ricerca a fascio è un solo tentativo: i round non sono tentativi
+        self.record_generation(1, True)
+        return self.format_result()
+
     def _get_non_empty_rows(self):
         """
         Trova gli indici delle righe che contengono almeno una lettera.
@@ -202,13 +416,14 @@ class BaseCrosswordGenerator(ABC):
         self._update_word_coordinates(row_mapping, col_mapping)
         self.grid = new_grid
         self.grid_size = len(new_grid)
+        self.invalidate_occupancy()
 
-    def save_to_json(self):
+    def get_json_data(self):
         """
-        Salva il cruciverba in formato JSON con tutte le informazioni necessarie
+        Costruisce il documento JSON del cruciverba con tutte le informazioni necessarie
         per la ricostruzione.
         """
-        crossword_data = {
+        return {
             'crossword_data': {
                 'metadata': {
                     'guid': str(self.guid),
@@ -222,6 +437,11 @@ class BaseCrosswordGenerator(ABC):
             }
         }
 
+    def save_to_json(self):
+        """
+        Salva il cruciverba in formato JSON.
+        """
+        crossword_data = self.get_json_data()
         json_file = os.path.join(self.output_dir, 'crossword.json')
         try:
             with open(json_file, 'w', encoding='utf-8') as f:
@@ -236,6 +456,8 @@ class BaseCrosswordGenerator(ABC):
         Formatta il risultato del cruciverba.
         """
         self.optimize_grid()
+        if not self.write_output:
+            return "Crossword generated successfully"
         self.print_crossword()
         self.print_placed_words()
         self.save_to_file()
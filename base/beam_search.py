@@ -0,0 +1,110 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import time
+
+
+class BeamSearch:
+    """
+    Ricerca a fascio "anytime" sui passi di posizionamento di un generatore.
+    A ogni round ogni stato parziale del fascio viene espanso più volte con il passo
+    successivo (next_step), che essendo casuale produce figli diversi; i figli distinti
+    sono ordinati per punteggio di qualità e i migliori beam_width formano il fascio
+    seguente. Quando il fascio si esaurisce la ricerca riparte dalla griglia vuota, fino
+    allo scadere del tempo: il risultato è il miglior cruciverba completo incontrato.
+    """
+
+    def __init__(self, generator, scorer, beam_width: int = 8, expansions: int = 3,
+                 time_budget: float = 2.0):
+        if beam_width < 1 or expansions < 1:
+            raise ValueError("Beam width and expansions must be at least 1")
+        self.generator = generator
+        self.scorer = scorer
+        self.beam_width = beam_width
+        self.expansions = expansions
+        self.time_budget = time_budget
+        self.rounds = 0
+        self.expanded = 0
+        self.best_state: Optional[Dict[str, Any]] = None
+        self.best_score = float('-inf')
+
+    def _key(self, state: Dict[str, Any]) -> Tuple:
+        """
+        Identifica uno stato dalle parole piazzate e dagli attributi extra del generatore.
+        """
+        words = tuple((word.text, word.y, word.x, word.is_horizontal)
+                      for word in state['placed_words'])
+        return words + tuple(state[field] for field in self.generator.SNAPSHOT_FIELDS)
+
+    def _expand(self, state: Dict[str, Any], depth: int) -> List[Tuple[float, Dict, int]]:
+        """
+        Figli di uno stato: fino a expansions esecuzioni riuscite del passo successivo.
+        Se un passo facoltativo non riesce mai, l'unico figlio è lo stato stesso con il
+        passo saltato.
+        """
+        generator = self.generator
+        generator.restore(state)
+        step = generator.next_step(depth)
+        if step is None:
+            return []
+
+        step_name, step_func, required = step
+        children = []
+        for _ in range(self.expansions):
+            generator.restore(state)
+            self.expanded += 1
+            try:
+                placed = generator.run_step(step_name, step_func)
+            except Exception as e:
+                logging.error(f"Error during beam step {step_name}: {str(e)}")
+                placed = False
+            if not placed:
+                continue
+
+            child = generator.snapshot()
+            score = self.scorer.score(generator)
+            children.append((score, child, depth + 1))
+            if generator.is_complete() and score > self.best_score:
+                self.best_score = score
+                self.best_state = child
+
+        if not children and not required:
+            generator.restore(state)
+            children.append((self.scorer.score(generator), state, depth + 1))
+        return children
+
+    def run(self) -> Optional[Dict[str, Any]]:
+        """
+        Esegue la ricerca fino allo scadere di time_budget e restituisce lo stato
+        (vedi BaseCrosswordGenerator.snapshot) del miglior cruciverba completo, o None.
+        """
+        deadline = time.monotonic() + self.time_budget
+        generator = self.generator
+        generator.reset_grid()
+        root = generator.snapshot()
+        beam = [(root, 0)]
+
+        while time.monotonic() < deadline:
+            self.rounds += 1
+            children = []
+            for state, depth in beam:
+                children.extend(self._expand(state, depth))
+                if time.monotonic() >= deadline:
+                    break
+
+            # Figli distinti, i migliori per primi
+            children.sort(key=lambda child: child[0], reverse=True)
+            seen = set()
+            beam = []
+            for score, state, depth in children:
+                key = self._key(state)
+                if key in seen:
+                    continue
+                seen.add(key)
+                beam.append((state, depth))
+                if len(beam) >= self.beam_width:
+                    break
+
+            if not beam:
+                beam = [(root, 0)]
+
+        return self.best_state
@@ -3,14 +3,22 @@ from base.base_generator import BaseCrosswordGenerator
 from typing import List, Dict, Tuple, Optional
 import logging
 import random
-import json
 import os
 
 
 class HiddenWordGenerator(BaseCrosswordGenerator):
     """Classe base per i cruciverba con parola nascosta."""
-    def __init__(self, grid_size=15, cell_size=75, db_config=None, max_attempts=3):
-        super().__init__(grid_size, cell_size, db_config, max_attempts)
+
+    # Le parole orizzontali occupano righe consecutive attorno alla colonna chiave
+    strict_placement = False
+
+    supports_beam = True
+
+    SNAPSHOT_FIELDS = ('key_column', 'hidden_word')
+
+    def __init__(self, grid_size=15, cell_size=75, db_config=None, max_attempts=3,
+                 word_list=None, write_output=True):
+        super().__init__(grid_size, cell_size, db_config, max_attempts, word_list, write_output)
         self.key_column = None
         self.hidden_word = None
         self.min_word_length = 5
@@ -28,6 +36,16 @@ class HiddenWordGenerator(BaseCrosswordGenerator):
         """Trova una parola che interseca. Da implementare nelle sottoclassi."""
         pass
 
+    def place_intersecting_word(self, row: int, letter: str) -> bool:
+        """
+        Cerca e posiziona la parola orizzontale che interseca la lettera della riga indicata.
+        """
+        word_result = self.find_intersecting_word(row, letter)
+        if not word_result:
+            return False
+        word_info, start_col = word_result
+        return self.place_word(word_info, row, start_col, vertical=False)
+
     def print_crossword(self):
         """
         Stampa la griglia del cruciverba evidenziando la colonna della parola nascosta.
@@ -115,11 +133,11 @@ class HiddenWordGenerator(BaseCrosswordGenerator):
 
         logging.info(f"Crossword saved to {output_file}")
 
-    def save_to_json(self):
+    def get_json_data(self):
         """
-        Salva il cruciverba in formato JSON con informazioni specifiche per il tipo hidden word.
+        Costruisce il documento JSON con informazioni specifiche per il tipo hidden word.
         """
-        crossword_data = {
+        return {
             'crossword_data': {
                 'metadata': {
                     'guid': str(self.guid),
@@ -143,20 +161,13 @@ class HiddenWordGenerator(BaseCrosswordGenerator):
             }
         }
 
-        json_file = os.path.join(self.output_dir, 'crossword.json')
-        try:
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(crossword_data, f, indent=2, ensure_ascii=False)
-            logging.info(f"Crossword saved to JSON: {json_file}")
-        except Exception as e:
-            logging.error(f"Error saving JSON file: {str(e)}")
-            raise
-
     def format_result(self):
         """
         Formatta il risultato del cruciverba con parola nascosta.
         """
         self.optimize_grid()
+        if not self.write_output:
+            return "Crossword generated successfully"
         self.print_crossword()
         self.print_placed_words()
         self.save_to_file()
@@ -191,6 +202,7 @@ class HiddenWordGenerator(BaseCrosswordGenerator):
         # Assegna la nuova griglia ottimizzata
         self.grid = new_grid
         self.grid_size = len(new_grid)
+        self.invalidate_occupancy()
 
         logging.info(
             f"Grid optimized. New size: {self.grid_size}x{self.grid_size}. Hidden word column: {self.key_column}")
@@ -203,17 +215,41 @@ class HiddenWordGenerator(BaseCrosswordGenerator):
             word.x = col_mapping[word.x]
             word.y = row_mapping[word.y]
 
+    def next_step(self, depth):
+        """
+        Passo 0: parola nascosta (obbligatorio); passo k: parola orizzontale della riga k - 1.
+        """
+        if depth == 0:
+            hidden_word_length = random.randint(self.min_word_length, self.max_word_length)
+            return 'set_hidden_word', lambda: self.set_hidden_word(hidden_word_length), True
+
+        row = depth - 1
+        if row >= len(self.hidden_word):
+            return None
+        letter = self.hidden_word[row]
+        return 'find_intersecting_word', lambda: self.place_intersecting_word(row, letter), False
+
+    def is_complete(self):
+        return len(self.placed_words) >= self.min_words
+
+    def used_solutions(self):
+        return super().used_solutions() + [self.hidden_word]
+
     def generate_crossword(self) -> str:
         """
         Genera il cruciverba con parola nascosta.
         """
+        if self.search_mode == 'beam':
+            return self.generate_crossword_beam()
+
         attempts = 0
         while attempts < self.max_attempts:
             try:
                 self.reset_grid()
 
                 hidden_word_length = random.randint(self.min_word_length, self.max_word_length)
-                if not self.set_hidden_word(hidden_word_length):
+                if not self.run_step('set_hidden_word',
+                                     lambda: self.set_hidden_word(hidden_word_length)):
                     attempts += 1
                     continue
 
@@ -221,13 +257,12 @@ class HiddenWordGenerator(BaseCrosswordGenerator):
                 words_placed = 0
 
                 for row, letter in enumerate(self.hidden_word):
-                    word_result = self.find_intersecting_word(row, letter)
-                    if word_result:
-                        word_info, start_col = word_result
-                        if self.place_word(word_info, row, start_col, vertical=False):
-                            words_placed += 1
+                    if self.run_step('find_intersecting_word',
+                                     lambda: self.place_intersecting_word(row, letter)):
+                        words_placed += 1
 
                 if words_placed >= self.min_words:
+                    self.record_generation(attempts + 1, True)
                     return self.format_result()
 
             except Exception as e:
@@ -235,5 +270,6 @@ class HiddenWordGenerator(BaseCrosswordGenerator):
 
             attempts += 1
 
+        self.record_generation(attempts, False)
         return "Unable to generate crossword after multiple attempts"
 
@@ -0,0 +1,75 @@
+from typing import Dict, List, Any
+import sys
+
+
+class LexiconEntry:
+    """
+    Record compatto per una voce del lessico.
+    Usa __slots__ al posto del dizionario per riga e interna le stringhe ripetute
+    (soluzioni e pattern), mantenendo l'accesso in stile dizionario usato dai generatori
+    (entry['solution'], 'id' in entry, entry.get('clue')).
+    """
+
+    __slots__ = ('id', 'solution', 'clue', 'word_pattern', 'num_words', 'usage_count')
+
+    def __init__(self, id, solution: str, clue: str = "", word_pattern: str = "",
+                 num_words=1, usage_count: int = 0):
+        self.id = id
+        self.solution = sys.intern(solution)
+        self.clue = clue
+        self.word_pattern = sys.intern(word_pattern) if word_pattern else ""
+        self.num_words = num_words
+        self.usage_count = usage_count
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'LexiconEntry':
+        """
+        Crea un record a partire da una riga del database (dizionario).
+        """
+        return cls(row.get('id'), row['solution'], row.get('clue') or "",
+                   row.get('word_pattern') or "", row.get('num_words', 1),
+                   row.get('usage_count', 0))
+
+    @staticmethod
+    def compact_list(rows: List[Any]) -> List['LexiconEntry']:
+        """
+        Converte una lista di righe in record compatti (le voci già compatte sono riusate).
+        """
+        return [row if isinstance(row, LexiconEntry) else LexiconEntry.from_row(row)
+                for row in rows]
+
+    def __getitem__(self, key: str):
+        if key not in LexiconEntry.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in LexiconEntry.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in LexiconEntry.__slots__ and getattr(self, key) is not None
+
+    def get(self, key: str, default=None):
+        if key not in LexiconEntry.__slots__:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def keys(self):
+        return list(LexiconEntry.__slots__)
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in LexiconEntry.__slots__}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, LexiconEntry):
+            return all(getattr(self, key) == getattr(other, key) for key in LexiconEntry.__slots__)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.id, self.solution))
+
+    def __repr__(self) -> str:
+        return f"LexiconEntry(id={self.id!r}, solution={self.solution!r})"
@@ -0,0 +1,317 @@
+from typing import Dict, List, Optional, Any, Tuple
+
+
+class OccupancyMap:
+    """
+    Mappa di occupazione della griglia, aggiornata in modo incrementale a ogni posizionamento.
+    Per ogni cella tiene la parola orizzontale e verticale che la occupano e, nelle quattro
+    direzioni, la lunghezza delle sequenze di celle libere adiacenti:
+    - free: celle vuote;
+    - clear: celle vuote con vuote anche le due celle vicine perpendicolari (per una parola
+      orizzontale le celle sopra e sotto), cioè spazio in cui una parola non tocca le altre.
+    Le sequenze non includono la cella di partenza; fuori griglia le celle contano come vuote.
+    Un posizionamento aggiorna celle e proprietari e segna le righe e colonne toccate, le cui
+    sequenze vengono ricalcolate alla prima interrogazione.
+    Le celle occupate sono tenute anche come bitmask per riga e per colonna, da cui
+    can_place verifica la legalità di un posizionamento senza scandire le celle.
+    La griglia è quadrata durante la generazione, rettangolare dopo optimize_grid.
+    """
+
+    DIRECTIONS = ('left', 'right', 'up', 'down')
+
+    # Sequenze iniziali (griglia vuota) per dimensione, copiate a ogni nuova mappa
+    _templates: Dict[Tuple[int, int], Dict[str, List[int]]] = {}
+
+    def __init__(self, rows: int, cols: Optional[int] = None):
+        self.rows = rows
+        self.cols = rows if cols is None else cols
+        cells = self.rows * self.cols
+        self.filled = bytearray(cells)
+        self.letters: List[str] = [''] * cells
+        # Bit c di row_bits[r] (e bit r di col_bits[c]) per ogni cella occupata;
+        # h_bits/v_bits per le celle che fanno parte di una parola orizzontale/verticale
+        self.row_bits = [0] * self.rows
+        self.col_bits = [0] * self.cols
+        self.h_bits = [0] * self.rows
+        self.v_bits = [0] * self.cols
+        # Celle non "pulite" per una parola orizzontale (h) e verticale (v)
+        self.h_blocked = bytearray(cells)
+        self.v_blocked = bytearray(cells)
+        self.horizontal_owner: List[Optional[Any]] = [None] * cells
+        self.vertical_owner: List[Optional[Any]] = [None] * cells
+        self.vertical_columns: Dict[int, int] = {}
+        self.horizontal_rows: Dict[int, int] = {}
+
+        template = self._empty_runs(self.rows, self.cols)
+        self.free = {direction: list(runs) for direction, runs in template.items()}
+        self.clear = {direction: list(runs) for direction, runs in template.items()}
+        # Righe e colonne con sequenze da ricalcolare
+        self._free_rows, self._free_cols = set(), set()
+        self._clear_rows, self._clear_cols = set(), set()
+
+    @classmethod
+    def _empty_runs(cls, rows: int, cols: int) -> Dict[str, List[int]]:
+        template = cls._templates.get((rows, cols))
+        if template is None:
+            template = cls._templates[(rows, cols)] = {
+                'left': [c for r in range(rows) for c in range(cols)],
+                'right': [cols - 1 - c for r in range(rows) for c in range(cols)],
+                'up': [r for r in range(rows) for c in range(cols)],
+                'down': [rows - 1 - r for r in range(rows) for c in range(cols)]
+            }
+        return template
+
+    @classmethod
+    def from_grid(cls, grid: List[List[str]], placed_words: List[Any]) -> 'OccupancyMap':
+        """
+        Ricostruisce la mappa da una griglia e dalle parole piazzate (es. dopo optimize_grid).
+        """
+        occupancy = cls(len(grid), len(grid[0]) if grid else 0)
+        for r, row in enumerate(grid):
+            for c, cell in enumerate(row):
+                if cell != '_':
+                    occupancy.fill_cell(r, c, cell)
+        for word in placed_words:
+            occupancy._set_owner(word, word.y, word.x, not word.is_horizontal, len(word.text))
+        return occupancy
+
+    def copy(self) -> 'OccupancyMap':
+        """
+        Copia indipendente della mappa (per salvare e ripristinare stati parziali).
+        """
+        other = OccupancyMap.__new__(OccupancyMap)
+        other.rows, other.cols = self.rows, self.cols
+        other.filled = bytearray(self.filled)
+        other.h_blocked = bytearray(self.h_blocked)
+        other.v_blocked = bytearray(self.v_blocked)
+        other.letters = list(self.letters)
+        other.row_bits, other.col_bits = list(self.row_bits), list(self.col_bits)
+        other.h_bits, other.v_bits = list(self.h_bits), list(self.v_bits)
+        other.horizontal_owner = list(self.horizontal_owner)
+        other.vertical_owner = list(self.vertical_owner)
+        other.vertical_columns = dict(self.vertical_columns)
+        other.horizontal_rows = dict(self.horizontal_rows)
+        other.free = {direction: list(runs) for direction, runs in self.free.items()}
+        other.clear = {direction: list(runs) for direction, runs in self.clear.items()}
+        other._free_rows, other._free_cols = set(self._free_rows), set(self._free_cols)
+        other._clear_rows, other._clear_cols = set(self._clear_rows), set(self._clear_cols)
+        return other
+
+    def filled_count(self) -> int:
+        return self.filled.count(1)
+
+    def crossing_count(self) -> int:
+        """
+        Celle che appartengono sia a una parola orizzontale sia a una verticale.
+        """
+        in_words = (sum(bin(bits).count('1') for bits in self.h_bits) +
+                    sum(bin(bits).count('1') for bits in self.v_bits))
+        return in_words - self.filled_count()
+
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Rettangolo (riga minima, colonna minima, riga massima, colonna massima) delle lettere.
+        """
+        rows = [r for r, bits in enumerate(self.row_bits) if bits]
+        if not rows:
+            return None
+        cols = [c for c, bits in enumerate(self.col_bits) if bits]
+        return rows[0], cols[0], rows[-1], cols[-1]
+
+    def is_filled(self, row: int, col: int) -> bool:
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return False
+        return bool(self.filled[row * self.cols + col])
+
+    def owner(self, row: int, col: int, vertical: bool = False) -> Optional[Any]:
+        """
+        Parola (orizzontale o verticale) che occupa la cella, o None.
+        """
+        owners = self.vertical_owner if vertical else self.horizontal_owner
+        return owners[row * self.cols + col]
+
+    def direction(self, row: int, col: int) -> Optional[str]:
+        """
+        'H', 'V' o 'X' (incrocio) per le celle occupate da parole piazzate, altrimenti None.
+        """
+        i = row * self.cols + col
+        horizontal = self.horizontal_owner[i] is not None
+        vertical = self.vertical_owner[i] is not None
+        if horizontal and vertical:
+            return 'X'
+        return 'H' if horizontal else 'V' if vertical else None
+
+    def _set_owner(self, owner: Any, row: int, col: int, vertical: bool, length: int) -> None:
+        span = ((1 << length) - 1) << (row if vertical else col)
+        if vertical:
+            self.v_bits[col] |= span
+        else:
+            self.h_bits[row] |= span
+        if owner is None:
+            return
+        n = self.cols
+        if vertical:
+            for k in range(length):
+                self.vertical_owner[(row + k) * n + col] = owner
+            self.vertical_columns[col] = self.vertical_columns.get(col, 0) + 1
+        else:
+            for k in range(length):
+                self.horizontal_owner[row * n + col + k] = owner
+            self.horizontal_rows[row] = self.horizontal_rows.get(row, 0) + 1
+
+    def _refresh_row(self, runs: Dict[str, List[int]], blocked: bytearray, row: int) -> None:
+        n = self.cols
+        base = row * n
+        left, right = runs['left'], runs['right']
+        run = 0
+        for i in range(base, base + n):
+            left[i] = run
+            run = 0 if blocked[i] else run + 1
+        run = 0
+        for i in range(base + n - 1, base - 1, -1):
+            right[i] = run
+            run = 0 if blocked[i] else run + 1
+
+    def _refresh_column(self, runs: Dict[str, List[int]], blocked: bytearray, col: int) -> None:
+        n = self.cols
+        up, down = runs['up'], runs['down']
+        run = 0
+        for i in range(col, self.rows * n, n):
+            up[i] = run
+            run = 0 if blocked[i] else run + 1
+        run = 0
+        for i in range(col + (self.rows - 1) * n, -1, -n):
+            down[i] = run
+            run = 0 if blocked[i] else run + 1
+
+    def _run(self, runs: Dict[str, List[int]], blocked: bytearray, dirty_rows: set,
+             dirty_cols: set, row: int, col: int, direction: str) -> int:
+        # Le sequenze di una riga o colonna toccata da un posizionamento vengono
+        # ricalcolate una sola volta, alla prima interrogazione successiva
+        if direction in ('left', 'right'):
+            if row in dirty_rows:
+                self._refresh_row(runs, blocked, row)
+                dirty_rows.discard(row)
+        elif col in dirty_cols:
+            self._refresh_column(runs, blocked, col)
+            dirty_cols.discard(col)
+        return runs[direction][row * self.cols + col]
+
+    def free_run(self, row: int, col: int, direction: str) -> int:
+        """
+        Celle vuote consecutive a partire dalla cella adiacente nella direzione data.
+        """
+        return self._run(self.free, self.filled, self._free_rows, self._free_cols,
+                         row, col, direction)
+
+    def clear_run(self, row: int, col: int, direction: str) -> int:
+        """
+        Celle "pulite" consecutive a partire dalla cella adiacente nella direzione data.
+        """
+        if direction in ('left', 'right'):
+            return self._run(self.clear, self.h_blocked, self._clear_rows, self._clear_cols,
+                             row, col, direction)
+        return self._run(self.clear, self.v_blocked, self._clear_rows, self._clear_cols,
+                         row, col, direction)
+
+    def fill_cell(self, row: int, col: int, letter: str) -> None:
+        """
+        Segna una cella come occupata e le righe e colonne da aggiornare.
+        """
+        n = self.cols
+        i = row * n + col
+        if self.filled[i]:
+            return
+        self.filled[i] = 1
+        self.letters[i] = letter
+        self.row_bits[row] |= 1 << col
+        self.col_bits[col] |= 1 << row
+        self._free_rows.add(row)
+        self._free_cols.add(col)
+
+        # La cella e le vicine perpendicolari smettono di essere "pulite"
+        for r in (row - 1, row, row + 1):
+            if 0 <= r < self.rows:
+                self.h_blocked[r * n + col] = 1
+                self._clear_rows.add(r)
+        for c in (col - 1, col, col + 1):
+            if 0 <= c < n:
+                self.v_blocked[row * n + c] = 1
+                self._clear_cols.add(c)
+
+    def place(self, word: str, row: int, col: int, vertical: bool = False,
+              owner: Optional[Any] = None) -> None:
+        """
+        Registra una parola posizionata: occupa le celle e ne assegna il proprietario.
+        """
+        for k, letter in enumerate(word):
+            if vertical:
+                self.fill_cell(row + k, col, letter)
+            else:
+                self.fill_cell(row, col + k, letter)
+        self._set_owner(owner, row, col, vertical, len(word))
+
+    def _line(self, row: int, col: int, length: int, vertical: bool) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Bitmask della linea dello slot, delle parole nella stessa direzione, delle due linee
+        parallele adiacenti e dello slot stesso; None se lo slot esce dalla griglia.
+        """
+        if vertical:
+            if row < 0 or row + length > self.rows or not 0 <= col < self.cols:
+                return None
+            side = ((self.col_bits[col - 1] if col > 0 else 0) |
+                    (self.col_bits[col + 1] if col + 1 < self.cols else 0))
+            return self.col_bits[col], self.v_bits[col], side, ((1 << length) - 1) << row
+        if col < 0 or col + length > self.cols or not 0 <= row < self.rows:
+            return None
+        side = ((self.row_bits[row - 1] if row > 0 else 0) |
+                (self.row_bits[row + 1] if row + 1 < self.rows else 0))
+        return self.row_bits[row], self.h_bits[row], side, ((1 << length) - 1) << col
+
+    def blocked(self, row: int, col: int, length: int, vertical: bool = False) -> bool:
+        """
+        Vero se nessuna parola legale può attraversare lo slot: esce dalla griglia, una
+        cella vuota ha un vicino perpendicolare occupato o una cella appartiene già a una
+        parola nella stessa direzione. Le celle prima e dopo lo slot non sono controllate.
+        """
+        line = self._line(row, col, length, vertical)
+        if line is None:
+            return True
+        bits, same_direction, side, span = line
+        return bool(side & span & ~bits or same_direction & span)
+
+    def can_place(self, word: str, row: int, col: int, vertical: bool = False,
+                  strict: bool = True) -> bool:
+        """
+        Verifica un posizionamento: lo slot è nella griglia e le lettere coincidono negli
+        incroci. Con strict la parola deve anche essere legale per un cruciverba:
+        - le celle subito prima e dopo la parola sono vuote;
+        - non si sovrappone a parole nella stessa direzione;
+        - le celle non di incrocio non toccano lettere sopra/sotto (o a sinistra/destra).
+        """
+        length = len(word)
+        line = self._line(row, col, length, vertical)
+        if line is None:
+            return False
+        bits, same_direction, side, span = line
+        crossing = bits & span
+
+        if strict:
+            start = row if vertical else col
+            ends = ((1 << start) >> 1) | (1 << (start + length))
+            if bits & ends or crossing & same_direction or side & span & ~crossing:
+                return False
+
+        # Le lettere vengono confrontate solo nelle celle di incrocio
+        letters = self.letters
+        while crossing:
+            bit = crossing & -crossing
+            crossing ^= bit
+            k = bit.bit_length() - 1
+            if vertical:
+                i, offset = k * self.cols + col, k - row
+            else:
+                i, offset = row * self.cols + k, k - col
+            if letters[i] != word[offset]:
+                return False
+        return True
@@ -5,8 +5,12 @@ import logging
 
 class PuzzleCrosswordGenerator(BaseCrosswordGenerator):
     """Classe base per i cruciverba puzzle standard."""
-    def __init__(self, grid_size=15, cell_size=75, db_config=None, max_attempts=3):
-        super().__init__(grid_size, cell_size, db_config, max_attempts)
+
+    supports_beam = True
+
+    def __init__(self, grid_size=15, cell_size=75, db_config=None, max_attempts=3,
+                 word_list=None, write_output=True):
+        super().__init__(grid_size, cell_size, db_config, max_attempts, word_list, write_output)
 
     @abstractmethod
     def place_first_word(self) -> bool:
@@ -33,34 +37,51 @@ class PuzzleCrosswordGenerator(BaseCrosswordGenerator):
         """Posiziona la quinta parola. Da implementare nelle sottoclassi."""
         pass
 
+    def placement_sequence(self):
+        """
+        Sequenza fissa dei 5 posizionamenti.
+        """
+        return [
+            self.place_first_word,
+            self.place_second_word,
+            self.place_third_word,
+            self.place_fourth_word,
+            self.place_fifth_word
+        ]
+
+    def next_step(self, depth):
+        sequence = self.placement_sequence()
+        if depth >= len(sequence):
+            return None
+        place_func = sequence[depth]
+        return place_func.__name__, place_func, True
+
+    def is_complete(self):
+        return len(self.placed_words) == 5
+
     def generate_crossword(self):
         """
         Genera il cruciverba completo con esattamente 5 parole.
         """
+        if self.search_mode == 'beam':
+            return self.generate_crossword_beam()
+
         attempts = 0
         while attempts < self.max_attempts:
             try:
                 logging.info(f"Starting attempt {attempts + 1}")
                 self.reset_grid()
 
-                # Sequenza fissa di 5 posizionamenti
-                placement_sequence = [
-                    self.place_first_word,
-                    self.place_second_word,
-                    self.place_third_word,
-                    self.place_fourth_word,
-                    self.place_fifth_word
-                ]
-
                 success = True
-                for i, place_func in enumerate(placement_sequence, 1):
-                    if not place_func():
+                for i, place_func in enumerate(self.placement_sequence(), 1):
+                    if not self.run_step(place_func.__name__, place_func):
                         logging.warning(f"Failed to place word {i}")
                         success = False
                         break
 
                 if success:
                     logging.info("Successfully generated crossword with 5 words")
+                    self.record_generation(attempts + 1, True)
                     return self.format_result()
 
             except Exception as e:
@@ -68,5 +89,6 @@ class PuzzleCrosswordGenerator(BaseCrosswordGenerator):
 
             attempts += 1
 
+        self.record_generation(attempts, False)
         logging.error("Failed to generate crossword after all attempts")
         return "Unable to generate crossword after multiple attempts"
@@ -0,0 +1,157 @@
+from typing import Any, Dict, Iterator, List, Optional
+import json
+import logging
+import os
+from base.word import Word
+from generators.registry import generator_registry
+from utils.puzzle_export import ClueNumbering
+from utils.puzzle_validator import PuzzleValidator
+
+
+class PuzzleResult:
+    """
+    Cruciverba letto da un crossword.json: griglia, parole (Word), metadati e, per il tipo
+    hidden, parola nascosta e colonna chiave.
+    to_generator() lo ricarica in un generatore del suo tipo, così le stesse funzioni di
+    scrittura della generazione (save_to_file, save_to_json, print_crossword) lo
+    riesportano senza database e senza rigenerarlo.
+    """
+
+    def __init__(self, crossword_type: str, grid: List[List[str]], words: List[Word],
+                 metadata: Dict[str, Any], hidden_word: Optional[str] = None,
+                 key_column: Optional[int] = None, source: Optional[str] = None):
+        self.crossword_type = crossword_type
+        self.grid = grid
+        self.words = words
+        self.metadata = metadata
+        self.hidden_word = hidden_word
+        self.key_column = key_column
+        # File (ed eventualmente riga) da cui è stato letto
+        self.source = source
+        self._numbering: Optional[ClueNumbering] = None
+
+    @classmethod
+    def from_dict(cls, document: Dict, source: Optional[str] = None) -> 'PuzzleResult':
+        """
+        Ricostruisce il cruciverba dal documento JSON di get_json_data.
+        """
+        data = document['crossword_data']
+        hidden = data.get('hidden_word') or {}
+        return cls(data['crossword_type'], data['grid'],
+                   [Word.from_dict(word) for word in data['words']],
+                   data['metadata'], hidden.get('word'), hidden.get('column'), source)
+
+    @property
+    def guid(self) -> str:
+        return self.metadata['guid']
+
+    @property
+    def timestamp(self) -> str:
+        return self.metadata['timestamp']
+
+    @property
+    def cell_size(self) -> int:
+        return self.metadata.get('cell_size', 75)
+
+    @property
+    def numbering(self) -> ClueNumbering:
+        """
+        Numerazione standard delle definizioni, calcolata alla prima richiesta.
+        """
+        if self._numbering is None:
+            self._numbering = ClueNumbering(self)
+        return self._numbering
+
+    def to_generator(self, output_dir: Optional[str] = None):
+        """
+        Generatore del tipo del cruciverba con griglia, parole e metadati caricati.
+        Non interroga il database e non crea directory: i file vengono scritti in
+        output_dir, se indicata.
+        """
+        generator_class = generator_registry.for_crossword_type(self.crossword_type)
+        generator = generator_class(grid_size=self.metadata['grid_size'],
+                                    cell_size=self.cell_size,
+                                    word_list=[], write_output=False)
+        generator.grid = self.grid
+        generator.placed_words = self.words
+        generator.guid = self.guid
+        generator.timestamp = self.timestamp
+        generator.output_dir = output_dir
+        if self.hidden_word is not None:
+            generator.hidden_word = self.hidden_word
+            generator.key_column = self.key_column
+        generator.invalidate_occupancy()
+        return generator
+
+    def export(self, output_root: str) -> str:
+        """
+        Riscrive crossword.txt e crossword.json in output_root/<timestamp>-<guid>, come
+        nella generazione. Restituisce la directory scritta.
+        """
+        output_dir = os.path.join(output_root, f"{self.timestamp}-{self.guid}")
+        os.makedirs(output_dir, exist_ok=True)
+        generator = self.to_generator(output_dir)
+        generator.save_to_file()
+        generator.save_to_json()
+        return output_dir
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Statistiche ricalcolate da griglia e parole (vedi PuzzleValidator).
+        """
+        report = PuzzleValidator().validate(self)
+        return {'guid': self.guid, 'crossword_type': self.crossword_type, **report['stats']}
+
+
+class PuzzleLoader:
+    """
+    Lettura di cruciverba salvati: un crossword.json, una directory (ad esempio output/,
+    letta ricorsivamente) o uno shard JSONL con un documento per riga.
+    I cruciverba vengono letti uno alla volta, quindi anche archivi molto grandi si
+    rielaborano con memoria costante.
+    """
+
+    @staticmethod
+    def load(path: str) -> PuzzleResult:
+        with open(path, 'r', encoding='utf-8') as f:
+            return PuzzleResult.from_dict(json.load(f), path)
+
+    @staticmethod
+    def iter_directory(path: str, filename: str = 'crossword.json') -> Iterator[PuzzleResult]:
+        """
+        Cruciverba di tutti i file filename sotto path, in ordine di percorso.
+        """
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            if filename in files:
+                json_path = os.path.join(root, filename)
+                try:
+                    yield PuzzleLoader.load(json_path)
+                except (ValueError, KeyError, TypeError) as e:
+                    logging.error(f"Skipping invalid crossword {json_path}: {str(e)}")
+
+    @staticmethod
+    def iter_jsonl(path: str) -> Iterator[PuzzleResult]:
+        """
+        Cruciverba di uno shard JSONL (un documento get_json_data per riga).
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                source = f"{path}:{line_number}"
+                try:
+                    yield PuzzleResult.from_dict(json.loads(line), source)
+                except (ValueError, KeyError, TypeError) as e:
+                    logging.error(f"Skipping invalid crossword {source}: {str(e)}")
+
+    @staticmethod
+    def iter_path(path: str) -> Iterator[PuzzleResult]:
+        """
+        Cruciverba di una directory, di uno shard .jsonl o di un singolo file JSON.
+        """
+        if os.path.isdir(path):
+            return PuzzleLoader.iter_directory(path)
+        if path.endswith('.jsonl'):
+            return PuzzleLoader.iter_jsonl(path)
+        return iter([PuzzleLoader.load(path)])
@@ -0,0 +1,117 @@
+from typing import Dict, List, Optional, Any, Tuple
+
+
+class SparseRow(dict):
+    """
+    Riga di una SparseGrid: solo le celle piene sono memorizzate, le altre valgono '_'.
+    """
+
+    def __missing__(self, col: int) -> str:
+        return '_'
+
+
+class SparseGrid(dict):
+    """
+    Griglia sparsa indicizzata come quella densa (grid[riga][colonna]); la memoria cresce
+    con le lettere piazzate e non con l'area della griglia.
+    """
+
+    def __missing__(self, row: int) -> SparseRow:
+        cells = self[row] = SparseRow()
+        return cells
+
+    def to_dense(self, rows: List[int], cols: List[int]) -> List[List[str]]:
+        """
+        Griglia densa limitata alle righe e colonne indicate (ad esempio quelle non vuote).
+        """
+        return [[self.get(row, {}).get(col, '_') for col in cols] for row in rows]
+
+
+class SparseOccupancy:
+    """
+    Mappa di occupazione per griglie grandi e sparse, con la stessa interfaccia di
+    OccupancyMap usata da place_word (place, can_place, owner, is_filled).
+    Celle e proprietari sono dizionari indicizzati per (riga, colonna) e il rettangolo che
+    contiene le lettere è aggiornato a ogni posizionamento: ogni operazione costa O(lunghezza
+    della parola), indipendentemente dalla dimensione della griglia.
+    """
+
+    def __init__(self, rows: int, cols: Optional[int] = None):
+        self.rows = rows
+        self.cols = rows if cols is None else cols
+        self.letters: Dict[Tuple[int, int], str] = {}
+        self.horizontal_owner: Dict[Tuple[int, int], Any] = {}
+        self.vertical_owner: Dict[Tuple[int, int], Any] = {}
+        self.min_row = self.min_col = None
+        self.max_row = self.max_col = None
+
+    def is_filled(self, row: int, col: int) -> bool:
+        return (row, col) in self.letters
+
+    def owner(self, row: int, col: int, vertical: bool = False) -> Optional[Any]:
+        """
+        Parola (orizzontale o verticale) che occupa la cella, o None.
+        """
+        owners = self.vertical_owner if vertical else self.horizontal_owner
+        return owners.get((row, col))
+
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Rettangolo (riga minima, colonna minima, riga massima, colonna massima) delle lettere.
+        """
+        if self.min_row is None:
+            return None
+        return self.min_row, self.min_col, self.max_row, self.max_col
+
+    def place(self, word: str, row: int, col: int, vertical: bool = False,
+              owner: Optional[Any] = None) -> None:
+        """
+        Registra una parola posizionata: occupa le celle e ne assegna il proprietario.
+        """
+        owners = self.vertical_owner if vertical else self.horizontal_owner
+        for k, letter in enumerate(word):
+            cell = (row + k, col) if vertical else (row, col + k)
+            self.letters[cell] = letter
+            owners[cell] = owner
+
+        end_row = row + len(word) - 1 if vertical else row
+        end_col = col if vertical else col + len(word) - 1
+        if self.min_row is None:
+            self.min_row, self.min_col, self.max_row, self.max_col = row, col, end_row, end_col
+        else:
+            self.min_row = min(self.min_row, row)
+            self.min_col = min(self.min_col, col)
+            self.max_row = max(self.max_row, end_row)
+            self.max_col = max(self.max_col, end_col)
+
+    def can_place(self, word: str, row: int, col: int, vertical: bool = False,
+                  strict: bool = True) -> bool:
+        """
+        Stesse regole di OccupancyMap.can_place, verificate cella per cella sullo slot.
+        """
+        length = len(word)
+        if vertical:
+            if row < 0 or row + length > self.rows or not 0 <= col < self.cols:
+                return False
+            step, side = (1, 0), (0, 1)
+        else:
+            if col < 0 or col + length > self.cols or not 0 <= row < self.rows:
+                return False
+            step, side = (0, 1), (1, 0)
+
+        letters = self.letters
+        same_direction = self.vertical_owner if vertical else self.horizontal_owner
+        if strict and ((row - step[0], col - step[1]) in letters or
+                       (row + step[0] * length, col + step[1] * length) in letters):
+            return False
+
+        for k, letter in enumerate(word):
+            cell = (row + step[0] * k, col + step[1] * k)
+            existing = letters.get(cell)
+            if existing is not None:
+                if existing != letter or (strict and cell in same_direction):
+                    return False
+            elif strict and ((cell[0] - side[0], cell[1] - side[1]) in letters or
+                             (cell[0] + side[0], cell[1] + side[1]) in letters):
+                return False
+        return True
@@ -1,8 +1,12 @@
 from dataclasses import dataclass, asdict
 from typing import Dict
+import sys
 
+# Con Python 3.10+ le istanze usano __slots__ (niente __dict__ per parola)
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Word:
     text: str
     x: int
@@ -12,6 +16,23 @@ class Word:
     word_pattern: str = ""
     num_words: str = ""
 
+    def __post_init__(self):
+        self.text = sys.intern(self.text)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Word':
+        """
+        Ricostruisce una parola dal dizionario di to_dict, togliendo dal campo clue il
+        word_pattern tra parentesi.
+        """
+        clue = data.get('clue') or ""
+        word_pattern = data.get('word_pattern') or ""
+        suffix = f" ({word_pattern})"
+        if word_pattern and clue.endswith(suffix):
+            clue = clue[:-len(suffix)]
+        return cls(data['text'], data['x'], data['y'], data['is_horizontal'], clue,
+                   word_pattern, data.get('num_words', ""))
+
     def to_dict(self) -> Dict:
         """
         Converte l'oggetto Word in un dizionario.
@@ -23,4 +44,4 @@ class Word:
             base_dict['clue'] = f"{self.clue} ({self.word_pattern})"
         else:
             base_dict['clue'] = self.clue
-        return base_dict
\ No newline at end of file
+        return base_dict
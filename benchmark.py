@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import logging
+import os
+import sys
+from benchmarks.runner import BenchmarkRunner
+from benchmarks.regression import RegressionGate
+from generators.registry import BUILTIN_GENERATORS
+
+GENERATOR_TYPES = list(BUILTIN_GENERATORS)
+# template and sparse only fill some grid sizes (e.g. template -s 5, sparse -s 20 30):
+# they are benchmarked on request with -t
+DEFAULT_TYPES = ['type_a', 'type_b', 'type_c', 'hidden']
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'benchmarks', 'baseline.json')
+
+
+def parse_args():
+    """Parse and validate benchmark command line arguments."""
+    parser = argparse.ArgumentParser(
+        description='Offline crossword generation benchmark',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s
+  %(prog)s -t type_a hidden -s 10 15 20 --lexicon-sizes 10000 100000
+  %(prog)s -t sparse -s 20 30 --lexicon-sizes 10000
+  %(prog)s --lexicon-file lexicon.jsonl --lexicon-sizes 100000 --output results.json
+  %(prog)s --check
+  %(prog)s --update-baseline
+        """
+    )
+
+    parser.add_argument(
+        '-t', '--types',
+        nargs='+',
+        choices=GENERATOR_TYPES,
+        default=DEFAULT_TYPES,
+        help='Generator types to benchmark (default: type_a type_b type_c hidden)'
+    )
+
+    parser.add_argument(
+        '-s', '--sizes',
+        nargs='+',
+        type=int,
+        default=[10, 15, 20],
+        help='Grid sizes to benchmark (default: 10 15 20)'
+    )
+
+    parser.add_argument(
+        '--lexicon-sizes',
+        nargs='+',
+        type=int,
+        default=[10000, 100000],
+        help='Lexicon sizes to benchmark (default: 10000 100000)'
+    )
+
+    parser.add_argument(
+        '--lexicon-file',
+        metavar='PATH',
+        help='Sample lexicons from an exported lexicon file instead of synthetic words'
+    )
+
+    parser.add_argument(
+        '--puzzles',
+        type=int,
+        default=20,
+        help='Puzzles generated per scenario (default: 20)'
+    )
+
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed for lexicon and generation (default: 0)'
+    )
+
+    parser.add_argument(
+        '--repeats',
+        type=int,
+        default=1,
+        help='Timed passes per scenario, keeping the fastest (default: 1)'
+    )
+
+    parser.add_argument(
+        '--max-attempts',
+        type=int,
+        default=3,
+        help='Maximum number of generation attempts per puzzle (default: 3)'
+    )
+
+    parser.add_argument(
+        '--output',
+        metavar='PATH',
+        help='Write the results as JSON to PATH'
+    )
+
+    parser.add_argument(
+        '--check',
+        nargs='?',
+        const=DEFAULT_BASELINE,
+        metavar='BASELINE',
+        help='Run the fixed regression matrix and compare it with a baseline JSON '
+             '(default: benchmarks/baseline.json); exits 1 on regression'
+    )
+
+    parser.add_argument(
+        '--update-baseline',
+        nargs='?',
+        const=DEFAULT_BASELINE,
+        metavar='BASELINE',
+        help='Run the fixed regression matrix and store it as the new baseline'
+    )
+
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.5,
+        help='Allowed relative throughput/p50 regression (default: 0.5)'
+    )
+
+    parser.add_argument(
+        '--p99-tolerance',
+        type=float,
+        default=1.0,
+        help='Allowed relative p99 latency regression (default: 1.0)'
+    )
+
+    parser.add_argument(
+        '--no-calibrate',
+        action='store_true',
+        help='Do not normalize timings by the machine calibration workload'
+    )
+
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='Enable verbose output'
+    )
+
+    args = parser.parse_args()
+
+    if any(size < 5 or size > 30 for size in args.sizes):
+        parser.error("Grid sizes must be between 5 and 30")
+    if any(size < 10000 or size > 1000000 for size in args.lexicon_sizes):
+        parser.error("Lexicon sizes must be between 10000 and 1000000")
+    if args.puzzles < 1:
+        parser.error("At least one puzzle per scenario is required")
+    if args.repeats < 1:
+        parser.error("At least one repeat per scenario is required")
+    if args.check and args.update_baseline:
+        parser.error("--check and --update-baseline cannot be used together")
+    if args.tolerance < 0 or args.p99_tolerance < 0:
+        parser.error("Tolerances must be non-negative")
+
+    return args
+
+
+def run_regression_gate(args) -> int:
+    """Run the fixed regression matrix; return the process exit code."""
+    gate = RegressionGate(tolerance=args.tolerance, p99_tolerance=args.p99_tolerance,
+                          calibrate=not args.no_calibrate)
+
+    if args.update_baseline:
+        document = gate.run_matrix()
+        print(RegressionGate.format_results(document))
+        RegressionGate.save_baseline(document, args.update_baseline)
+        print(f"\nBaseline updated: {args.update_baseline}")
+        return 0
+
+    if not os.path.exists(args.check):
+        print(f"Baseline not found: {args.check}", file=sys.stderr)
+        return 2
+
+    current, regressions = gate.check(args.check, args.output)
+    print(RegressionGate.format_results(current))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.check}:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+
+    print(f"\nNo regressions against {args.check}")
+    return 0
+
+
+def main():
+    """Run the benchmark matrix and report the results."""
+    args = parse_args()
+    # Generator warnings about failed attempts are expected and would flood the output
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.CRITICAL,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if args.check or args.update_baseline:
+        sys.exit(run_regression_gate(args))
+
+    runner = BenchmarkRunner(seed=args.seed, lexicon_file=args.lexicon_file,
+                             max_attempts=args.max_attempts, repeats=args.repeats)
+    scenarios = BenchmarkRunner.build_matrix(args.types, args.sizes,
+                                             args.lexicon_sizes, args.puzzles)
+    results = runner.run(scenarios)
+
+    print(BenchmarkRunner.format_table(results))
+    print(f"\nMax RSS: {BenchmarkRunner.max_rss_kb()} KB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'seed': args.seed,
+                'lexicon_file': args.lexicon_file,
+                'results': [result.to_dict() for result in results]
+            }, f, indent=2)
+
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+from typing import List, Dict, Optional, Tuple
+import gc
+import json
+import logging
+import statistics
+import time
+from benchmarks.runner import BenchmarkRunner, BenchmarkResult
+
+
+class RegressionGate:
+    """
+    Esegue una matrice fissa e seminata di scenari e confronta throughput e latenza
+    con una baseline salvata, segnalando gli scenari che peggiorano oltre la tolleranza.
+    """
+
+    SEED = 1234
+    GENERATOR_TYPES = ['type_a', 'type_b', 'type_c', 'hidden']
+    GRID_SIZES = [10, 15, 20]
+    LEXICON_SIZES = [10000, 50000]
+    PUZZLES = 10
+    REPEATS = 5
+    # type_b non completa griglie 10x10 (manca una parola iniziale lunga): lo scenario
+    # avrebbe successo 0% e tempi che non misurano nulla
+    EXCLUDED_SCENARIOS = [('type_b', 10)]
+    # Metriche riportate come mediana fra le ripetizioni
+    MEDIAN_FIELDS = ['successes', 'success_rate', 'puzzles_per_sec', 'p50_ms', 'p99_ms',
+                     'mean_ms', 'candidates_per_puzzle']
+    # Scarto assoluto ammesso sulle latenze: sotto il millisecondo conta solo il rumore
+    LATENCY_SLACK_MS = 1.0
+
+    def __init__(self, tolerance: float = 0.5, p99_tolerance: float = 1.0,
+                 success_tolerance: float = 0.1, calibrate: bool = True):
+        self.tolerance = tolerance
+        self.p99_tolerance = p99_tolerance
+        self.success_tolerance = success_tolerance
+        self.calibrate = calibrate
+
+    @staticmethod
+    def measure_calibration(rounds: int = 5) -> float:
+        """
+        Misura (in secondi, migliore di più giri) un carico Python fisso, usato per
+        normalizzare i tempi tra macchine diverse.
+        """
+        words = [f"{i * 7919 % 100003:06d}" for i in range(20000)]
+        best = float('inf')
+        gc_enabled = gc.isenabled()
+        # Il garbage collector dipende dagli oggetti vivi (es. il lessico): va escluso
+        gc.disable()
+        try:
+            for _ in range(rounds):
+                start = time.perf_counter()
+                for _ in range(5):
+                    index = {}
+                    for word in words:
+                        key = (len(word), word[2])
+                        if key in index:
+                            index[key] += 1
+                        else:
+                            index[key] = 1
+                    sorted(words)
+                best = min(best, time.perf_counter() - start)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return best
+
+    def run_matrix(self) -> Dict:
+        """
+        Esegue la matrice fissa e restituisce un documento confrontabile con la baseline.
+        """
+        runner = BenchmarkRunner(seed=self.SEED, memory_samples=0)
+        scenarios = [scenario for scenario in
+                     BenchmarkRunner.build_matrix(self.GENERATOR_TYPES, self.GRID_SIZES,
+                                                  self.LEXICON_SIZES, self.PUZZLES)
+                     if (scenario.generator_type, scenario.grid_size) not in self.EXCLUDED_SCENARIOS]
+        calibrations = [self.measure_calibration()]
+        runs: Dict[str, List[BenchmarkResult]] = {}
+        # Le ripetizioni percorrono l'intera matrice, così un periodo di rallentamento
+        # della macchina non penalizza tutte le misure dello stesso scenario; la
+        # calibrazione è ripetuta con loro e riassunta anch'essa con la mediana
+        for _ in range(self.REPEATS):
+            for result in runner.run(scenarios):
+                runs.setdefault(result.scenario, []).append(result)
+            calibrations.append(self.measure_calibration())
+        return {
+            'seed': self.SEED,
+            'calibration_sec': statistics.median(calibrations),
+            'results': {name: self.median_result(results) for name, results in runs.items()}
+        }
+
+    @classmethod
+    def median_result(cls, results: List[BenchmarkResult]) -> Dict:
+        """
+        Riassume le ripetizioni di uno scenario con la mediana di ogni metrica: un singolo
+        passaggio disturbato non sposta il risultato.
+        """
+        document = results[0].to_dict()
+        for field in cls.MEDIAN_FIELDS:
+            document[field] = statistics.median(getattr(result, field) for result in results)
+        return document
+
+    @staticmethod
+    def load_baseline(path: str) -> Dict:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def save_baseline(document: Dict, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+            f.write('\n')
+        logging.info(f"Baseline written to {path}")
+
+    def compare(self, baseline: Dict, current: Dict) -> List[str]:
+        """
+        Confronta i risultati correnti con la baseline e restituisce le regressioni trovate.
+        """
+        speed_factor = 1.0
+        if self.calibrate and baseline.get('calibration_sec') and current.get('calibration_sec'):
+            speed_factor = current['calibration_sec'] / baseline['calibration_sec']
+
+        regressions = []
+        for name, expected in sorted(baseline['results'].items()):
+            actual = current['results'].get(name)
+            if actual is None:
+                regressions.append(f"{name}: scenario missing from current run")
+                continue
+
+            if actual['success_rate'] < expected['success_rate'] - self.success_tolerance:
+                regressions.append(f"{name}: success rate {actual['success_rate']:.0%} "
+                                   f"< baseline {expected['success_rate']:.0%}")
+
+            # Il lavoro è deterministico: più candidati considerati è una regressione certa
+            expected_candidates = expected.get('candidates_per_puzzle')
+            if (expected_candidates and
+                    actual['candidates_per_puzzle'] > expected_candidates * (1 + self.tolerance)):
+                regressions.append(f"{name}: {actual['candidates_per_puzzle']:.0f} candidates/puzzle "
+                                   f"> baseline {expected_candidates:.0f}")
+
+            expected_throughput = expected['puzzles_per_sec'] / speed_factor
+            if (expected_throughput > 0 and
+                    actual['puzzles_per_sec'] < expected_throughput * (1 - self.tolerance)):
+                regressions.append(f"{name}: {actual['puzzles_per_sec']:.2f} puzzles/s "
+                                   f"< expected {expected_throughput:.2f}")
+
+            for key, tolerance in (('p50_ms', self.tolerance), ('p99_ms', self.p99_tolerance)):
+                expected_latency = expected[key] * speed_factor
+                if actual[key] > expected_latency * (1 + tolerance) + self.LATENCY_SLACK_MS:
+                    regressions.append(f"{name}: {key} {actual[key]:.1f} "
+                                       f"> expected {expected_latency:.1f}")
+
+        return regressions
+
+    def check(self, baseline_path: str,
+              output_path: Optional[str] = None) -> Tuple[Dict, List[str]]:
+        """
+        Esegue la matrice, opzionalmente salva i risultati e li confronta con la baseline.
+        Restituisce i risultati e le regressioni trovate.
+        """
+        baseline = self.load_baseline(baseline_path)
+        current = self.run_matrix()
+        if output_path:
+            self.save_baseline(current, output_path)
+        return current, self.compare(baseline, current)
+
+    @staticmethod
+    def format_results(document: Dict) -> str:
+        results = [BenchmarkResult(**result) for result in document['results'].values()]
+        return BenchmarkRunner.format_table(results)
@@ -0,0 +1,222 @@
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional
+import gc
+import logging
+import random
+import resource
+import time
+import tracemalloc
+from main import create_generator
+from utils.lexicon_index import LexiconIndex
+from utils.lexicon_utils import LexiconUtils
+from utils.metrics import GenerationMetrics
+
+
+@dataclass
+class BenchmarkScenario:
+    generator_type: str
+    grid_size: int
+    lexicon_size: int
+    puzzles: int = 20
+
+    @property
+    def name(self) -> str:
+        return f"{self.generator_type}-s{self.grid_size}-l{self.lexicon_size}"
+
+
+@dataclass
+class BenchmarkResult:
+    scenario: str
+    generator_type: str
+    grid_size: int
+    lexicon_size: int
+    puzzles: int
+    successes: int
+    success_rate: float
+    puzzles_per_sec: float
+    p50_ms: float
+    p99_ms: float
+    mean_ms: float
+    peak_memory_kb: float
+    lexicon_memory_kb: float
+    candidates_per_puzzle: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class BenchmarkRunner:
+    """
+    Esegue i generatori su lessici sintetici (o esportati) senza database,
+    misurando throughput, latenza, tasso di successo e memoria di picco.
+    Ogni esecuzione è seminata e quindi riproducibile: a parità di seed il lavoro svolto
+    (ad esempio i candidati considerati) è identico e varia solo il tempo misurato.
+    """
+
+    def __init__(self, seed: int = 0, lexicon_file: Optional[str] = None,
+                 max_attempts: int = 3, memory_samples: int = 3, repeats: int = 1):
+        self.seed = seed
+        self.lexicon_file = lexicon_file
+        self.max_attempts = max_attempts
+        self.memory_samples = memory_samples
+        self.repeats = repeats
+        self.metrics = GenerationMetrics()
+        self._lexicons: Dict[int, List[Dict]] = {}
+        self._lexicon_memory: Dict[int, float] = {}
+        self._file_lexicon: Optional[List[Dict]] = None
+
+    @staticmethod
+    def build_matrix(generator_types: List[str], grid_sizes: List[int],
+                     lexicon_sizes: List[int], puzzles: int) -> List[BenchmarkScenario]:
+        """
+        Costruisce la matrice di scenari (tipo x dimensione griglia x dimensione lessico).
+        """
+        return [BenchmarkScenario(generator_type, grid_size, lexicon_size, puzzles)
+                for lexicon_size in lexicon_sizes
+                for generator_type in generator_types
+                for grid_size in grid_sizes]
+
+    @staticmethod
+    def percentile(values: List[float], pct: float) -> float:
+        """
+        Percentile con interpolazione lineare.
+        """
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        position = (len(ordered) - 1) * pct / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    def _build_lexicon(self, size: int) -> List[Dict]:
+        if self.lexicon_file is None:
+            return LexiconUtils.generate_synthetic_lexicon(size, seed=self.seed)
+
+        if self._file_lexicon is None:
+            self._file_lexicon = LexiconUtils.load_lexicon_file(self.lexicon_file)
+        if size >= len(self._file_lexicon):
+            if size > len(self._file_lexicon):
+                logging.warning(f"Lexicon file has only {len(self._file_lexicon)} words, "
+                                f"requested {size}")
+            return list(self._file_lexicon)
+        return random.Random(self.seed).sample(self._file_lexicon, size)
+
+    def get_lexicon(self, size: int) -> List[Dict]:
+        """
+        Restituisce (e mette in cache) il lessico della dimensione richiesta.
+        """
+        if size not in self._lexicons:
+            tracemalloc.start()
+            self._lexicons[size] = self._build_lexicon(size)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._lexicon_memory[size] = peak / 1024
+        return self._lexicons[size]
+
+    def _make_generator(self, scenario: BenchmarkScenario, word_list: List[Dict]):
+        kwargs = {}
+        if scenario.generator_type == 'hidden':
+            hidden_length = min(8, scenario.grid_size)
+            kwargs = {
+                'hidden_word_length': hidden_length,
+                'min_words': min(5, hidden_length)
+            }
+        generator = create_generator(scenario.generator_type, scenario.grid_size, 75,
+                                     None, word_list, write_output=False, **kwargs)
+        generator.max_attempts = self.max_attempts
+        generator.metrics = self.metrics
+        return generator
+
+    def _run_puzzle(self, scenario: BenchmarkScenario, word_list: List[Dict], index: int) -> bool:
+        random.seed(f"{self.seed}:{scenario.name}:{index}")
+        generator = self._make_generator(scenario, word_list)
+        return "Unable to generate" not in generator.generate_crossword()
+
+    def _timed_pass(self, scenario: BenchmarkScenario, word_list: List[Dict]):
+        gc.collect()
+        latencies = []
+        successes = 0
+        started = time.perf_counter()
+        for i in range(scenario.puzzles):
+            puzzle_start = time.perf_counter()
+            if self._run_puzzle(scenario, word_list, i):
+                successes += 1
+            latencies.append((time.perf_counter() - puzzle_start) * 1000)
+        return time.perf_counter() - started, latencies, successes
+
+    def _total_candidates(self) -> float:
+        histograms = self.metrics.snapshot()['histograms'].get('step_candidates', [])
+        return sum(series['sum'] for series in histograms)
+
+    def run_scenario(self, scenario: BenchmarkScenario) -> BenchmarkResult:
+        """
+        Esegue uno scenario: i passaggi cronometrati (tenendo il più veloce fra le
+        ripetizioni), poi un campione con tracemalloc per la memoria di picco.
+        Ogni scenario parte da un indice del lessico nuovo: gli indici degli scenari
+        precedenti restano fuori dalla cache e dalla memoria durante le misure.
+        """
+        LexiconIndex.clear_cache()
+        lexicon = self.get_lexicon(scenario.lexicon_size)
+        word_list = LexiconUtils.filter_by_length(lexicon, scenario.grid_size)
+
+        self.metrics.reset()
+        elapsed, latencies, successes = self._timed_pass(scenario, word_list)
+        candidates = self._total_candidates()
+        for _ in range(self.repeats - 1):
+            repeat = self._timed_pass(scenario, word_list)
+            if repeat[0] < elapsed:
+                elapsed, latencies, successes = repeat
+
+        peak_memory = 0
+        for i in range(min(self.memory_samples, scenario.puzzles)):
+            tracemalloc.start()
+            self._run_puzzle(scenario, word_list, i)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peak_memory = max(peak_memory, peak)
+
+        result = BenchmarkResult(
+            scenario=scenario.name,
+            generator_type=scenario.generator_type,
+            grid_size=scenario.grid_size,
+            lexicon_size=scenario.lexicon_size,
+            puzzles=scenario.puzzles,
+            successes=successes,
+            success_rate=successes / scenario.puzzles if scenario.puzzles else 0.0,
+            puzzles_per_sec=successes / elapsed if elapsed > 0 else 0.0,
+            p50_ms=self.percentile(latencies, 50),
+            p99_ms=self.percentile(latencies, 99),
+            mean_ms=sum(latencies) / len(latencies) if latencies else 0.0,
+            peak_memory_kb=peak_memory / 1024,
+            lexicon_memory_kb=self._lexicon_memory[scenario.lexicon_size],
+            candidates_per_puzzle=candidates / scenario.puzzles if scenario.puzzles else 0.0
+        )
+        logging.info(f"{scenario.name}: {result.puzzles_per_sec:.2f} puzzles/s, "
+                     f"p50 {result.p50_ms:.1f} ms, p99 {result.p99_ms:.1f} ms, "
+                     f"success {result.success_rate:.0%}")
+        return result
+
+    def run(self, scenarios: List[BenchmarkScenario]) -> List[BenchmarkResult]:
+        return [self.run_scenario(scenario) for scenario in scenarios]
+
+    @staticmethod
+    def max_rss_kb() -> int:
+        """
+        Resident set size massimo del processo (KB su Linux).
+        """
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    @staticmethod
+    def format_table(results: List[BenchmarkResult]) -> str:
+        """
+        Formatta i risultati come tabella di testo.
+        """
+        header = (f"{'scenario':<28} {'ok%':>5} {'puz/s':>9} {'p50 ms':>9} "
+                  f"{'p99 ms':>9} {'peak KB':>10} {'lex KB':>10}")
+        lines = [header, '-' * len(header)]
+        for r in results:
+            lines.append(f"{r.scenario:<28} {r.success_rate * 100:>5.0f} {r.puzzles_per_sec:>9.2f} "
+                         f"{r.p50_ms:>9.1f} {r.p99_ms:>9.1f} {r.peak_memory_kb:>10.0f} "
+                         f"{r.lexicon_memory_kb:>10.0f}")
+        return '\n'.join(lines)
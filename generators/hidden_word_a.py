@@ -1,3 +1,5 @@
+from array import array
+from collections import Counter
 from base.hidden_word_generator import HiddenWordGenerator
 import random
 import logging
@@ -7,26 +9,99 @@ from typing import Dict, Tuple, Optional
 class HiddenWordAGenerator(HiddenWordGenerator):
     """Implementazione specifica del generatore di cruciverba con parola nascosta."""
 
-    def __init__(self, grid_size=15, cell_size=75, db_config=None, max_attempts=3):
-        super().__init__(grid_size, cell_size, db_config, max_attempts)
+    def __init__(self, grid_size=15, cell_size=75, db_config=None, max_attempts=3,
+                 word_list=None, write_output=True):
+        super().__init__(grid_size, cell_size, db_config, max_attempts, word_list, write_output)
+        # Se True la scelta della parola nascosta privilegia quelle con più righe fattibili
+        self.weight_by_slack = False
 
     def get_crossword_type(self) -> str:
         return "hidden-word-a"
 
+    def crossing_counts(self) -> Dict[str, int]:
+        """
+        Per ogni lettera, numero di parole orizzontali (con posizione) che la incrociano
+        alla colonna chiave: le stesse considerate da find_intersecting_word.
+        """
+        return self.lexicon_index.crossing_counts(self.key_column, self.grid_size,
+                                                  (3, min(15, self.grid_size)))
+
+    def crossing_words(self) -> Dict[str, int]:
+        """
+        Per ogni lettera, numero di parole orizzontali distinte che la incrociano alla
+        colonna chiave.
+        """
+        return self.lexicon_index.crossing_words(self.key_column, self.grid_size,
+                                                 (3, min(15, self.grid_size)))
+
+    @staticmethod
+    def feasible_rows(hidden_word: str, crossing_words: Dict[str, int], key_column: int,
+                      grid_size: int) -> int:
+        """
+        Righe della parola nascosta riempibili con parole distinte: una lettera ripetuta
+        conta al più quante parole diverse la incrociano, esclusa la parola nascosta stessa.
+        """
+        length = len(hidden_word)
+        own = {hidden_word[pos] for pos in range(max(0, key_column + length - grid_size),
+                                                 min(length - 1, key_column) + 1)}
+        return sum(min(count, crossing_words.get(letter, 0) - (letter in own))
+                   for letter, count in Counter(hidden_word).items())
+
+    def hidden_word_candidates(self, word_length: int) -> Tuple[array, array]:
+        """
+        Id delle parole nascoste di lunghezza data con almeno min_words righe fattibili
+        (vedi feasible_rows) e numero di righe fattibili di ognuna.
+        Il risultato è calcolato una volta per lessico e configurazione.
+        """
+        def build() -> Tuple[array, array]:
+            crossing_words = self.crossing_words()
+            solutions = self.lexicon_index.solutions
+            word_ids, feasible_rows = array('I'), array('I')
+            for word_id in self.lexicon_index.by_length.get(word_length, ()):
+                rows = self.feasible_rows(solutions[word_id], crossing_words, self.key_column,
+                                          self.grid_size)
+                if rows >= self.min_words:
+                    word_ids.append(word_id)
+                    feasible_rows.append(rows)
+            return word_ids, feasible_rows
+
+        key = ('hidden_candidates', self.grid_size, self.key_column, word_length, self.min_words)
+        return self.lexicon_index.derived(key, build)
+
     def set_hidden_word(self, word_length: int) -> bool:
         """
         Seleziona e posiziona la parola nascosta nella colonna centrale.
+        Sono considerate solo parole con almeno min_words righe incrociabili.
         """
-        word_info = self.find_word((word_length, word_length))
-        if not word_info:
+        self.key_column = self.grid_size // 2
+        if word_length > self.grid_size:
+            logging.warning(f"Hidden word length {word_length} exceeds grid size {self.grid_size}")
+            return False
+
+        word_ids, feasible_rows = self.hidden_word_candidates(word_length)
+        self.count_candidates(len(word_ids))
+        index = self.lexicon_index
+        if index.available is not None:
+            # Parole escluse dal registro degli utilizzi
+            kept = [k for k, word_id in enumerate(word_ids) if index.available[word_id]]
+            word_ids = [word_ids[k] for k in kept]
+            feasible_rows = [feasible_rows[k] for k in kept]
+        if not word_ids:
             logging.warning(f"Could not find a suitable hidden word of length {word_length}")
             return False
 
+        if self.weight_by_slack:
+            weights = [rows - self.min_words + 1 for rows in feasible_rows]
+            word_id = random.choices(word_ids, weights)[0]
+        else:
+            word_id = word_ids[random.randrange(len(word_ids))]
+        word_info = self.word_list[word_id]
+
         self.hidden_word = word_info['solution']
-        self.key_column = self.grid_size // 2
 
         for i, letter in enumerate(self.hidden_word):
             self.grid[i][self.key_column] = letter
+        self.occupancy.place(self.hidden_word, 0, self.key_column, vertical=True)
 
         logging.info(f"Hidden word set: {self.hidden_word}")
         return True
@@ -35,23 +110,58 @@ class HiddenWordAGenerator(HiddenWordGenerator):
         """
         Trova una parola orizzontale che interseca la lettera data nella riga specificata.
         """
-        left_space = self.key_column
-        right_space = self.grid_size - self.key_column - 1
+        # Le parole candidate dipendono solo da dimensione, colonna chiave e lettera
+        nogood_key = ('hidden_row', self.grid_size, self.key_column, letter)
+        if self.is_nogood(nogood_key):
+            return None
+
+        word_ids, start_cols = self.intersecting_candidates(letter)
+        self.count_candidates(len(word_ids))
+        if not word_ids:
+            self.add_nogood(nogood_key)
+            return None
+        index = self.lexicon_index
+        k = index.pick(word_ids)
+        if k is None:
+            return None
+        # Le righe hanno parole distinte: una lettera ripetuta non riusa la stessa parola
+        used = {word.text for word in self.placed_words}
+        used.add(self.hidden_word)
+        if index.solutions[word_ids[k]] in used:
+            allowed = [k for k, word_id in enumerate(word_ids)
+                       if index.solutions[word_id] not in used and index.is_available(word_id)]
+            if not allowed:
+                return None
+            k = random.choice(allowed)
+        return self.word_list[word_ids[k]], start_cols[k]
+
+    def intersecting_candidates(self, letter: str) -> Tuple[array, array]:
+        """
+        Id delle parole orizzontali che incrociano la colonna chiave con la lettera data e
+        colonna iniziale di ognuna (una coppia per ogni posizione possibile).
+        Il risultato è calcolato una volta per lessico, configurazione e lettera.
+        """
+        def build() -> Tuple[array, array]:
+            left_space = self.key_column
+            right_space = self.grid_size - self.key_column - 1
 
-        min_length = max(3, 2)
-        max_length = min(15, left_space + right_space + 1)
+            min_length = max(3, 2)
+            max_length = min(15, left_space + right_space + 1)
 
-        matching_words = []
-        for word in self.word_list:
-            word_text = word['solution']
-            if not (min_length <= len(word_text) <= max_length):
-                continue
+            word_ids, start_cols = array('I'), array('I')
+            for word_id, word_text in enumerate(self.lexicon_index.solutions):
+                if not (min_length <= len(word_text) <= max_length):
+                    continue
 
-            for start_col in range(max(0, self.key_column - len(word_text) + 1),
-                                   min(self.grid_size - len(word_text) + 1, self.key_column + 1)):
-                intersection_pos = self.key_column - start_col
-                if (intersection_pos < len(word_text) and
-                        word_text[intersection_pos] == letter):
-                    matching_words.append((word, start_col))
+                for start_col in range(max(0, self.key_column - len(word_text) + 1),
+                                       min(self.grid_size - len(word_text) + 1,
+                                           self.key_column + 1)):
+                    intersection_pos = self.key_column - start_col
+                    if (intersection_pos < len(word_text) and
+                            word_text[intersection_pos] == letter):
+                        word_ids.append(word_id)
+                        start_cols.append(start_col)
+            return word_ids, start_cols
 
-        return random.choice(matching_words) if matching_words else None
+        key = ('hidden_row_words', self.grid_size, self.key_column, letter)
+        return self.lexicon_index.derived(key, build)
@@ -0,0 +1,117 @@
+from typing import Dict, List, Union
+import importlib
+import logging
+
+# Generatori predefiniti: risolti solo quando richiesti, così l'avvio della CLI
+# non importa moduli (e driver del database) che non verranno usati
+BUILTIN_GENERATORS = {
+    'type_a': 'generators.type_a:TypeACrossword',
+    'type_b': 'generators.type_b:TypeBCrossword',
+    'type_c': 'generators.type_c:TypeCCrossword',
+    'hidden': 'generators.hidden_word_a:HiddenWordAGenerator',
+    'template': 'generators.template_fill:TemplateFillGenerator',
+    'sparse': 'generators.sparse:SparseCrosswordGenerator'
+}
+
+# Gruppo di entry point con cui i plugin registrano nuovi tipi
+ENTRY_POINT_GROUP = 'crossword.generators'
+
+
+class GeneratorRegistry:
+    """
+    Registro dei tipi di generatore, risolti in modo lazy per nome.
+    Un tipo è registrato come classe oppure come riferimento "modulo:Classe".
+    """
+
+    def __init__(self, builtins: Dict[str, str] = None):
+        self._targets: Dict[str, Union[str, type]] = dict(builtins or {})
+        self._entry_points_loaded = False
+        self._by_crossword_type: Dict[str, type] = {}
+
+    def register(self, name: str, target: Union[str, type]) -> None:
+        """
+        Registra (o sostituisce) un tipo di generatore.
+        """
+        self._targets[name] = target
+        self._by_crossword_type.clear()
+
+    def _load_entry_points(self) -> None:
+        if self._entry_points_loaded:
+            return
+        self._entry_points_loaded = True
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            return
+
+        try:
+            found = entry_points(group=ENTRY_POINT_GROUP)
+        except TypeError:
+            # Python < 3.10: entry_points() restituisce un dizionario per gruppo
+            found = entry_points().get(ENTRY_POINT_GROUP, [])
+
+        for entry_point in found:
+            if entry_point.name in self._targets:
+                logging.warning(f"Ignoring plugin generator '{entry_point.name}': "
+                                f"name already registered")
+                continue
+            self._targets[entry_point.name] = entry_point.value
+
+    def is_registered(self, name: str) -> bool:
+        """
+        Verifica un nome; gli entry point vengono letti solo per nomi non predefiniti.
+        """
+        if name in self._targets:
+            return True
+        self._load_entry_points()
+        return name in self._targets
+
+    def names(self) -> List[str]:
+        """
+        Elenca tutti i tipi disponibili, plugin inclusi.
+        """
+        self._load_entry_points()
+        return list(self._targets)
+
+    def get(self, name: str) -> type:
+        """
+        Restituisce la classe del generatore, importandone il modulo al primo utilizzo.
+        """
+        if not self.is_registered(name):
+            raise ValueError(f"Invalid generator type: {name}")
+
+        target = self._targets[name]
+        if isinstance(target, str):
+            module_name, _, class_name = target.partition(':')
+            module = importlib.import_module(module_name)
+            target = getattr(module, class_name)
+            self._targets[name] = target
+        return target
+
+    def for_crossword_type(self, crossword_type: str) -> type:
+        """
+        Classe del generatore che produce il crossword_type indicato (il campo di
+        crossword.json), ad esempio 'hidden-word-a' per il tipo 'hidden'.
+        """
+        generator_class = self._by_crossword_type.get(crossword_type)
+        if generator_class is not None:
+            return generator_class
+
+        for name in self.names():
+            generator_class = self.get(name)
+            # get_crossword_type restituisce una costante: basta un'istanza non inizializzata
+            found = generator_class.get_crossword_type(object.__new__(generator_class))
+            self._by_crossword_type[found] = generator_class
+            if found == crossword_type:
+                return generator_class
+        raise ValueError(f"Unknown crossword type: {crossword_type}")
+
+
+generator_registry = GeneratorRegistry(BUILTIN_GENERATORS)
+
+
+def register_generator(name: str, target: Union[str, type]) -> None:
+    """
+    Registra un tipo di generatore nel registro di default.
+    """
+    generator_registry.register(name, target)
@@ -0,0 +1,170 @@
+from typing import List, Optional, Set, Tuple
+import logging
+import random
+from base.base_generator import BaseCrosswordGenerator
+from base.sparse_grid import SparseGrid, SparseOccupancy
+
+
+class SparseCrosswordGenerator(BaseCrosswordGenerator):
+    """
+    Generatore per griglie grandi e sparse (fino a qualche centinaio di celle per lato).
+    Griglia e mappa di occupazione sono dizionari, quindi memoria e tempo crescono con il
+    numero di parole piazzate e non con l'area: a partire da una parola centrale, ogni lettera
+    piazzata è un possibile incrocio per una nuova parola perpendicolare.
+    """
+
+    def __init__(self, grid_size=15, cell_size=75, db_config=None, max_attempts=3,
+                 word_list=None, write_output=True):
+        super().__init__(grid_size, cell_size, db_config, max_attempts, word_list, write_output)
+        self.target_words = max(5, grid_size)
+        self.min_length = 4
+        self.max_length = 12
+        # Parole provate per lunghezza a ogni incrocio
+        self.tries_per_length = 4
+
+    def get_crossword_type(self) -> str:
+        return "sparse"
+
+    def create_grid(self):
+        return SparseGrid()
+
+    def create_occupancy(self):
+        return SparseOccupancy(self.grid_size)
+
+    def compute_density(self):
+        bounds = self.occupancy.bounds()
+        if bounds is None:
+            return 0.0
+        min_row, min_col, max_row, max_col = bounds
+        area = (max_row - min_row + 1) * (max_col - min_col + 1)
+        return len(self.occupancy.letters) / area
+
+    def place_first_word(self) -> bool:
+        """
+        Posiziona la prima parola orizzontalmente al centro della griglia.
+        """
+        first_word_info = self.find_word((self.min_length, min(self.max_length, self.grid_size)))
+        if not first_word_info:
+            logging.warning("Could not find suitable first word")
+            return False
+
+        start_row = self.grid_size // 2
+        start_col = (self.grid_size - len(first_word_info['solution'])) // 2
+        return self.place_word(first_word_info, start_row, start_col)
+
+    def grow_words(self) -> bool:
+        """
+        Aggiunge parole perpendicolari sugli incroci liberi, scelti a caso, fino a
+        target_words parole o all'esaurimento degli incroci.
+        """
+        first_word = self.placed_words[0]
+        used = {first_word.text}
+        open_cells = self._word_cells(first_word.y, first_word.x, len(first_word.text), True)
+
+        while open_cells and len(self.placed_words) < self.target_words:
+            # Estrazione casuale in O(1): scambio con l'ultimo elemento
+            i = random.randrange(len(open_cells))
+            open_cells[i], open_cells[-1] = open_cells[-1], open_cells[i]
+            row, col, vertical = open_cells.pop()
+
+            placed = self.place_crossing_word(row, col, vertical, used)
+            if placed is not None:
+                start_row, start_col, length = placed
+                open_cells.extend(cell for cell in self._word_cells(start_row, start_col, length,
+                                                                    not vertical)
+                                  if cell[:2] != (row, col))
+
+        return len(self.placed_words) >= self.target_words
+
+    @staticmethod
+    def _word_cells(row: int, col: int, length: int,
+                    horizontal: bool) -> List[Tuple[int, int, bool]]:
+        """
+        Incroci offerti da una parola: le sue celle, con la direzione (verticale o no)
+        della parola che potrà attraversarle.
+        """
+        if horizontal:
+            return [(row, col + k, True) for k in range(length)]
+        return [(row + k, col, False) for k in range(length)]
+
+    def place_crossing_word(self, row: int, col: int, vertical: bool,
+                            used: Set[str]) -> Optional[Tuple[int, int, int]]:
+        """
+        Cerca e posiziona una parola che attraversa la cella nella direzione indicata.
+        Restituisce (riga, colonna, lunghezza) della parola piazzata, o None.
+        """
+        occupancy = self.occupancy
+        letter = occupancy.letters[(row, col)]
+        if occupancy.owner(row, col, vertical) is not None:
+            return None
+
+        index = self.lexicon_index
+        lengths = list(range(self.min_length, self.max_length + 1))
+        random.shuffle(lengths)
+        for length in lengths:
+            nogood_key = ('contains', length, letter)
+            if self.is_nogood(nogood_key):
+                continue
+            word_ids, offsets = index.containing(length, letter)
+            if not word_ids:
+                self.add_nogood(nogood_key)
+                continue
+
+            tries = min(self.tries_per_length, len(word_ids))
+            self.count_candidates(tries)
+            for _ in range(tries):
+                k = random.randrange(len(word_ids))
+                word_info = self.word_list[word_ids[k]]
+                if word_info['solution'] in used:
+                    continue
+                start_row = row - offsets[k] if vertical else row
+                start_col = col if vertical else col - offsets[k]
+                if self.place_word(word_info, start_row, start_col, vertical):
+                    used.add(word_info['solution'])
+                    return start_row, start_col, length
+        return None
+
+    def optimize_grid(self):
+        """
+        Ritaglia la griglia al rettangolo delle lettere, calcolato durante i posizionamenti.
+        """
+        bounds = self.occupancy.bounds()
+        if bounds is None:
+            logging.warning("No non-empty rows or columns found")
+            return
+
+        min_row, min_col, max_row, max_col = bounds
+        self.grid = self.grid.to_dense(list(range(min_row, max_row + 1)),
+                                       list(range(min_col, max_col + 1)))
+        for word in self.placed_words:
+            word.x -= min_col
+            word.y -= min_row
+        self.grid_size = len(self.grid)
+        self.invalidate_occupancy()
+
+    def generate_crossword(self) -> str:
+        """
+        Genera il cruciverba con target_words parole, con fino a max_attempts tentativi.
+        """
+        attempts = 0
+        while attempts < self.max_attempts:
+            try:
+                logging.info(f"Starting attempt {attempts + 1}")
+                self.reset_grid()
+
+                if (self.run_step('place_first_word', self.place_first_word) and
+                        self.run_step('grow_words', self.grow_words)):
+                    logging.info(f"Successfully generated crossword with "
+                                 f"{len(self.placed_words)} words")
+                    self.record_generation(attempts + 1, True)
+                    return self.format_result()
+                logging.warning(f"Placed {len(self.placed_words)} of {self.target_words} words")
+
+            except Exception as e:
+                logging.error(f"Error during attempt {attempts + 1}: {str(e)}")
+
+            attempts += 1
+
+        self.record_generation(attempts, False)
+        logging.error("Failed to generate crossword after all attempts")
+        return "Unable to generate crossword after multiple attempts"
@@ -0,0 +1,359 @@
+from typing import List, Dict, Tuple, Optional
+import logging
+import random
+import sys
+from base.base_generator import BaseCrosswordGenerator
+
+if sys.version_info >= (3, 10):
+    _popcount = int.bit_count
+else:
+    def _popcount(value: int) -> int:
+        return bin(value).count('1')
+
+
+class Slot:
+    """
+    Sequenza di celle bianche da riempire con una parola.
+    """
+
+    __slots__ = ('index', 'row', 'col', 'vertical', 'length', 'crossings', 'bitsets')
+
+    def __init__(self, index: int, row: int, col: int, vertical: bool, length: int):
+        self.index = index
+        self.row = row
+        self.col = col
+        self.vertical = vertical
+        self.length = length
+        # (posizione nello slot, slot incrociato, posizione nello slot incrociato)
+        self.crossings: List[Tuple[int, 'Slot', int]] = []
+        # Bitset per posizione e lettera delle parole della lunghezza dello slot
+        self.bitsets: List[Dict[str, int]] = []
+
+    def cells(self) -> List[Tuple[int, int]]:
+        if self.vertical:
+            return [(self.row + k, self.col) for k in range(self.length)]
+        return [(self.row, self.col + k) for k in range(self.length)]
+
+
+class TemplateFillGenerator(BaseCrosswordGenerator):
+    """
+    Generatore di cruciverba completi: riempie tutti gli slot di uno schema con caselle nere.
+    Il dominio di ogni slot è un bitset sulle parole della sua lunghezza; la ricerca alterna
+    la scelta dello slot più vincolato (MRV) e la propagazione della consistenza d'arco
+    (AC-3) sugli incroci, con backtracking limitato e ripartenze casuali.
+    """
+
+    BLACK = '#'
+
+    # Le parole di uno schema pieno sono affiancate per costruzione
+    strict_placement = False
+
+    def __init__(self, grid_size=15, cell_size=75, db_config=None, max_attempts=3,
+                 word_list=None, write_output=True):
+        super().__init__(grid_size, cell_size, db_config, max_attempts, word_list, write_output)
+        # Schema come lista di righe: '#' casella nera, '.' casella da riempire, lettera fissa
+        self.template: Optional[List[str]] = None
+        self.black_ratio = 0.16
+        self.min_slot_length = 3
+        self.max_slot_length = 9
+        self.max_nodes = 2000
+        self.max_candidates = 40
+        self._nodes = 0
+
+    def get_crossword_type(self) -> str:
+        return "template"
+
+    def set_template(self, template: List[str]) -> None:
+        """
+        Imposta lo schema da riempire; la dimensione della griglia diventa quella dello schema.
+        """
+        rows = [row.strip() for row in template if row.strip()]
+        if not rows or any(len(row) != len(rows) for row in rows):
+            raise ValueError("Template must be a non-empty square grid")
+        self.template = [row.upper() for row in rows]
+        self.grid_size = len(rows)
+        self.reset_grid()
+
+    def make_template(self, size: int, rng=random) -> List[str]:
+        """
+        Crea uno schema casuale con simmetria centrale: caselle nere fino a black_ratio,
+        slot lunghi tra min_slot_length e max_slot_length, nessuna casella bianca isolata.
+        """
+        white = [[True] * size for _ in range(size)]
+
+        def short_run(line: List[bool]) -> bool:
+            run = 0
+            for cell in line + [False]:
+                if cell:
+                    run += 1
+                else:
+                    if 0 < run < self.min_slot_length:
+                        return True
+                    run = 0
+            return False
+
+        def try_black(row: int, col: int) -> bool:
+            pair = {(row, col), (size - 1 - row, size - 1 - col)}
+            if not all(white[r][c] for r, c in pair):
+                return False
+            for r, c in pair:
+                white[r][c] = False
+            if any(short_run(white[r]) or short_run([line[c] for line in white]) for r, c in pair):
+                for r, c in pair:
+                    white[r][c] = True
+                return False
+            return True
+
+        cells = [(r, c) for r in range(size) for c in range(size)]
+        rng.shuffle(cells)
+        blacks = 0
+        target = int(size * size * self.black_ratio)
+        for row, col in cells:
+            if blacks >= target:
+                break
+            if try_black(row, col):
+                blacks += 2 if (row, col) != (size - 1 - row, size - 1 - col) else 1
+
+        # Spezza gli slot troppo lunghi
+        for _ in range(2):
+            for row, col in cells:
+                if white[row][col] and (
+                        self._run_length(white[row], col) > self.max_slot_length or
+                        self._run_length([line[col] for line in white], row) > self.max_slot_length):
+                    try_black(row, col)
+
+        return [''.join('.' if cell else self.BLACK for cell in line) for line in white]
+
+    @staticmethod
+    def _run_length(line: List[bool], index: int) -> int:
+        start = index
+        while start > 0 and line[start - 1]:
+            start -= 1
+        end = index
+        while end + 1 < len(line) and line[end + 1]:
+            end += 1
+        return end - start + 1
+
+    def find_slots(self, template: List[str]) -> List[Slot]:
+        """
+        Trova gli slot orizzontali e verticali (sequenze di almeno due caselle bianche)
+        e i loro incroci.
+        """
+        size = len(template)
+        slots: List[Slot] = []
+        by_cell: Dict[Tuple[int, int], Tuple[Slot, int]] = {}
+
+        for vertical in (False, True):
+            for line in range(size):
+                cells = [(k, line) if vertical else (line, k) for k in range(size)]
+                k = 0
+                while k < size:
+                    start = k
+                    while k < size and template[cells[k][0]][cells[k][1]] != self.BLACK:
+                        k += 1
+                    if k - start >= 2:
+                        row, col = cells[start]
+                        slot = Slot(len(slots), row, col, vertical, k - start)
+                        slots.append(slot)
+                        for pos, cell in enumerate(slot.cells()):
+                            other = by_cell.get(cell)
+                            if other is None:
+                                by_cell[cell] = (slot, pos)
+                                continue
+                            other_slot, other_pos = other
+                            slot.crossings.append((pos, other_slot, other_pos))
+                            other_slot.crossings.append((other_pos, slot, pos))
+                    k += 1
+        return slots
+
+    def fill_template(self) -> bool:
+        """
+        Riempie lo schema (o uno schema casuale della dimensione della griglia).
+        """
+        template = self.template or self.make_template(self.grid_size)
+        slots = self.find_slots(template)
+        if not slots:
+            logging.warning("Template has no slots to fill")
+            return False
+
+        domains = self.initial_domains(template, slots)
+        self.count_candidates(sum(_popcount(domain) for domain in domains))
+
+        self._nodes = 0
+        if not all(domains) or not self._propagate(domains, slots):
+            logging.warning("Template has no consistent fill with this lexicon")
+            return False
+        solution = self._search(slots, domains, set())
+        if solution is None:
+            logging.warning(f"Template fill gave up after {self._nodes} nodes")
+            return False
+
+        index = self.lexicon_index
+        for slot in slots:
+            word_id = index.by_length[slot.length][solution[slot.index].bit_length() - 1]
+            if not self.place_word(self.word_list[word_id], slot.row, slot.col, slot.vertical):
+                return False
+        logging.info(f"Filled template with {len(slots)} words in {self._nodes} nodes")
+        return True
+
+    def initial_domains(self, template: List[str], slots: List[Slot]) -> List[int]:
+        """
+        Dominio iniziale di ogni slot: parole disponibili della sua lunghezza compatibili
+        con le lettere fisse dello schema (imposta anche i bitset degli slot).
+        """
+        index = self.lexicon_index
+        domains = []
+        available: Dict[int, int] = {}
+        for slot in slots:
+            slot.bitsets = index.letter_bitsets(slot.length)
+            if slot.length not in available:
+                available[slot.length] = index.available_bitset(slot.length)
+            domain = available[slot.length]
+            for pos, (row, col) in enumerate(slot.cells()):
+                letter = template[row][col]
+                if letter not in ('.', self.BLACK):
+                    domain &= slot.bitsets[pos].get(letter, 0)
+            domains.append(domain)
+        return domains
+
+    def _propagate(self, domains: List[int], changed: List[Slot]) -> bool:
+        """
+        AC-3 sugli incroci a partire dagli slot modificati; False se un dominio si svuota.
+        """
+        queue = list(changed)
+        queued = {slot.index for slot in queue}
+        while queue:
+            source = queue.pop()
+            queued.discard(source.index)
+            source_domain = domains[source.index]
+            for pos, target, target_pos in source.crossings:
+                # Parole del bersaglio con una lettera ancora possibile nell'incrocio
+                target_bitsets = target.bitsets[target_pos]
+                allowed = 0
+                for letter, words in source.bitsets[pos].items():
+                    if source_domain & words:
+                        allowed |= target_bitsets.get(letter, 0)
+                domain = domains[target.index]
+                narrowed = domain & allowed
+                if narrowed != domain:
+                    if not narrowed:
+                        return False
+                    domains[target.index] = narrowed
+                    if target.index not in queued:
+                        queued.add(target.index)
+                        queue.append(target)
+        return True
+
+    def _same_solution(self, length: int) -> Dict[int, int]:
+        """
+        Per le soluzioni ripetute nel lessico, bitset di tutte le voci con la stessa soluzione.
+        """
+        def build() -> Dict[int, int]:
+            index = self.lexicon_index
+            groups: Dict[str, List[int]] = {}
+            for bit, word_id in enumerate(index.by_length.get(length, ())):
+                groups.setdefault(index.solutions[word_id], []).append(bit)
+            repeated = {}
+            for bits in groups.values():
+                if len(bits) > 1:
+                    mask = sum(1 << bit for bit in bits)
+                    for bit in bits:
+                        repeated[bit] = mask
+            return repeated
+
+        return self.lexicon_index.derived(('same_solution', length), build)
+
+    def _candidates(self, domain: int) -> List[int]:
+        """
+        Fino a max_candidates parole del dominio (come indici di bit) in ordine casuale.
+        """
+        if _popcount(domain) <= self.max_candidates:
+            bits = []
+            while domain:
+                low = domain & -domain
+                bits.append(low.bit_length() - 1)
+                domain ^= low
+            random.shuffle(bits)
+            return bits
+
+        # Campionamento: primo bit acceso da una posizione casuale
+        size = domain.bit_length()
+        chosen = []
+        seen = set()
+        for _ in range(self.max_candidates * 4):
+            start = random.randrange(size)
+            rest = domain >> start
+            if not rest:
+                start, rest = 0, domain
+            bit = start + (rest & -rest).bit_length() - 1
+            if bit not in seen:
+                seen.add(bit)
+                chosen.append(bit)
+                if len(chosen) >= self.max_candidates:
+                    break
+        return chosen
+
+    def _search(self, slots: List[Slot], domains: List[int],
+                assigned: set) -> Optional[List[int]]:
+        """
+        Backtracking con scelta MRV (a parità, lo slot con più incroci) e AC-3 dopo ogni
+        assegnazione. Restituisce i domini risolti (un solo bit per slot) o None.
+        """
+        if len(assigned) == len(slots):
+            return domains
+
+        slot = min((s for s in slots if s.index not in assigned),
+                   key=lambda s: (_popcount(domains[s.index]), -len(s.crossings)))
+
+        for bit in self._candidates(domains[slot.index]):
+            self._nodes += 1
+            if self._nodes > self.max_nodes:
+                return None
+
+            word = 1 << bit
+            trial = list(domains)
+            trial[slot.index] = word
+            # La stessa soluzione non può comparire in due slot, anche da voci diverse
+            same_solution = self._same_solution(slot.length).get(bit, word)
+            changed = [slot]
+            duplicate = False
+            for other in slots:
+                if (other is not slot and other.length == slot.length and
+                        trial[other.index] & same_solution):
+                    trial[other.index] &= ~same_solution
+                    if not trial[other.index]:
+                        duplicate = True
+                        break
+                    changed.append(other)
+            if duplicate or not self._propagate(trial, changed):
+                continue
+
+            result = self._search(slots, trial, assigned | {slot.index})
+            if result is not None:
+                return result
+            if self._nodes > self.max_nodes:
+                return None
+        return None
+
+    def generate_crossword(self) -> str:
+        """
+        Riempie lo schema, ripartendo da capo (con un nuovo schema casuale se non
+        impostato) fino a max_attempts volte.
+        """
+        attempts = 0
+        while attempts < self.max_attempts:
+            try:
+                logging.info(f"Starting attempt {attempts + 1}")
+                self.reset_grid()
+                if self.run_step('fill_template', self.fill_template):
+                    logging.info(f"Successfully filled template with {len(self.placed_words)} words")
+                    self.record_generation(attempts + 1, True)
+                    return self.format_result()
+            except Exception as e:
+                logging.error(f"Error during attempt {attempts + 1}: {str(e)}")
+
+            attempts += 1
+
+        self.record_generation(attempts, False)
+        logging.error("Failed to fill template after all attempts")
+        return "Unable to generate crossword after multiple attempts"
@@ -60,24 +60,33 @@ class TypeACrossword(PuzzleCrosswordGenerator):
         Posiziona la quinta parola trovando spazi liberi nella terza parola.
         """
         free_letters = self.find_free_letters_in_vertical_word(self.placed_words[2])
+        index = self.lexicon_index
 
         for letter_info in free_letters:
-            available_space = letter_info['left_spaces'] + letter_info['right_spaces'] + 1
+            left_spaces = letter_info['left_spaces']
+            right_spaces = letter_info['right_spaces']
+            available_space = left_spaces + right_spaces + 1
             min_length = max(3, 3)
             max_length = min(available_space, self.grid_size)
 
             for length in range(min_length, max_length + 1):
-                matching_words = [
-                    word for word in self.word_list
-                    if len(word['solution']) == length and
-                       letter_info['letter'] in word['solution']
-                ]
-
-                for word in matching_words:
-                    intersection_index = word['solution'].index(letter_info['letter'])
-                    start_col = letter_info['col'] - intersection_index
-
-                    if self.place_word(word, letter_info['row'], start_col):
+                nogood_key = ('contains', length, letter_info['letter'])
+                if self.is_nogood(nogood_key):
+                    continue
+
+                # Ogni occorrenza della lettera è un possibile punto di incrocio
+                word_ids, offsets = index.containing(length, letter_info['letter'])
+                self.count_candidates(len(word_ids))
+                if not word_ids:
+                    self.add_nogood(nogood_key)
+                    continue
+
+                for word_id, offset in zip(word_ids, offsets):
+                    # L'allineamento deve restare nello spazio libero della riga
+                    if offset > left_spaces or length - 1 - offset > right_spaces:
+                        continue
+                    start_col = letter_info['col'] - offset
+                    if self.place_word(self.word_list[word_id], letter_info['row'], start_col):
                         return True
 
         return False
@@ -88,15 +97,14 @@ class TypeACrossword(PuzzleCrosswordGenerator):
         """
         second_word = self.placed_words[1]
         third_word = self.placed_words[2]
-        start_row_1 = self.placed_words[0].y
+        left_col = min(second_word.x, third_word.x)
+        distance = abs(second_word.x - third_word.x)
 
         same_row_letters = []
         for i in range(len(second_word.text)):
             second_word_row = second_word.y + i
-            if (second_word_row != start_row_1 and
-                    second_word_row >= third_word.y and
-                    second_word_row < third_word.y + len(third_word.text) and
-                    abs(second_word_row - start_row_1) > 1):
+            if (third_word.y <= second_word_row < third_word.y + len(third_word.text) and
+                    not self.occupancy.blocked(second_word_row, left_col + 1, distance - 1)):
                 third_word_index = second_word_row - third_word.y
                 same_row_letters.append({
                     'second_word_letter': second_word.text[i],
@@ -104,7 +112,7 @@ class TypeACrossword(PuzzleCrosswordGenerator):
                     'row': second_word_row,
                     'second_word_col': second_word.x,
                     'third_word_col': third_word.x,
-                    'distance': abs(second_word.x - third_word.x)
+                    'distance': distance
                 })
         return same_row_letters
 
@@ -140,43 +148,15 @@ class TypeACrossword(PuzzleCrosswordGenerator):
         Trova lettere utilizzabili per intersezioni nella parola verticale.
         """
         free_letters = []
+        occupancy = self.occupancy
         for i, letter in enumerate(vertical_word.text):
             row = vertical_word.y + i
             col = vertical_word.x
 
-            # Verifica spazio a sinistra
-            left_spaces = 0
-            for j in range(col - 1, -1, -1):
-                # Controlla se c'è una parola verticale
-                if any(word for word in self.placed_words
-                       if not word.is_horizontal and word.x == j):
-                    # Lascia almeno una cella di spazio
-                    if left_spaces == 0:
-                        left_spaces = -1  # Invalida questo spazio
-                    break
-                if (self.grid[row][j] == '_' and
-                        self.grid[row - 1][j] == '_' and
-                        self.grid[row + 1][j] == '_'):
-                    left_spaces += 1
-                else:
-                    break
-
-            # Verifica spazio a destra
-            right_spaces = 0
-            for j in range(col + 1, self.grid_size):
-                # Controlla se c'è una parola verticale
-                if any(word for word in self.placed_words
-                       if not word.is_horizontal and word.x == j):
-                    # Lascia almeno una cella di spazio
-                    if right_spaces == 0:
-                        right_spaces = -1  # Invalida questo spazio
-                    break
-                if (self.grid[row][j] == '_' and
-                        self.grid[row - 1][j] == '_' and
-                        self.grid[row + 1][j] == '_'):
-                    right_spaces += 1
-                else:
-                    break
+            # Spazio libero con le righe adiacenti vuote, letto dalla mappa di occupazione;
+            # le celle prima e dopo la parola sono verificate da can_place_word
+            left_spaces = occupancy.clear_run(row, col, 'left')
+            right_spaces = occupancy.clear_run(row, col, 'right')
 
             # Considera valido solo se c'è spazio sufficiente sia a destra che a sinistra
             if left_spaces > 0 and right_spaces > 0:
@@ -222,6 +202,10 @@ class TypeACrossword(PuzzleCrosswordGenerator):
         """
         Trova una parola che contiene una lettera specifica in una delle posizioni date.
         """
+        nogood_key = ('letter_at', tuple(length_range), letter, tuple(positions))
+        if self.is_nogood(nogood_key):
+            return None
+
         for pos in positions:
             for length in range(length_range[0], length_range[1] + 1):
                 if pos < length:
@@ -230,4 +214,6 @@ class TypeACrossword(PuzzleCrosswordGenerator):
                     word = self.find_word((length, length), ''.join(pattern))
                     if word:
                         return word
+
+        self.add_nogood(nogood_key)
         return None
\ No newline at end of file
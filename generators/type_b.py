@@ -1,3 +1,4 @@
+from array import array
 from typing import List, Dict, Tuple, Optional
 import random
 import logging
@@ -101,15 +102,11 @@ class TypeBCrossword(PuzzleCrosswordGenerator):
     def place_fifth_word(self) -> bool:
         """
         Posiziona la quinta parola orizzontalmente, intersecando la prima e la quarta parola.
-        Mantiene una distanza minima di una riga dalla seconda parola orizzontale.
         """
         first_word = self.placed_words[0]
-        second_word = self.placed_words[1]  # la parola orizzontale esistente
         fourth_word = self.placed_words[3]
-
-        # Calcola la zona di sicurezza intorno alla seconda parola
-        safety_zone_start = second_word.y - 1  # una riga sopra
-        safety_zone_end = second_word.y + 1  # una riga sotto
+        left_col = min(first_word.x, fourth_word.x)
+        distance = abs(fourth_word.x - first_word.x)
 
         # Trova le possibili righe per la quinta parola
         min_row = first_word.y + 2  # Almeno una riga di distanza dalla prima parola
@@ -117,8 +114,9 @@ class TypeBCrossword(PuzzleCrosswordGenerator):
 
         # Trova le intersezioni possibili
         for row in range(min_row, max_row + 1):
-            # Verifica che la riga corrente non sia nella zona di sicurezza
-            if safety_zone_start <= row <= safety_zone_end:
+            # Scarta le righe in cui il tratto tra i due incroci tocca altre parole
+            # (ad esempio quelle adiacenti alla seconda parola)
+            if self.occupancy.blocked(row, left_col + 1, distance - 1):
                 continue
 
             # Trova le lettere disponibili sulla prima e quarta parola in questa riga
@@ -127,31 +125,25 @@ class TypeBCrossword(PuzzleCrosswordGenerator):
             first_word_col = None
             fourth_word_col = None
 
-            # Controlla le intersezioni con la prima parola
-            if (first_word.y <= row < first_word.y + len(first_word.text)):
-                pos_in_word = row - first_word.y
-                first_word_letter = first_word.text[pos_in_word]
+            # Controlla le intersezioni con la prima e la quarta parola
+            if self.occupancy.owner(row, first_word.x, vertical=True) is first_word:
+                first_word_letter = self.grid[row][first_word.x]
                 first_word_col = first_word.x
 
-            # Controlla le intersezioni con la quarta parola
-            if (fourth_word.y <= row < fourth_word.y + len(fourth_word.text)):
-                pos_in_word = row - fourth_word.y
-                fourth_word_letter = fourth_word.text[pos_in_word]
+            if self.occupancy.owner(row, fourth_word.x, vertical=True) is fourth_word:
+                fourth_word_letter = self.grid[row][fourth_word.x]
                 fourth_word_col = fourth_word.x
 
             # Se abbiamo entrambe le intersezioni, cerca una parola adatta
             if first_word_letter and fourth_word_letter:
-                distance = abs(fourth_word_col - first_word_col)
                 word = self.find_double_intersection_word(
                     first_word_letter, fourth_word_letter,
                     distance, first_word_col, fourth_word_col
                 )
 
-                if word:
-                    # Verifica che la parola non interferisca con la zona di sicurezza
-                    start_col = min(first_word_col, fourth_word_col)
-                    if self.can_place_word(word['solution'], row, start_col, vertical=False):
-                        return self.place_word(word, row, start_col, vertical=False)
+                # place_word verifica adiacenze e celle prima e dopo la parola
+                if word and self.place_word(word, row, left_col, vertical=False):
+                    return True
 
         return False
 
@@ -161,16 +153,39 @@ class TypeBCrossword(PuzzleCrosswordGenerator):
         """
         Trova una parola che contiene una lettera in una delle posizioni specificate.
         """
-        matching_words = []
-        for word in self.word_list:
-            if not (length_range[0] <= len(word['solution']) <= length_range[1]):
-                continue
+        nogood_key = ('letter_in_range', tuple(length_range), letter, tuple(position_range))
+        if self.is_nogood(nogood_key):
+            return None
+
+        word_ids = self.letter_in_range_candidates(length_range, letter, position_range)
+        self.count_candidates(len(word_ids))
+        if not word_ids:
+            self.add_nogood(nogood_key)
+            return None
+        k = self.lexicon_index.pick(word_ids)
+        if k is None:
+            return None
+        return self.word_list[word_ids[k]]
+
+    def letter_in_range_candidates(self, length_range: Tuple[int, int], letter: str,
+                                   position_range: List[int]) -> array:
+        """
+        Id (senza ripetizioni) delle parole di lunghezza nell'intervallo con la lettera in
+        almeno una delle posizioni indicate, dall'indice per (lunghezza, posizione, lettera).
+        Il risultato è calcolato una volta per lessico e query.
+        """
+        index = self.lexicon_index
 
-            positions = [i for i, char in enumerate(word['solution']) if char == letter]
-            if any(pos in position_range for pos in positions):
-                matching_words.append(word)
+        def build() -> array:
+            word_ids = set()
+            for length in range(length_range[0], length_range[1] + 1):
+                for pos in position_range:
+                    if pos < length:
+                        word_ids.update(index.ids_with_letter(length, pos, letter))
+            return array('I', sorted(word_ids))
 
-        return random.choice(matching_words) if matching_words else None
+        key = ('letter_in_range', tuple(length_range), letter, tuple(position_range))
+        return index.derived(key, build)
 
     def find_double_intersection_word(self, first_letter: str,
                                       second_letter: str,
@@ -243,6 +258,10 @@ class TypeBCrossword(PuzzleCrosswordGenerator):
         """
         Trova una parola che contiene una lettera in una delle posizioni specificate.
         """
+        nogood_key = ('letter_at', tuple(length_range), letter, tuple(positions))
+        if self.is_nogood(nogood_key):
+            return None
+
         for pos in positions:
             for length in range(length_range[0], length_range[1] + 1):
                 if pos < length:
@@ -251,4 +270,6 @@ class TypeBCrossword(PuzzleCrosswordGenerator):
                     word = self.find_word((length, length), ''.join(pattern))
                     if word:
                         return word
+
+        self.add_nogood(nogood_key)
         return None
\ No newline at end of file
@@ -1,5 +1,5 @@
+from array import array
 from typing import List, Dict, Tuple, Optional
-import random
 import logging
 from base.puzzle_generator import PuzzleCrosswordGenerator
 
@@ -36,21 +36,25 @@ class TypeCCrossword(PuzzleCrosswordGenerator):
         first_letter = first_word.text[0]
 
         # Cerca una parola che finisce con la lettera necessaria
-        matching_words = []
         min_length = 4
         max_length = min(10, first_word.y)
 
-        for word in self.word_list:
-            if (min_length <= len(word['solution']) <= max_length and
-                    word['solution'][-1] == first_letter):
-                matching_words.append(word)
+        nogood_key = ('ends_with', min_length, max_length, first_letter)
+        if self.is_nogood(nogood_key):
+            return False
 
-        if not matching_words:
+        word_ids = self.ending_candidates(min_length, max_length, first_letter)
+        self.count_candidates(len(word_ids))
+        if not word_ids:
+            self.add_nogood(nogood_key)
             logging.warning("No suitable word found for second position")
             return False
 
         # Sceglie una parola casuale tra quelle trovate
-        second_word = random.choice(matching_words)
+        k = self.lexicon_index.pick(word_ids)
+        if k is None:
+            return False
+        second_word = self.word_list[word_ids[k]]
         word_length = len(second_word['solution'])
 
         # Calcola la posizione iniziale
@@ -75,26 +79,22 @@ class TypeCCrossword(PuzzleCrosswordGenerator):
 
         # Cerca parole adatte (lunghezza 6-10) che hanno la lettera di intersezione
         # in una delle prime tre posizioni
-        matching_words = []
-
-        for word in self.word_list:
-            word_length = len(word['solution'])
-            if 6 <= word_length <= 10:
-                # Controlla se la lettera di intersezione appare nelle prime tre posizioni
-                for pos in range(min(3, word_length)):
-                    if word['solution'][pos] == intersection_letter:
-                        matching_words.append((word, pos))
+        nogood_key = ('prefix_letter', 6, 10, 3, intersection_letter)
+        if self.is_nogood(nogood_key):
+            return False
 
-        if not matching_words:
+        word_ids, positions = self.prefix_letter_candidates(intersection_letter)
+        self.count_candidates(len(word_ids))
+        if not word_ids:
+            self.add_nogood(nogood_key)
             logging.warning("No suitable word found for third position")
             return False
 
-        # Prova a posizionare una delle parole trovate
-        random.shuffle(matching_words)
-
-        for word_info, intersection_pos in matching_words:
-            start_row = first_word.y - intersection_pos
-            start_col = first_word.x + intersection_index
+        # Prova a posizionare le parole trovate in ordine casuale
+        start_col = first_word.x + intersection_index
+        for k in self.lexicon_index.shuffled(word_ids):
+            word_info = self.word_list[word_ids[k]]
+            start_row = first_word.y - positions[k]
 
             word_length = len(word_info['solution'])
             if (start_row >= 0 and
@@ -117,24 +117,22 @@ class TypeCCrossword(PuzzleCrosswordGenerator):
         intersection_index = len(first_word.text) - 1
         intersection_letter = first_word.text[intersection_index]
 
-        matching_words = []
-
-        for word in self.word_list:
-            word_length = len(word['solution'])
-            if 6 <= word_length <= 10:
-                for pos in range(min(3, word_length)):
-                    if word['solution'][pos] == intersection_letter:
-                        matching_words.append((word, pos))
+        nogood_key = ('prefix_letter', 6, 10, 3, intersection_letter)
+        if self.is_nogood(nogood_key):
+            return False
 
-        if not matching_words:
+        word_ids, positions = self.prefix_letter_candidates(intersection_letter)
+        self.count_candidates(len(word_ids))
+        if not word_ids:
+            self.add_nogood(nogood_key)
             logging.warning("No suitable word found for fourth position")
             return False
 
-        random.shuffle(matching_words)
-
-        for word_info, intersection_pos in matching_words:
-            start_row = first_word.y - intersection_pos
-            start_col = first_word.x + intersection_index
+        # Prova a posizionare le parole trovate in ordine casuale
+        start_col = first_word.x + intersection_index
+        for k in self.lexicon_index.shuffled(word_ids):
+            word_info = self.word_list[word_ids[k]]
+            start_row = first_word.y - positions[k]
 
             word_length = len(word_info['solution'])
             if (start_row >= 0 and
@@ -181,39 +179,81 @@ class TypeCCrossword(PuzzleCrosswordGenerator):
 
             # Se abbiamo entrambe le intersezioni, cerca una parola adatta
             if third_word_letter and fourth_word_letter:
-                matching_words = []
-                distance = abs(fourth_word_col - third_word_col)
+                nogood_key = ('double_row', self.grid_size, third_word_col, fourth_word_col,
+                              third_word_letter, fourth_word_letter)
+                if self.is_nogood(nogood_key):
+                    continue
 
-                for word in self.word_list:
-                    word_text = word['solution']
-                    word_length = len(word_text)
+                word_ids, start_cols = self.double_crossing_candidates(
+                    third_word_col, third_word_letter, fourth_word_col, fourth_word_letter)
 
-                    # La parola deve essere abbastanza lunga da coprire entrambe le intersezioni
-                    if word_length < distance + 1:
-                        continue
+                # Prova a posizionare una delle parole trovate
+                self.count_candidates(len(word_ids))
+                if not word_ids:
+                    self.add_nogood(nogood_key)
+                for k in self.lexicon_index.shuffled(word_ids):
+                    if self.place_word(self.word_list[word_ids[k]], row, start_cols[k],
+                                       vertical=False):
+                        return True
 
-                    # Controlla tutte le possibili posizioni della parola
-                    for start_col in range(max(0, third_word_col - word_length + 1),
-                                           min(self.grid_size - word_length + 1, third_word_col + 1)):
+        return False
 
-                        # Calcola le posizioni relative nella parola
-                        third_pos = third_word_col - start_col
-                        fourth_pos = fourth_word_col - start_col
+    def ending_candidates(self, min_length: int, max_length: int, letter: str) -> array:
+        """
+        Id delle parole di lunghezza compresa tra min_length e max_length che finiscono
+        con la lettera data. Il risultato è calcolato una volta per lessico e query.
+        """
+        index = self.lexicon_index
 
-                        # Verifica se le lettere corrispondono in entrambe le posizioni
-                        if (0 <= third_pos < word_length and
-                                0 <= fourth_pos < word_length and
-                                word_text[third_pos] == third_word_letter and
-                                word_text[fourth_pos] == fourth_word_letter):
-                            matching_words.append((word, start_col))
+        def build() -> array:
+            word_ids = array('I')
+            for length in range(min_length, max_length + 1):
+                word_ids.extend(index.ids_with_letter(length, length - 1, letter))
+            return word_ids
 
-                # Prova a posizionare una delle parole trovate
-                random.shuffle(matching_words)
-                for word_info, start_col in matching_words:
-                    if self.place_word(word_info, row, start_col, vertical=False):
-                        return True
+        return index.derived(('ends_with', min_length, max_length, letter), build)
 
-        return False
+    def prefix_letter_candidates(self, letter: str) -> Tuple[array, array]:
+        """
+        Parole di 6-10 lettere con la lettera data in una delle prime tre posizioni, come
+        array paralleli (id parola, posizione): una coppia per ogni occorrenza.
+        Il risultato è calcolato una volta per lessico e lettera.
+        """
+        index = self.lexicon_index
+
+        def build() -> Tuple[array, array]:
+            word_ids, positions = array('I'), array('B')
+            for length in range(6, 11):
+                for pos in range(3):
+                    ids = index.ids_with_letter(length, pos, letter)
+                    word_ids.extend(ids)
+                    positions.extend([pos] * len(ids))
+            return word_ids, positions
+
+        return index.derived(('prefix_letter', 6, 10, 3, letter), build)
+
+    def double_crossing_candidates(self, third_col: int, third_letter: str,
+                                   fourth_col: int, fourth_letter: str) -> Tuple[List[int], List[int]]:
+        """
+        Parole orizzontali che stanno nella griglia e hanno le due lettere date nelle
+        colonne della terza e della quarta parola, con la colonna iniziale di ognuna
+        (una coppia per ogni allineamento possibile).
+        """
+        index = self.lexicon_index
+        distance = abs(fourth_col - third_col)
+        word_ids, start_cols = [], []
+        for length in range(distance + 1, self.grid_size + 1):
+            for start_col in range(max(0, third_col - length + 1),
+                                   min(self.grid_size - length + 1, third_col + 1)):
+                if not 0 <= fourth_col - start_col < length:
+                    continue
+                pattern = ['_'] * length
+                pattern[third_col - start_col] = third_letter
+                pattern[fourth_col - start_col] = fourth_letter
+                ids = index.candidates(length, ''.join(pattern))
+                word_ids.extend(ids)
+                start_cols.extend([start_col] * len(ids))
+        return word_ids, start_cols
 
     def find_word_with_letter(self, length_range: Tuple[int, int],
                               letter: str,
@@ -221,6 +261,10 @@ class TypeCCrossword(PuzzleCrosswordGenerator):
         """
         Trova una parola che contiene una lettera specifica in una delle posizioni date.
         """
+        nogood_key = ('letter_at', tuple(length_range), letter, tuple(positions))
+        if self.is_nogood(nogood_key):
+            return None
+
         for pos in positions:
             for length in range(length_range[0], length_range[1] + 1):
                 if pos < length:
@@ -229,4 +273,6 @@ class TypeCCrossword(PuzzleCrosswordGenerator):
                     word = self.find_word((length, length), ''.join(pattern))
                     if word:
                         return word
+
+        self.add_nogood(nogood_key)
         return None
\ No newline at end of file
@@ -1,13 +1,41 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
+import os
+import random
+import socket
 import sys
+import time
 import logging
-from typing import Dict, Any
-from generators.type_a import TypeACrossword
-from generators.type_b import TypeBCrossword
-from generators.type_c import TypeCCrossword
-from generators.hidden_word_a import HiddenWordAGenerator
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from generators.registry import generator_registry, BUILTIN_GENERATORS
+from utils.metrics import generation_metrics, PeriodicMetricsExporter
+from utils.lexicon_utils import LexiconUtils
+from utils.db_utils import DatabaseUtils
+from utils.lexicon_index import LexiconIndex
+from utils.memory_utils import MemoryUtils
+from utils.usage_ledger import UsageLedger
+
+# Largest board for the sparse generator, whose cost grows with the placed words
+MAX_SPARSE_SIZE = 1000
+
+# Options that are not part of the batch parameters saved in a checkpoint or a work queue
+BATCH_RUNTIME_ARGS = ('resume', 'checkpoint', 'queue', 'shard_size', 'lease_seconds',
+                      'work', 'merge', 'verbose')
+
+# Below this estimated probability of success within --max-attempts the CLI warns
+LOW_SUCCESS_PROBABILITY = 0.5
+
+# Trial attempts spent before generating when the lexicon alone does not decide feasibility
+FEASIBILITY_TRIALS = 5
+
+# CLI option and argument name of the parameters suggested by FeasibilityAnalyzer
+SUGGESTED_OPTIONS = {
+    'hidden_word_length': ('--hidden-length', 'hidden_length'),
+    'min_words': ('--min-words', 'min_words')
+}
 
 
 def setup_logging(verbose: bool) -> None:
@@ -29,10 +57,91 @@ def get_db_config() -> Dict[str, str]:
     }
 
 
+def export_metrics(args) -> None:
+    """Write the collected generation metrics to the requested files."""
+    try:
+        if args.metrics_json:
+            generation_metrics.write_json_snapshot(args.metrics_json)
+        if args.metrics_prom:
+            generation_metrics.write_prometheus_textfile(args.metrics_prom)
+    except OSError as e:
+        logging.error(f"Error exporting metrics: {str(e)}")
+
+
+def print_memory_report(args) -> None:
+    """Load the lexicon, build its index and print the memory breakdown."""
+    if args.lexicon_file:
+        word_list = LexiconUtils.load_lexicon_file(args.lexicon_file, args.size)
+    else:
+        word_list = DatabaseUtils.get_word_list_from_db(get_db_config(), args.size)
+    index = LexiconIndex.for_word_list(word_list)
+    index.build_all()
+    print(MemoryUtils.format_report(MemoryUtils.lexicon_report(word_list, index)))
+
+
+def run_service(args) -> None:
+    """Load the lexicon once and serve generation requests over HTTP."""
+    import asyncio
+    # Imported here: the service module imports create_generator from this file
+    from service.generation_service import GenerationService
+    from service.puzzle_pool import PuzzlePool
+    from utils.lexicon_sync import LexiconSync
+
+    max_size = 30
+    db_config = None
+    lexicon_sync = None
+    if args.lexicon_file:
+        word_list = LexiconUtils.load_lexicon_file(args.lexicon_file, max_size)
+    else:
+        db_config = get_db_config()
+        # Marked before loading, so edits made during the load reach the first refresh
+        lexicon_sync = LexiconSync(db_config, args.updated_column)
+        lexicon_sync.mark()
+        word_list = DatabaseUtils.get_word_list_from_db(db_config, max_size)
+
+    service = GenerationService(
+        word_list,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        warm_sizes=(args.size,),
+        db_config=db_config,
+        lexicon_sync=lexicon_sync,
+        max_length=max_size,
+        refresh_interval=args.refresh_interval
+    )
+
+    if args.pool:
+        service.pool = PuzzlePool(
+            args.pool,
+            word_list,
+            service.warm_lexicons,
+            target_depth=args.pool_depth,
+            workers=args.pool_workers,
+            db_config=db_config
+        )
+        for spec in args.pool_spec or []:
+            request = service.parse_request(json.loads(spec))
+            service.warm_lexicon(request['size'])
+            service.pool.register(request)
+
+    exporter = None
+    if args.metrics_json or args.metrics_prom:
+        exporter = PeriodicMetricsExporter(generation_metrics, args.metrics_json,
+                                           args.metrics_prom, args.metrics_interval)
+        exporter.start()
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix_socket))
+    finally:
+        if exporter:
+            exporter.stop()
+
+
 def create_generator(generator_type: str,
                      grid_size: int,
                      cell_size: int,
                      db_config: Dict[str, str],
+                     word_list=None,
+                     write_output: bool = True,
                      **kwargs: Any):
     """
     Factory function to create the appropriate generator based on type.
@@ -42,26 +151,21 @@ def create_generator(generator_type: str,
         grid_size: Size of the crossword grid
         cell_size: Size of each cell in pixels
         db_config: Database configuration dictionary
+        word_list: Optional offline lexicon used instead of the database
+        write_output: Whether the generator writes its output directory
         **kwargs: Additional generator-specific parameters
 
     Returns:
         An instance of the appropriate crossword generator
     """
-    generators = {
-        'type_a': TypeACrossword,
-        'type_b': TypeBCrossword,
-        'type_c': TypeCCrossword,
-        'hidden': HiddenWordAGenerator
-    }
-
-    generator_class = generators.get(generator_type)
-    if not generator_class:
-        raise ValueError(f"Invalid generator type: {generator_type}")
+    generator_class = generator_registry.get(generator_type)
 
     generator = generator_class(
         grid_size=grid_size,
         cell_size=cell_size,
-        db_config=db_config
+        db_config=db_config,
+        word_list=word_list,
+        write_output=write_output
     )
 
     # Configure specific parameters for hidden word generator
@@ -75,9 +179,420 @@ def create_generator(generator_type: str,
         if 'max_words' in kwargs:
             generator.max_words = kwargs['max_words']
 
+    # Configure the number of words for the sparse generator
+    if generator_type == 'sparse' and 'target_words' in kwargs:
+        generator.target_words = kwargs['target_words']
+
+    # Configure the grid template for the template fill generator
+    if generator_type == 'template' and kwargs.get('template'):
+        generator.set_template(kwargs['template'])
+
+    # Share the batch usage ledger (any type)
+    if kwargs.get('usage_ledger') is not None:
+        generator.set_usage_ledger(kwargs['usage_ledger'])
+
+    # Configure the search strategy (any type)
+    if 'search_mode' in kwargs:
+        generator.search_mode = kwargs['search_mode']
+    if 'beam_width' in kwargs:
+        generator.beam_width = kwargs['beam_width']
+    if 'time_budget' in kwargs:
+        generator.time_budget = kwargs['time_budget']
+
     return generator
 
 
+def run_batch(args, db_config: Dict[str, str], word_list, generator_kwargs: Dict[str, Any]) -> int:
+    """
+    Generate args.count crosswords sharing one lexicon and one usage ledger, so that
+    words used earlier in the batch count as used (and, with --exclude-window, are not
+    reused within the window). Returns the number of failed crosswords.
+
+    Progress is saved after every crossword in a checkpoint manifest (see BatchCheckpoint).
+    Word usage is written to clues_usage only for delivered crosswords, so --resume can
+    continue an interrupted batch without duplicate output or double counting.
+    """
+    from utils.batch_checkpoint import BatchCheckpoint
+    from utils.puzzle_validator import PuzzleValidator
+    if word_list is None:
+        # Load the lexicon once: every generator of the batch shares it and its index
+        word_list = DatabaseUtils.get_word_list_from_db(db_config, args.size)
+    ledger = UsageLedger(args.exclude_window)
+    writers = create_writers(args)
+    validator = PuzzleValidator() if args.validate else None
+    track_usage = bool(db_config)
+
+    if args.resume:
+        checkpoint = BatchCheckpoint.load(args.resume)
+        removed = checkpoint.recover()
+        if removed:
+            logging.info(f"Removed the partial output of the interrupted crossword: {removed}")
+        for puzzle in checkpoint.pending_usage():
+            checkpoint.apply_usage(db_config, puzzle, resuming=True)
+        checkpoint.replay(ledger)
+        if checkpoint.next_number > args.count:
+            logging.info("All crosswords of the batch were already generated")
+        else:
+            logging.info(f"Resuming batch at crossword {checkpoint.next_number}/{args.count}")
+    else:
+        batch_args = {key: value for key, value in vars(args).items()
+                      if key not in BATCH_RUNTIME_ARGS}
+        checkpoint = BatchCheckpoint.create(args.checkpoint or default_checkpoint_path(),
+                                            batch_args)
+    logging.info(f"Batch checkpoint: {checkpoint.path}")
+
+    try:
+        for number in range(checkpoint.next_number, args.count + 1):
+            seed = checkpoint.next_seed()
+            random.seed(seed)
+            generator = create_generator(
+                args.type,
+                args.size,
+                args.cell_size,
+                db_config,
+                word_list,
+                usage_ledger=ledger,
+                **generator_kwargs
+            )
+            generator.max_attempts = args.max_attempts
+            # Usage is written once the crossword is delivered (see BatchCheckpoint.apply_usage)
+            generator.record_usage = False
+            checkpoint.start(number, seed, generator.output_dir)
+
+            result = generator.generate_crossword()
+            if "Unable to generate" in result:
+                status = 'failed'
+                logging.error(f"Crossword {number}/{args.count}: {result}")
+            elif not finish_crossword(generator, writers, validator):
+                status = 'invalid'
+            else:
+                status = 'generated'
+                logging.info(f"Crossword {number}/{args.count} generated in: "
+                             f"{generator.output_dir}")
+
+            puzzle = checkpoint.complete(number, seed, generator, status, track_usage)
+            if puzzle['usage'] == 'pending':
+                checkpoint.apply_usage(db_config, puzzle)
+    finally:
+        # The lexicon index is shared: its exclusion mask must not outlive the batch
+        ledger.detach()
+
+    failed = checkpoint.failed()
+    repeated = ledger.repeated()
+    logging.info(f"Batch done: {args.count - failed} of {args.count} crosswords generated, "
+                 f"{len(ledger.counts)} distinct words, {len(repeated)} reused")
+    pending = checkpoint.pending_usage()
+    if pending:
+        logging.warning(f"Word usage of {len(pending)} crosswords is not recorded yet: "
+                        f"run with --resume {checkpoint.path} to record it")
+    return failed
+
+
+def create_queue(args, db_config: Dict[str, str], word_list) -> None:
+    """
+    Write the work queue of a distributed batch to args.queue: batch parameters, a
+    snapshot of the lexicon and the shards with the seeds of their crosswords.
+    """
+    from utils.work_queue import WorkQueue
+    if word_list is None:
+        word_list = DatabaseUtils.get_word_list_from_db(db_config, args.size)
+    batch_args = {key: value for key, value in vars(args).items()
+                  if key not in BATCH_RUNTIME_ARGS}
+    queue = WorkQueue.create(args.queue, batch_args, word_list, args.count, args.shard_size,
+                             args.lease_seconds, track_usage=bool(db_config))
+    print(f"Work queue ready: {len(queue.shards)} shards of up to {args.shard_size} "
+          f"crosswords in {args.queue}")
+
+
+def run_worker(args, word_list, generator_kwargs: Dict[str, Any]) -> int:
+    """
+    Claim and generate shards of the work queue in args.work until all of them are
+    finished, waiting for the shards leased by other workers (and taking them over if
+    their lease expires). The lexicon snapshot is loaded once for all the shards; each
+    shard has its own usage ledger, so its crosswords only depend on its seeds.
+    Returns the number of crosswords this worker failed to generate.
+    """
+    from utils.work_queue import WorkQueue
+    from utils.puzzle_validator import PuzzleValidator
+    queue = WorkQueue.load(args.work)
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    validator = PuzzleValidator() if args.validate else None
+
+    failed = 0
+    while True:
+        shard_id = queue.claim(worker)
+        if shard_id is None:
+            status = queue.status()
+            if status['done'] == status['shards']:
+                break
+            time.sleep(queue.poll_interval)
+            continue
+
+        logging.info(f"Worker {worker} generating {shard_id}")
+        ledger = UsageLedger(args.exclude_window)
+        documents = []
+        usage: Dict[int, int] = {}
+        shard_failed = 0
+        try:
+            for puzzle in queue.load_shard(shard_id)['puzzles']:
+                random.seed(puzzle['seed'])
+                generator = create_generator(
+                    args.type,
+                    args.size,
+                    args.cell_size,
+                    None,
+                    word_list,
+                    write_output=False,
+                    usage_ledger=ledger,
+                    **generator_kwargs
+                )
+                generator.max_attempts = args.max_attempts
+
+                result = generator.generate_crossword()
+                if "Unable to generate" in result:
+                    shard_failed += 1
+                    logging.error(f"Crossword {puzzle['number']}/{args.count}: {result}")
+                elif not finish_crossword(generator, {}, validator):
+                    shard_failed += 1
+                else:
+                    documents.append(generator.get_json_data())
+                    for word_id in generator.used_word_ids:
+                        usage[word_id] = usage.get(word_id, 0) + 1
+
+                if not queue.renew(shard_id, worker):
+                    logging.warning(f"Lease of {shard_id} lost: the shard was reassigned")
+                    break
+            else:
+                if not queue.complete(shard_id, worker, documents, usage, shard_failed):
+                    logging.warning(f"Lease of {shard_id} lost: results discarded")
+                    continue
+                failed += shard_failed
+                logging.info(f"Shard {shard_id} done: {len(documents)} crosswords generated, "
+                             f"{shard_failed} failed")
+        finally:
+            ledger.detach()
+
+    logging.info(f"Work queue {args.work} finished")
+    return failed
+
+
+def run_merge(args) -> None:
+    """
+    Merge the results of a finished work queue into crosswords.jsonl and add the word
+    usage of all its crosswords to clues_usage in one pass.
+    """
+    from utils.work_queue import WorkQueue
+    queue = WorkQueue.load(args.merge)
+    db_config = get_db_config() if queue.data['track_usage'] else None
+    report = queue.merge(db_config)
+    print(json.dumps(report, ensure_ascii=False))
+
+
+def default_checkpoint_path() -> str:
+    """Checkpoint manifest path of a new batch, next to the crossword directories."""
+    output_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+    os.makedirs(output_root, exist_ok=True)
+    return os.path.join(output_root, f"batch-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+
+
+def create_writers(args) -> Dict[str, Any]:
+    """
+    Renderers (--render) and exporters (--export-format) by file extension, shared by
+    all the crosswords of a run so their caches are reused.
+    """
+    from utils.puzzle_renderer import SvgRenderer, PngRenderer
+    from utils.puzzle_export import IpuzExporter, PuzExporter
+    writer_classes = {'svg': SvgRenderer, 'png': PngRenderer,
+                      'ipuz': IpuzExporter, 'puz': PuzExporter}
+    writers = {}
+    for fmt in dict.fromkeys(args.render or []):
+        writers[fmt] = writer_classes[fmt](show_letters=not args.blank)
+    for fmt in dict.fromkeys(args.export_format or []):
+        writers[fmt] = writer_classes[fmt]()
+    return writers
+
+
+def write_puzzle_files(writers: Dict[str, Any], puzzle: 'PuzzleResult',
+                       output_dir: str) -> None:
+    """Write crossword.<extension> for every requested format into output_dir."""
+    from utils.puzzle_export import ExportError
+    for fmt, writer in writers.items():
+        try:
+            writer.save(puzzle, os.path.join(output_dir, f'crossword.{fmt}'))
+        except ExportError as e:
+            logging.warning(f"Crossword {puzzle.guid} not exported as {fmt}: {str(e)}")
+
+
+def finish_crossword(generator, writers: Dict[str, Any],
+                     validator: Optional['PuzzleValidator']) -> bool:
+    """
+    Validate a generated crossword (when requested) and write its extra output files.
+    Returns False if the validation failed.
+    """
+    from base.puzzle_result import PuzzleResult
+    if not writers and validator is None:
+        return True
+    puzzle = PuzzleResult.from_dict(generator.get_json_data())
+    if validator is not None:
+        report = validator.validate(puzzle)
+        if not report['valid']:
+            for error in report['errors']:
+                logging.error(f"Invalid crossword {puzzle.guid}: {error}")
+            return False
+    write_puzzle_files(writers, puzzle, generator.output_dir)
+    return True
+
+
+def run_analyze(args, word_list, generator_kwargs: Dict[str, Any]) -> None:
+    """
+    Print, one JSON line per type, the estimated success probability of -t (or of every
+    generator type) for this lexicon, grid size and parameters (see FeasibilityAnalyzer).
+    """
+    from utils.feasibility import FeasibilityAnalyzer
+    analyzer = FeasibilityAnalyzer(word_list)
+    for generator_type in ([args.type] if args.type else generator_registry.names()):
+        params = generator_kwargs if generator_type == args.type else {}
+        report = analyzer.analyze(
+            generator_type,
+            args.size,
+            args.max_attempts,
+            params,
+            lambda: create_generator(generator_type, args.size, args.cell_size, None, word_list,
+                                     write_output=False, **params),
+            args.analyze_trials
+        )
+        print(json.dumps(report, ensure_ascii=False))
+
+
+def check_feasibility(args, word_list, generator_kwargs: Dict[str, Any]) -> bool:
+    """
+    Check the parameters against the lexicon before spending any attempt, falling back to
+    a few trial attempts when the lexicon alone does not decide. When they cannot succeed,
+    log the reason and the nearest feasible parameters, and with --fallback switch to
+    them. Returns False if generation should not start.
+    """
+    from utils.feasibility import FeasibilityAnalyzer
+    report = FeasibilityAnalyzer(word_list).analyze(
+        args.type,
+        args.size,
+        args.max_attempts,
+        generator_kwargs,
+        lambda: create_generator(args.type, args.size, args.cell_size, None, word_list,
+                                 write_output=False, **generator_kwargs),
+        FEASIBILITY_TRIALS
+    )
+    probability = report['probability']
+    if probability is None:
+        logging.warning(f"Feasibility of the {args.type} crossword is unknown "
+                        f"for this lexicon")
+        return True
+    if probability >= LOW_SUCCESS_PROBABILITY:
+        return True
+    if report['method'] == 'sampled':
+        # A handful of trials cannot prove that generation is impossible
+        logging.warning(f"Estimated success probability within {args.max_attempts} "
+                        f"attempts: {probability:.0%} ({report['details']['trials']} trial "
+                        f"attempts, see --analyze)")
+        return True
+    if probability > 0:
+        logging.warning(f"Estimated success probability within {args.max_attempts} "
+                        f"attempts: {probability:.0%}")
+        return True
+
+    logging.error(f"The {args.type} crossword cannot be generated: {report['reason']}")
+    suggestion = report['suggestion']
+    if not suggestion:
+        return False
+    options = ' '.join(f"{SUGGESTED_OPTIONS[key][0]} {value}" for key, value in suggestion.items())
+    if not args.fallback:
+        logging.error(f"Feasible parameters for this lexicon: {options} (or use --fallback)")
+        return False
+    generator_kwargs.update(suggestion)
+    for key, value in suggestion.items():
+        setattr(args, SUGGESTED_OPTIONS[key][1], value)
+    logging.warning(f"Falling back to feasible parameters: {options}")
+    return True
+
+
+def run_validate(args) -> int:
+    """
+    Check saved crosswords against their word lists, printing one JSON report (errors
+    and stats) per crossword. Returns the number of invalid crosswords.
+    """
+    from utils.puzzle_validator import PuzzleValidator
+    from base.puzzle_result import PuzzleLoader
+    validator = PuzzleValidator()
+    count = invalid = 0
+    for report in validator.validate_all(PuzzleLoader.iter_path(args.validate)):
+        print(json.dumps(report, ensure_ascii=False))
+        count += 1
+        if not report['valid']:
+            invalid += 1
+    logging.info(f"Validated {count} crosswords from {args.validate}: {invalid} invalid")
+    return invalid
+
+
+def run_repair(args) -> None:
+    """
+    Replace one word of an existing crossword.json, keeping its crossings, and write
+    the updated document (over the input unless --output is given).
+    """
+    from utils.puzzle_repair import PuzzleRepair
+    with open(args.repair, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    grid = document['crossword_data']['grid']
+    max_length = max(len(grid), max((len(row) for row in grid), default=0))
+
+    db_config = None
+    if args.lexicon_file:
+        word_list = LexiconUtils.load_lexicon_file(args.lexicon_file, max_length)
+    else:
+        db_config = get_db_config()
+        word_list = DatabaseUtils.get_word_list_from_db(db_config, max_length)
+
+    repair = PuzzleRepair(document, word_list)
+    position = repair.find_word(args.word)
+    result = repair.repair(position, keep_solution=args.keep_solution)
+    output_path = args.output or args.repair
+    repair.save(output_path)
+    if db_config:
+        PuzzleRepair.update_usage(db_config, result, output_path)
+
+    new_entry = result['new_entry']
+    print(f"Word {position + 1} replaced with {new_entry['solution']}: {new_entry.get('clue')}")
+
+
+def run_rerender(args) -> None:
+    """
+    Stream saved crosswords (a crossword.json, a directory or a JSONL shard) and either
+    re-export them to the --output directory or print their recomputed stats as JSON lines.
+    """
+    from base.puzzle_result import PuzzleLoader
+    writers = create_writers(args)
+    count = 0
+    for puzzle in PuzzleLoader.iter_path(args.rerender):
+        if args.output:
+            write_puzzle_files(writers, puzzle, puzzle.export(args.output))
+        else:
+            print(json.dumps(puzzle.stats(), ensure_ascii=False))
+        count += 1
+    logging.info(f"Loaded {count} crosswords from {args.rerender}")
+
+
+def supports_beam_search(generator_type: str) -> bool:
+    """Whether the generator defines the placement steps used by the beam search."""
+    return generator_registry.get(generator_type).supports_beam
+
+
+def load_template(path: str) -> List[str]:
+    """Read a grid template: one row per line, '#' for black squares, '.' for cells to fill."""
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [line.strip().upper() for line in f if line.strip()]
+    if not rows or any(len(row) != len(rows) for row in rows):
+        raise ValueError("the template must be a non-empty square grid")
+    return rows
+
+
 def parse_args():
     """Parse and validate command line arguments."""
     parser = argparse.ArgumentParser(
@@ -89,21 +604,33 @@ Examples:
   %(prog)s -t hidden -s 20 --hidden-length 8 -v
   %(prog)s -t hidden --hidden-length 6 --min-words 6 --max-words 10
   %(prog)s -t type_b --max-attempts 5
+  %(prog)s -t type_a --search beam --beam-width 8 --time-budget 5
+  %(prog)s -t type_c --count 50 --exclude-window 10 --lexicon-file lexicon.jsonl
+  %(prog)s --resume output/batch-20240101-120000.json
+  %(prog)s -t type_c --count 5000 --queue /shared/weekly --shard-size 20
+  %(prog)s --work /shared/weekly
+  %(prog)s --merge /shared/weekly
+  %(prog)s -t template --template grid.txt --lexicon-file lexicon.jsonl
+  %(prog)s -t sparse -s 300 --target-words 1000 --lexicon-file lexicon.jsonl
+  %(prog)s --serve --lexicon-file lexicon.jsonl --port 8765 --workers 4
+  %(prog)s --repair output/crossword.json --word 3 --lexicon-file lexicon.jsonl
+  %(prog)s --rerender archive.jsonl --output reexport/ --render svg --render png
+  %(prog)s --rerender output/ --output ipuz/ --export-format ipuz --export-format puz
+  %(prog)s --validate archive.jsonl
         """
     )
 
     parser.add_argument(
         '-t', '--type',
-        choices=['type_a', 'type_b', 'type_c', 'hidden'],
-        required=True,
-        help='Type of crossword to generate'
+        help='Type of crossword to generate: {} or a plugin type'.format(
+            ', '.join(BUILTIN_GENERATORS))
     )
 
     parser.add_argument(
         '-s', '--size',
         type=int,
         default=15,
-        help='Size of the grid (default: 15)'
+        help='Size of the grid (default: 15; up to {} for sparse type)'.format(MAX_SPARSE_SIZE)
     )
 
     parser.add_argument(
@@ -120,6 +647,92 @@ Examples:
         help='Maximum number of generation attempts (default: 3)'
     )
 
+    parser.add_argument(
+        '--count',
+        type=int,
+        default=1,
+        help='Number of crosswords to generate in one batch (default: 1)'
+    )
+
+    parser.add_argument(
+        '--exclude-window',
+        type=int,
+        metavar='K',
+        help='In a batch, do not reuse a word used in the last K crosswords'
+    )
+
+    parser.add_argument(
+        '--checkpoint',
+        metavar='PATH',
+        help='Checkpoint manifest of a batch, rewritten after every crossword '
+             '(default: output/batch-<timestamp>.json)'
+    )
+
+    parser.add_argument(
+        '--resume',
+        metavar='PATH',
+        help='Continue an interrupted batch from its checkpoint manifest, '
+             'with the parameters it was started with'
+    )
+
+    # Distributed batch arguments
+    parser.add_argument(
+        '--queue',
+        metavar='DIR',
+        help='Write the --count crosswords of a batch as a work queue in a shared directory, '
+             'to be generated by --work processes on several nodes'
+    )
+
+    parser.add_argument(
+        '--shard-size',
+        type=int,
+        default=10,
+        help='Crosswords per shard of a work queue (default: 10)'
+    )
+
+    parser.add_argument(
+        '--lease-seconds',
+        type=float,
+        default=300.0,
+        help='Seconds after which the shard of an unresponsive worker is reassigned '
+             '(default: 300)'
+    )
+
+    parser.add_argument(
+        '--work',
+        metavar='DIR',
+        help='Generate shards of a work queue until the queue is finished'
+    )
+
+    parser.add_argument(
+        '--merge',
+        metavar='DIR',
+        help='Merge the results of a finished work queue and record their word usage'
+    )
+
+    # Feasibility arguments
+    parser.add_argument(
+        '--analyze',
+        action='store_true',
+        help='Estimate the success probability of -t (or of every type) with this lexicon, '
+             'grid size and parameters, then exit'
+    )
+
+    parser.add_argument(
+        '--analyze-trials',
+        type=int,
+        default=20,
+        help='Trial attempts used by --analyze when the lexicon alone does not decide '
+             '(default: 20)'
+    )
+
+    parser.add_argument(
+        '--fallback',
+        action='store_true',
+        help='If the parameters cannot succeed with this lexicon, switch to the nearest '
+             'feasible ones instead of stopping'
+    )
+
     # Hidden word specific arguments
     parser.add_argument(
         '--hidden-length',
@@ -139,6 +752,228 @@ Examples:
         help='Maximum number of intersecting words (for hidden type)'
     )
 
+    parser.add_argument(
+        '--target-words',
+        type=int,
+        help='Number of words to place (for sparse type, default: grid size)'
+    )
+
+    parser.add_argument(
+        '--template',
+        metavar='PATH',
+        help='Grid template to fill (for template type): one row per line, '
+             '"#" for black squares, "." for cells to fill; sets the grid size'
+    )
+
+    # Search arguments
+    parser.add_argument(
+        '--search',
+        choices=['first', 'beam'],
+        default='first',
+        help='Return the first valid crossword, or the best-scored one found by a '
+             'beam search within --time-budget (default: first)'
+    )
+
+    parser.add_argument(
+        '--beam-width',
+        type=int,
+        default=8,
+        help='Partial puzzles kept at each beam search step (default: 8)'
+    )
+
+    parser.add_argument(
+        '--time-budget',
+        type=float,
+        default=2.0,
+        help='Seconds spent by the beam search (default: 2)'
+    )
+
+    parser.add_argument(
+        '--lexicon-file',
+        metavar='PATH',
+        help='Load words from an exported lexicon file instead of the database'
+    )
+
+    parser.add_argument(
+        '--export-lexicon',
+        metavar='PATH',
+        help='Export the database lexicon (words up to --size letters) to a JSONL file and exit'
+    )
+
+    parser.add_argument(
+        '--memory-report',
+        action='store_true',
+        help='Print the memory footprint of the lexicon (words up to --size letters) '
+             'and its index, then exit'
+    )
+
+    parser.add_argument(
+        '--metrics-json',
+        metavar='PATH',
+        help='Write a JSON snapshot of the generation metrics to PATH'
+    )
+
+    parser.add_argument(
+        '--metrics-prom',
+        metavar='PATH',
+        help='Write the generation metrics as a Prometheus textfile to PATH'
+    )
+
+    parser.add_argument(
+        '--metrics-interval',
+        type=float,
+        default=15.0,
+        help='Seconds between metrics exports in service mode (default: 15)'
+    )
+
+    # Repair arguments
+    parser.add_argument(
+        '--repair',
+        metavar='PATH',
+        help='Replace one word of an existing crossword.json, keeping its crossings'
+    )
+
+    parser.add_argument(
+        '--word',
+        metavar='N|TEXT',
+        help='Word to replace with --repair: its number in the word list (from 1) or its text'
+    )
+
+    parser.add_argument(
+        '--keep-solution',
+        action='store_true',
+        help='With --repair, keep the word and only pick another clue for it'
+    )
+
+    parser.add_argument(
+        '--rerender',
+        metavar='PATH',
+        help='Load saved crosswords (a crossword.json, a directory or a JSONL shard) and '
+             're-export them to --output, or print their stats as JSON lines'
+    )
+
+    parser.add_argument(
+        '--render',
+        choices=['svg', 'png'],
+        action='append',
+        help='Also draw the grid as crossword.svg or crossword.png (PNG needs Pillow); '
+             'works when generating and with --rerender (repeatable)'
+    )
+
+    parser.add_argument(
+        '--export-format',
+        choices=['ipuz', 'puz'],
+        action='append',
+        help='Also export the crossword as crossword.ipuz or crossword.puz (Across Lite); '
+             'works when generating and with --rerender (repeatable)'
+    )
+
+    parser.add_argument(
+        '--blank',
+        action='store_true',
+        help='With --render, draw the empty grid with the word numbers only'
+    )
+
+    parser.add_argument(
+        '--validate',
+        nargs='?',
+        const=True,
+        metavar='PATH',
+        help='Check each generated crossword against its word list (invalid ones count as '
+             'failed); with PATH, check saved crosswords (a crossword.json, a directory or '
+             'a JSONL shard) and print a JSON report with stats for each'
+    )
+
+    parser.add_argument(
+        '--output',
+        metavar='PATH',
+        help='Where --repair writes the updated JSON (default: overwrite the input), or '
+             'the directory --rerender writes to'
+    )
+
+    # Service mode arguments
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Run as a long-running HTTP generation service with a warm lexicon'
+    )
+
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='Address the service listens on (default: 127.0.0.1)'
+    )
+
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8765,
+        help='TCP port the service listens on (default: 8765)'
+    )
+
+    parser.add_argument(
+        '--unix-socket',
+        metavar='PATH',
+        help='Listen on a Unix socket instead of TCP'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Number of generation worker processes (default: CPU count)'
+    )
+
+    parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=16,
+        help='Requests allowed to wait for a worker before answering 503 (default: 16)'
+    )
+
+    parser.add_argument(
+        '--refresh-interval',
+        type=float,
+        metavar='SECONDS',
+        help='In service mode, pull added or changed clues from the database every '
+             'SECONDS seconds (on demand with POST /refresh)'
+    )
+
+    parser.add_argument(
+        '--updated-column',
+        metavar='NAME',
+        help='Last-modified column of the clues table, used to pick up edited clues '
+             'on refresh (default: only new ids are picked up)'
+    )
+
+    parser.add_argument(
+        '--pool',
+        metavar='PATH',
+        help='Serve requests without a seed from a pre-generated puzzle pool stored '
+             'in this SQLite file'
+    )
+
+    parser.add_argument(
+        '--pool-depth',
+        type=int,
+        default=5,
+        help='Ready puzzles to keep for each pooled configuration (default: 5)'
+    )
+
+    parser.add_argument(
+        '--pool-workers',
+        type=int,
+        default=1,
+        help='Worker processes refilling the puzzle pool (default: 1)'
+    )
+
+    parser.add_argument(
+        '--pool-spec',
+        metavar='JSON',
+        action='append',
+        help='Configuration to pre-fill at startup, e.g. '
+             '\'{"type": "hidden", "size": 15, "hidden_length": 8}\' (repeatable)'
+    )
+
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
@@ -147,10 +982,104 @@ Examples:
 
     args = parser.parse_args()
 
+    if args.resume:
+        if args.checkpoint:
+            parser.error("--checkpoint cannot be used with --resume")
+        from utils.batch_checkpoint import BatchCheckpoint, CheckpointError
+        try:
+            checkpoint = BatchCheckpoint.load(args.resume)
+        except CheckpointError as e:
+            parser.error(str(e))
+        # The batch continues with the parameters saved when it was started
+        args = argparse.Namespace(**{**vars(args), **checkpoint.args,
+                                     'resume': args.resume, 'checkpoint': args.resume})
+    elif args.work:
+        from utils.work_queue import WorkQueue, QueueError
+        try:
+            queue = WorkQueue.load(args.work)
+        except QueueError as e:
+            parser.error(str(e))
+        # Workers generate with the parameters and the lexicon snapshot of the queue
+        args = argparse.Namespace(**{**vars(args), **queue.args, 'work': args.work,
+                                     'lexicon_file': queue.lexicon_path})
+
+    if args.type is None and not (args.export_lexicon or args.memory_report or args.serve
+                                  or args.repair or args.rerender or args.merge
+                                  or args.analyze or isinstance(args.validate, str)):
+        parser.error("the following arguments are required: -t/--type")
+    if args.repair and not args.word:
+        parser.error("--word is required with --repair")
+    if (args.word or args.keep_solution) and not args.repair:
+        parser.error("--word and --keep-solution can only be used with --repair")
+    if args.output and not (args.repair or args.rerender):
+        parser.error("--output can only be used with --repair or --rerender")
+    if args.render or args.export_format:
+        if args.serve or args.repair or (args.rerender and not args.output):
+            parser.error("--render and --export-format need an output directory: use them "
+                         "when generating or with --rerender and --output")
+        if 'png' in (args.render or []):
+            from utils.puzzle_renderer import PngRenderer
+            try:
+                PngRenderer._pil()
+            except ImportError as e:
+                parser.error(str(e))
+    if args.blank and not args.render:
+        parser.error("--blank can only be used with --render")
+    if args.checkpoint and (args.serve or args.repair or args.rerender or args.export_lexicon
+                            or args.memory_report or isinstance(args.validate, str)):
+        parser.error("--checkpoint can only be used when generating crosswords")
+    if sum(1 for option in (args.queue, args.work, args.merge, args.checkpoint, args.analyze)
+           if option) > 1:
+        parser.error("--queue, --work, --merge, --checkpoint, --resume and --analyze "
+                     "are mutually exclusive")
+    if args.queue and (args.render or args.export_format):
+        parser.error("--render and --export-format cannot be used with --queue: use --rerender "
+                     "on the crosswords.jsonl of the merged queue")
+    if args.type is not None and not generator_registry.is_registered(args.type):
+        parser.error(f"Invalid generator type: {args.type} "
+                     f"(available: {', '.join(generator_registry.names())})")
+
+    if args.template:
+        if args.type != 'template':
+            parser.error("--template can only be used with the template type")
+        try:
+            # A resumed batch keeps the rows saved in its checkpoint
+            if getattr(args, 'template_rows', None) is None:
+                args.template_rows = load_template(args.template)
+        except (OSError, ValueError) as e:
+            parser.error(f"Invalid template {args.template}: {e}")
+        args.size = len(args.template_rows)
+
     # Validate grid size
-    if args.size < 5 or args.size > 30:
+    if args.type == 'sparse':
+        if args.size < 5 or args.size > MAX_SPARSE_SIZE:
+            parser.error(f"Grid size must be between 5 and {MAX_SPARSE_SIZE} for sparse type")
+        if args.target_words is not None and args.target_words < 2:
+            parser.error("Target number of words must be at least 2")
+    elif args.size < 5 or args.size > 30:
         parser.error("Grid size must be between 5 and 30")
 
+    # Validate batch parameters
+    if args.count < 1:
+        parser.error("Count must be at least 1")
+    if args.exclude_window is not None and args.exclude_window < 1:
+        parser.error("Exclusion window must be at least 1")
+    if args.analyze_trials < 1:
+        parser.error("Analysis trials must be at least 1")
+    if args.shard_size < 1:
+        parser.error("Shard size must be at least 1")
+    if args.lease_seconds <= 0:
+        parser.error("Lease duration must be positive")
+
+    # Validate search parameters
+    if args.search == 'beam':
+        if args.beam_width < 1:
+            parser.error("Beam width must be at least 1")
+        if args.time_budget <= 0:
+            parser.error("Time budget must be positive")
+        if args.type is not None and not supports_beam_search(args.type):
+            parser.error(f"Beam search is not supported by the {args.type} type")
+
     # Validate cell size
     if args.cell_size < 20 or args.cell_size > 200:
         parser.error("Cell size must be between 20 and 200 pixels")
@@ -159,11 +1088,23 @@ Examples:
     if args.max_attempts < 1 or args.max_attempts > 10:
         parser.error("Maximum attempts must be between 1 and 10")
 
+    # Validate service parameters
+    if args.workers is not None and args.workers < 1:
+        parser.error("Number of workers must be at least 1")
+    if args.queue_size < 0:
+        parser.error("Queue size cannot be negative")
+    if args.refresh_interval is not None and args.refresh_interval <= 0:
+        parser.error("Refresh interval must be positive")
+    if args.pool_depth < 1:
+        parser.error("Pool depth must be at least 1")
+    if args.pool_workers < 1:
+        parser.error("Number of pool workers must be at least 1")
+
     # Validate hidden word parameters
     if args.type == 'hidden':
-        if args.hidden_length is None:
+        if args.hidden_length is None and not args.analyze:
             parser.error("--hidden-length is required for hidden type crossword")
-        if args.hidden_length < 5 or args.hidden_length > 15:
+        if args.hidden_length is not None and not 5 <= args.hidden_length <= 15:
             parser.error("Hidden word length must be between 5 and 15")
         if args.min_words is not None and args.min_words < 3:
             parser.error("Minimum number of words must be at least 3")
@@ -182,34 +1123,113 @@ def main():
         args = parse_args()
         setup_logging(args.verbose)
 
+        if args.export_lexicon:
+            word_list = DatabaseUtils.get_word_list_from_db(get_db_config(), args.size)
+            LexiconUtils.save_lexicon_file(word_list, args.export_lexicon)
+            sys.exit(0)
+
+        if args.memory_report:
+            print_memory_report(args)
+            sys.exit(0)
+
+        if args.serve:
+            run_service(args)
+            sys.exit(0)
+
+        if args.repair:
+            run_repair(args)
+            sys.exit(0)
+
+        if args.rerender:
+            run_rerender(args)
+            sys.exit(0)
+
+        if args.merge:
+            run_merge(args)
+            sys.exit(0)
+
+        if isinstance(args.validate, str):
+            sys.exit(1 if run_validate(args) else 0)
+
         logging.info(f"Starting crossword generation with type: {args.type}")
         logging.info(f"Grid size: {args.size}x{args.size}")
 
+        # With an offline lexicon the database is not used at all
         db_config = get_db_config()
+        word_list = None
+        if args.lexicon_file:
+            word_list = LexiconUtils.load_lexicon_file(args.lexicon_file, args.size)
+            db_config = None
 
         # Create generator with additional parameters for hidden type
         generator_kwargs = {}
         if args.type == 'hidden':
-            generator_kwargs.update({
-                'hidden_word_length': args.hidden_length
-            })
+            # Without --hidden-length (only with --analyze) the generator default is used
+            if args.hidden_length is not None:
+                generator_kwargs['hidden_word_length'] = args.hidden_length
             if args.min_words is not None:
                 generator_kwargs['min_words'] = args.min_words
             if args.max_words is not None:
                 generator_kwargs['max_words'] = args.max_words
 
-            logging.info(f"Hidden word length set to: {args.hidden_length}")
+            if args.hidden_length is not None:
+                logging.info(f"Hidden word length set to: {args.hidden_length}")
             if args.min_words:
                 logging.info(f"Minimum intersecting words: {args.min_words}")
             if args.max_words:
                 logging.info(f"Maximum intersecting words: {args.max_words}")
 
+        if args.type == 'sparse' and args.target_words is not None:
+            generator_kwargs['target_words'] = args.target_words
+            logging.info(f"Target number of words: {args.target_words}")
+
+        if args.template:
+            generator_kwargs['template'] = args.template_rows
+            logging.info(f"Grid template loaded from: {args.template}")
+
+        if args.search == 'beam':
+            generator_kwargs.update({
+                'search_mode': 'beam',
+                'beam_width': args.beam_width,
+                'time_budget': args.time_budget
+            })
+            logging.info(f"Beam search: width {args.beam_width}, "
+                         f"time budget {args.time_budget}s")
+
+        if args.analyze:
+            if word_list is None:
+                word_list = DatabaseUtils.get_word_list_from_db(db_config, args.size)
+            run_analyze(args, word_list, generator_kwargs)
+            sys.exit(0)
+
+        if not args.work:
+            if word_list is None:
+                # Loaded once here: the feasibility check and the generators share it
+                word_list = DatabaseUtils.get_word_list_from_db(db_config, args.size)
+            if not check_feasibility(args, word_list, generator_kwargs):
+                sys.exit(1)
+
+        if args.queue:
+            create_queue(args, db_config, word_list)
+            sys.exit(0)
+
+        if args.work:
+            failed = run_worker(args, word_list, generator_kwargs)
+            export_metrics(args)
+            sys.exit(1 if failed else 0)
+
+        if args.count > 1 or args.checkpoint:
+            failed = run_batch(args, db_config, word_list, generator_kwargs)
+            export_metrics(args)
+            sys.exit(1 if failed else 0)
+
         # Create the appropriate generator
         generator = create_generator(
             args.type,
             args.size,
             args.cell_size,
             db_config,
+            word_list,
             **generator_kwargs
         )
 
@@ -218,11 +1238,16 @@ def main():
 
         # Generate the crossword
         result = generator.generate_crossword()
+        export_metrics(args)
 
+        from utils.puzzle_validator import PuzzleValidator
         # Check the result
         if "Unable to generate" in result:
             logging.error(result)
             sys.exit(1)
+        elif not finish_crossword(generator, create_writers(args),
+                                  PuzzleValidator() if args.validate else None):
+            sys.exit(1)
         else:
             logging.info("Crossword generated successfully")
             logging.info(f"Output files are in: {generator.output_dir}")
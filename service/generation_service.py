@@ -0,0 +1,584 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import time
+from generators.registry import generator_registry
+from utils.db_utils import DatabaseUtils
+from utils.lexicon_index import LexiconIndex
+from utils.lexicon_sync import LexiconSync
+from utils.lexicon_utils import LexiconUtils
+from utils.metrics import GenerationMetrics, generation_metrics
+from utils.puzzle_repair import PuzzleRepair, RepairError
+
+# Lessico del processo worker, ereditato dal processo principale all'avvio del pool
+_worker_word_list: List = []
+_worker_lexicons: Dict[int, List] = {}
+
+
+def _init_worker(word_list: List, warm_lexicons: Dict[int, List]) -> None:
+    """
+    Inizializza un processo worker con il lessico e le liste già filtrate per dimensione.
+    """
+    global _worker_word_list, _worker_lexicons
+    _worker_word_list = word_list
+    _worker_lexicons = dict(warm_lexicons)
+
+
+def _lexicon_for_size(word_list: List, lexicons: Dict[int, List], grid_size: int) -> List:
+    """
+    Restituisce (e tiene in cache) il lessico filtrato per una dimensione di griglia.
+    """
+    lexicon = lexicons.get(grid_size)
+    if lexicon is None:
+        lexicon = lexicons[grid_size] = LexiconUtils.filter_by_length(word_list, grid_size)
+    return lexicon
+
+
+def create_worker_pool(word_list: List, warm_lexicons: Dict[int, List],
+                       workers: int) -> ProcessPoolExecutor:
+    """
+    Crea un pool di processi worker che ereditano il lessico.
+    Con fork i worker condividono il lessico del processo principale in copy-on-write.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork') if 'fork' in methods else None
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(word_list, warm_lexicons)
+    )
+
+
+def generate_in_worker(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Genera un cruciverba nel processo worker.
+    Restituisce il documento JSON, gli id delle parole usate, lo snapshot delle metriche
+    e il tempo impiegato. L'utilizzo delle parole non viene registrato qui.
+    """
+    # Importato qui per evitare l'import circolare con main.py
+    from main import create_generator
+
+    started = time.perf_counter()
+    random.seed(request['seed'])
+    word_list = _lexicon_for_size(_worker_word_list, _worker_lexicons, request['size'])
+
+    generator = create_generator(
+        request['type'],
+        request['size'],
+        request['cell_size'],
+        None,
+        word_list,
+        write_output=False,
+        **request['generator_kwargs']
+    )
+    generator.max_attempts = request['max_attempts']
+    generator.metrics = GenerationMetrics()
+    generator.record_usage = False
+
+    result = generator.generate_crossword()
+    success = "Unable to generate" not in result
+    return {
+        'success': success,
+        'result': result,
+        'data': generator.get_json_data() if success else None,
+        'word_ids': list(generator.used_word_ids) if success else [],
+        'metrics': generator.metrics.snapshot(),
+        'elapsed_ms': (time.perf_counter() - started) * 1000
+    }
+
+
+class RequestError(ValueError):
+    """Richiesta non valida (risposta HTTP 400)."""
+
+
+class GenerationService:
+    """
+    Servizio HTTP di lunga durata per la generazione di cruciverba.
+    Il lessico e i suoi indici restano caldi in memoria; le richieste vengono eseguite
+    su un pool limitato di processi e, oltre la capacità della coda, rifiutate con 503.
+    Con un PuzzlePool le richieste senza seed vengono servite da puzzle pre-generati.
+    Con un LexiconSync il lessico viene aggiornato in modo incrementale (POST /refresh o
+    ogni refresh_interval secondi) senza interrompere le generazioni in corso.
+    """
+
+    LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    LATENCY_WINDOW = 1000
+    MAX_BODY_BYTES = 64 * 1024
+
+    def __init__(self, word_list: List, workers: Optional[int] = None, queue_size: int = 16,
+                 warm_sizes: Tuple[int, ...] = (15,), metrics: GenerationMetrics = None,
+                 db_config: Optional[Dict] = None, lexicon_sync: Optional[LexiconSync] = None,
+                 max_length: Optional[int] = None, refresh_interval: Optional[float] = None):
+        self.word_list = word_list
+        self.db_config = db_config
+        self.lexicon_sync = lexicon_sync
+        # Lunghezza massima delle soluzioni del lessico completo
+        self.max_length = max_length
+        self.refresh_interval = refresh_interval
+        self._refresh_lock = None
+        self.pool = None
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.metrics = metrics or generation_metrics
+        self.warm_lexicons: Dict[int, List] = {}
+        self.executor = None
+        self.in_flight = 0
+        self.latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self.started_at = time.time()
+        self._server = None
+
+        for size in warm_sizes:
+            self.warm_lexicon(size)
+        if lexicon_sync is not None:
+            # Pronti da subito: il primo refresh costa come i successivi
+            LexiconIndex.for_word_list(self.word_list).prepare_changes()
+
+    def warm_lexicon(self, grid_size: int) -> None:
+        """
+        Filtra il lessico per la dimensione indicata e ne costruisce subito l'indice,
+        così i worker lo ereditano già pronto.
+        """
+        lexicon = _lexicon_for_size(self.word_list, self.warm_lexicons, grid_size)
+        index = LexiconIndex.for_word_list(lexicon)
+        index.build_all()
+        if self.lexicon_sync is not None:
+            index.prepare_changes()
+        logging.info(f"Warmed lexicon for grid size {grid_size}: {len(lexicon)} words")
+
+    def start_pool(self) -> None:
+        """
+        Avvia il pool di processi worker ed eventualmente il riempimento del pool di puzzle.
+        """
+        self.executor = create_worker_pool(self.word_list, self.warm_lexicons, self.workers)
+        logging.info(f"Started worker pool with {self.workers} workers "
+                     f"(queue size {self.queue_size})")
+        if self.pool is not None:
+            self.pool.start()
+
+    def apply_lexicon_changes(self, changes: List) -> None:
+        """
+        Applica voci nuove o modificate al lessico e ai lessici per dimensione, poi passa
+        a worker che ereditano il lessico aggiornato. Liste e indici vengono sostituiti,
+        non modificati: le generazioni in corso terminano sul lessico precedente.
+        """
+        if not changes:
+            return
+        word_list = LexiconSync.apply(self.word_list, changes, self.max_length)
+        warm_lexicons = {size: LexiconSync.apply(lexicon, changes, size)
+                         for size, lexicon in self.warm_lexicons.items()}
+
+        # Scambio dei riferimenti: da qui le nuove richieste usano il lessico aggiornato
+        self.word_list = word_list
+        self.warm_lexicons = warm_lexicons
+        if self.executor is not None:
+            old_executor = self.executor
+            self.executor = create_worker_pool(word_list, warm_lexicons, self.workers)
+            old_executor.shutdown(wait=False)
+        if self.pool is not None:
+            self.pool.update_lexicon(word_list, warm_lexicons)
+
+    async def refresh_lexicon(self) -> Dict[str, Any]:
+        """
+        Legge dal database le voci cambiate dall'ultima sincronizzazione e le applica.
+        """
+        if self.lexicon_sync is None:
+            raise RequestError("Lexicon refresh requires a database lexicon")
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+
+        async with self._refresh_lock:
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            changes, marks = await loop.run_in_executor(None, self.lexicon_sync.fetch)
+            self.apply_lexicon_changes(changes)
+            self.lexicon_sync.advance(marks)
+
+        elapsed = time.perf_counter() - started
+        self.metrics.inc('lexicon_refresh_total', {},
+                         help_text="Incremental lexicon refreshes")
+        self.metrics.inc('lexicon_refresh_changes_total', {}, len(changes),
+                         help_text="Lexicon entries added or changed by refreshes")
+        if changes:
+            logging.info(f"Lexicon refreshed with {len(changes)} changed words "
+                         f"in {elapsed * 1000:.1f} ms")
+        return {
+            'changes': len(changes),
+            'lexicon_words': len(self.word_list),
+            'version': self.lexicon_sync.version,
+            'elapsed_ms': round(elapsed * 1000, 3)
+        }
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh_lexicon()
+            except Exception as e:
+                logging.error(f"Lexicon refresh failed: {str(e)}")
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    @staticmethod
+    def percentile(values: List[float], pct: float) -> float:
+        """
+        Percentile con interpolazione lineare.
+        """
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        position = (len(ordered) - 1) * pct / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    def _update_gauges(self) -> None:
+        self.metrics.set_gauge('service_in_flight', {}, self.in_flight,
+                               help_text="Generation requests running or queued")
+        self.metrics.set_gauge('service_queue_depth', {}, self.queue_depth,
+                               help_text="Generation requests waiting for a worker")
+
+    @staticmethod
+    def _int_param(body: Dict, name: str, default: Optional[int], low: int, high: int) -> Optional[int]:
+        value = body.get(name, default)
+        if value is None:
+            return None
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise RequestError(f"{name} must be an integer")
+        if value < low or value > high:
+            raise RequestError(f"{name} must be between {low} and {high}")
+        return value
+
+    def parse_request(self, body: Dict) -> Dict[str, Any]:
+        """
+        Valida i parametri di generazione con gli stessi limiti della CLI.
+        """
+        if not isinstance(body, dict):
+            raise RequestError("Request body must be a JSON object")
+
+        generator_type = body.get('type')
+        if not generator_type:
+            raise RequestError("type is required")
+        if not generator_registry.is_registered(generator_type):
+            raise RequestError(f"Invalid generator type: {generator_type} "
+                               f"(available: {', '.join(generator_registry.names())})")
+
+        request = {
+            'type': generator_type,
+            'size': self._int_param(body, 'size', 15, 5, 30),
+            'cell_size': self._int_param(body, 'cell_size', 75, 20, 200),
+            'max_attempts': self._int_param(body, 'max_attempts', 3, 1, 10),
+            'seed': body.get('seed'),
+            'generator_kwargs': {}
+        }
+        if request['seed'] is None:
+            request['seed'] = random.getrandbits(32)
+        elif not isinstance(request['seed'], (int, str)) or isinstance(request['seed'], bool):
+            raise RequestError("seed must be an integer or a string")
+
+        if generator_type == 'hidden':
+            hidden_length = self._int_param(body, 'hidden_length', None, 5, 15)
+            if hidden_length is None:
+                raise RequestError("hidden_length is required for hidden type crossword")
+            min_words = self._int_param(body, 'min_words', None, 3, 20)
+            max_words = self._int_param(body, 'max_words', None, 3, 20)
+            if min_words is not None and max_words is not None and min_words > max_words:
+                raise RequestError("Minimum words cannot be greater than maximum words")
+
+            request['generator_kwargs']['hidden_word_length'] = hidden_length
+            if min_words is not None:
+                request['generator_kwargs']['min_words'] = min_words
+            if max_words is not None:
+                request['generator_kwargs']['max_words'] = max_words
+
+        return request
+
+    async def generate(self, body: Dict) -> Tuple[int, Dict]:
+        """
+        Esegue una richiesta di generazione e restituisce (status HTTP, documento JSON).
+        """
+        try:
+            request = self.parse_request(body)
+        except RequestError as e:
+            return 400, {'error': str(e)}
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        # Con un seed esplicito il puzzle deve essere riproducibile: niente pool
+        if self.pool is not None and body.get('seed') is None:
+            pooled = await loop.run_in_executor(None, self.pool.take, request)
+            if pooled is not None:
+                latency = self._record_latency(request, started)
+                return 200, {**pooled['data'], 'service': {
+                    'seed': pooled['seed'],
+                    'pooled': True,
+                    'latency_ms': round(latency * 1000, 3)
+                }}
+
+        if self.in_flight >= self.capacity:
+            self.metrics.inc('service_rejected_total', {},
+                             help_text="Generation requests rejected because the queue was full")
+            return 503, {'error': 'Generation queue is full', 'queue_depth': self.queue_depth}
+
+        self.in_flight += 1
+        self._update_gauges()
+        try:
+            outcome = await loop.run_in_executor(self.executor, generate_in_worker, request)
+        finally:
+            self.in_flight -= 1
+            self._update_gauges()
+
+        self.metrics.merge_snapshot(outcome['metrics'])
+        latency = self._record_latency(request, started)
+
+        service_info = {
+            'seed': request['seed'],
+            'pooled': False,
+            'generation_ms': round(outcome['elapsed_ms'], 3),
+            'latency_ms': round(latency * 1000, 3)
+        }
+        if not outcome['success']:
+            return 422, {'error': outcome['result'], 'service': service_info}
+
+        # L'utilizzo viene registrato alla consegna, senza attendere il database
+        if self.db_config and outcome['word_ids']:
+            guid = outcome['data']['crossword_data']['metadata']['guid']
+            loop.run_in_executor(None, DatabaseUtils.update_words_usage, self.db_config,
+                                 outcome['word_ids'], f"service:{guid}")
+        return 200, {**outcome['data'], 'service': service_info}
+
+    def repair(self, body: Dict) -> Tuple[int, Dict]:
+        """
+        Sostituisce una parola di un cruciverba già consegnato ({"crossword": documento,
+        "word": numero o testo, "keep_solution": bool}). Costa pochi millisecondi, quindi
+        viene eseguita direttamente sul lessico completo, senza passare dai worker.
+        """
+        if not isinstance(body, dict) or not isinstance(body.get('crossword'), dict):
+            return 400, {'error': 'crossword must be a crossword JSON document'}
+        if body.get('word') is None:
+            return 400, {'error': 'word is required'}
+
+        try:
+            repair = PuzzleRepair(body['crossword'], self.word_list)
+            position = repair.find_word(body['word'])
+            result = repair.repair(position, keep_solution=bool(body.get('keep_solution')))
+        except (KeyError, TypeError) as e:
+            return 400, {'error': f"Invalid crossword document: {str(e)}"}
+        except RepairError as e:
+            return 422, {'error': str(e)}
+
+        self.metrics.inc('service_repairs_total', {},
+                         help_text="Words replaced in delivered crosswords")
+        if self.db_config:
+            guid = repair.data.get('metadata', {}).get('guid')
+            asyncio.get_running_loop().run_in_executor(
+                None, PuzzleRepair.update_usage, self.db_config, result, f"service:{guid}")
+        return 200, {**repair.document, 'service': {
+            'repaired_word': position + 1,
+            'repair_ms': round(result['elapsed_ms'], 3)
+        }}
+
+    def _record_latency(self, request: Dict[str, Any], started: float) -> float:
+        latency = time.perf_counter() - started
+        self.latencies.append(latency)
+        self.metrics.observe('service_request_seconds', {'type': request['type']}, latency,
+                             self.LATENCY_BUCKETS,
+                             help_text="Generation request latency, queueing included")
+        return latency
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Stato del servizio: occupazione del pool, profondità della coda e latenze recenti.
+        """
+        latencies_ms = [latency * 1000 for latency in self.latencies]
+        return {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue_depth,
+            'lexicon_words': len(self.word_list),
+            'lexicon_version': self.lexicon_sync.version if self.lexicon_sync else None,
+            'warm_sizes': sorted(self.warm_lexicons),
+            'pool': self.pool.stats() if self.pool is not None else None,
+            'latency_ms': {
+                'samples': len(latencies_ms),
+                'p50': round(self.percentile(latencies_ms, 50), 3),
+                'p99': round(self.percentile(latencies_ms, 99), 3)
+            }
+        }
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict, bytes]:
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        if not request_line:
+            raise RequestError("Empty request")
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise RequestError("Malformed request line")
+        method, target, _ = parts
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length') or 0)
+        if length > self.MAX_BODY_BYTES:
+            raise RequestError("Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method, target.split('?', 1)[0], headers, body
+
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, status: int, payload: Any,
+                              content_type: str = 'application/json') -> None:
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                   422: 'Unprocessable Entity', 500: 'Internal Server Error',
+                   503: 'Service Unavailable'}
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        headers = [
+            f"HTTP/1.1 {status} {reasons.get(status, '')}",
+            f"Content-Type: {content_type}; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Connection: close"
+        ]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        """
+        Gestisce una connessione HTTP/1.1 (una richiesta per connessione).
+        """
+        status = 500
+        try:
+            try:
+                method, path, _, body = await self._read_request(reader)
+            except (RequestError, ValueError) as e:
+                status = 400
+                await self._write_response(writer, status, {'error': str(e)})
+                return
+
+            if path == '/generate':
+                if method != 'POST':
+                    status = 405
+                    await self._write_response(writer, status, {'error': 'Use POST'})
+                    return
+                try:
+                    payload = json.loads(body or b'{}')
+                except ValueError:
+                    status = 400
+                    await self._write_response(writer, status, {'error': 'Invalid JSON body'})
+                    return
+                status, response = await self.generate(payload)
+                await self._write_response(writer, status, response)
+            elif path == '/repair':
+                if method != 'POST':
+                    status = 405
+                    await self._write_response(writer, status, {'error': 'Use POST'})
+                    return
+                try:
+                    payload = json.loads(body or b'{}')
+                except ValueError:
+                    status = 400
+                    await self._write_response(writer, status, {'error': 'Invalid JSON body'})
+                    return
+                status, response = self.repair(payload)
+                await self._write_response(writer, status, response)
+            elif path == '/refresh':
+                if method != 'POST':
+                    status = 405
+                    await self._write_response(writer, status, {'error': 'Use POST'})
+                    return
+                try:
+                    response = await self.refresh_lexicon()
+                    status = 200
+                except RequestError as e:
+                    status, response = 400, {'error': str(e)}
+                await self._write_response(writer, status, response)
+            elif path == '/health' and method == 'GET':
+                status = 200
+                await self._write_response(writer, status, self.health())
+            elif path == '/metrics' and method == 'GET':
+                status = 200
+                await self._write_response(writer, status, self.metrics.to_prometheus(),
+                                           content_type='text/plain; version=0.0.4')
+            else:
+                status = 404
+                await self._write_response(writer, status, {'error': f"Unknown path: {path}"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logging.exception(f"Error handling request: {str(e)}")
+            try:
+                await self._write_response(writer, 500, {'error': 'Internal server error'})
+            except ConnectionError:
+                pass
+        finally:
+            self.metrics.inc('service_requests_total', {'status': status},
+                             help_text="HTTP requests served, by status code")
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765,
+                    unix_socket: Optional[str] = None) -> None:
+        """
+        Avvia il server HTTP (TCP o socket Unix) e resta in ascolto fino a SIGINT/SIGTERM.
+        """
+        if self.executor is None:
+            self.start_pool()
+
+        if unix_socket:
+            if os.path.exists(unix_socket):
+                os.unlink(unix_socket)
+            self._server = await asyncio.start_unix_server(self.handle_connection, path=unix_socket)
+            logging.info(f"Generation service listening on unix socket {unix_socket}")
+        else:
+            self._server = await asyncio.start_server(self.handle_connection, host, port)
+            logging.info(f"Generation service listening on http://{host}:{port}")
+
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        refresher = None
+        if self.lexicon_sync is not None and self.refresh_interval:
+            refresher = asyncio.ensure_future(self._refresh_periodically())
+
+        try:
+            async with self._server:
+                await stop_event.wait()
+        finally:
+            logging.info("Shutting down generation service")
+            if refresher is not None:
+                refresher.cancel()
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+            if self.pool is not None:
+                self.pool.close()
+            if unix_socket and os.path.exists(unix_socket):
+                os.unlink(unix_socket)
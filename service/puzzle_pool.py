@@ -0,0 +1,217 @@
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Any
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from service.generation_service import create_worker_pool, generate_in_worker
+from utils.db_utils import DatabaseUtils
+from utils.metrics import GenerationMetrics, generation_metrics
+
+
+class PuzzlePool:
+    """
+    Pool di cruciverba pre-generati, indicizzati per (tipo, dimensione, parametri)
+    e salvati in un file SQLite. Worker in background lo mantengono alla profondità
+    obiettivo; l'utilizzo delle parole viene registrato quando un puzzle viene preso.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS puzzles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        pool_key TEXT NOT NULL,
+        created REAL NOT NULL,
+        seed TEXT,
+        data TEXT NOT NULL,
+        word_ids TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_puzzles_pool_key ON puzzles (pool_key, id);
+    """
+
+    def __init__(self, path: str, word_list: List, warm_lexicons: Dict[int, List] = None,
+                 target_depth: int = 5, workers: int = 1, db_config: Optional[Dict] = None,
+                 metrics: GenerationMetrics = None):
+        self.path = path
+        self.word_list = word_list
+        self.warm_lexicons = warm_lexicons or {}
+        self.target_depth = target_depth
+        self.workers = workers
+        self.db_config = db_config
+        self.metrics = metrics or generation_metrics
+        self.executor = None
+        self._specs: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Autocommit: le transazioni sono aperte esplicitamente dove servono
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ':memory:':
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(self.SCHEMA)
+
+    @staticmethod
+    def pool_key(request: Dict[str, Any]) -> str:
+        """
+        Chiave del pool: tipo, dimensione e parametri che influenzano il puzzle (non il seed).
+        """
+        return json.dumps({
+            'type': request['type'],
+            'size': request['size'],
+            'cell_size': request['cell_size'],
+            **request['generator_kwargs']
+        }, sort_keys=True)
+
+    def start(self) -> None:
+        """
+        Avvia i worker di riempimento e riporta alla profondità obiettivo le chiavi note.
+        """
+        if self.executor is None:
+            self.executor = create_worker_pool(self.word_list, self.warm_lexicons, self.workers)
+            logging.info(f"Started puzzle pool {self.path} with {self.workers} refill workers "
+                         f"(target depth {self.target_depth})")
+        for key in list(self._specs):
+            self.refill(key)
+
+    def close(self) -> None:
+        """
+        Ferma i worker di riempimento; i puzzle già pronti restano nel file.
+        """
+        self._closed = True
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        with self._lock:
+            self._connection.close()
+
+    def update_lexicon(self, word_list: List, warm_lexicons: Dict[int, List]) -> None:
+        """
+        Passa a un lessico aggiornato: i nuovi riempimenti usano worker che ereditano il
+        nuovo lessico, quelli in corso terminano sul vecchio.
+        """
+        with self._lock:
+            self.word_list = word_list
+            self.warm_lexicons = warm_lexicons
+            old_executor = self.executor
+            if old_executor is None or self._closed:
+                return
+            self.executor = create_worker_pool(word_list, warm_lexicons, self.workers)
+        old_executor.shutdown(wait=False)
+
+    def register(self, request: Dict[str, Any]) -> str:
+        """
+        Aggiunge una configurazione da mantenere piena e ne restituisce la chiave.
+        """
+        key = self.pool_key(request)
+        if key not in self._specs:
+            self._specs[key] = {k: v for k, v in request.items() if k != 'seed'}
+            self._pending.setdefault(key, 0)
+        return key
+
+    def depth(self, key: str) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM puzzles WHERE pool_key = ?", (key,)).fetchone()[0]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Profondità e generazioni in corso per ogni configurazione registrata.
+        """
+        return {key: {'depth': self.depth(key), 'pending': self._pending.get(key, 0)}
+                for key in self._specs}
+
+    def take(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Preleva subito un puzzle pronto (o None se il pool è vuoto), registra l'utilizzo
+        delle sue parole e avvia il riempimento.
+        """
+        key = self.register(request)
+        with self._lock:
+            # BEGIN IMMEDIATE: più processi possono condividere lo stesso file
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT id, seed, data, word_ids FROM puzzles WHERE pool_key = ? "
+                    "ORDER BY id LIMIT 1", (key,)).fetchone()
+                if row is not None:
+                    self._connection.execute("DELETE FROM puzzles WHERE id = ?", (row[0],))
+                self._connection.execute("COMMIT")
+            except sqlite3.Error:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        self.refill(key)
+        labels = {'type': request['type'], 'grid_size': request['size']}
+        if row is None:
+            self.metrics.inc('pool_take_total', {**labels, 'result': 'miss'},
+                             help_text="Puzzle pool lookups, by outcome")
+            return None
+
+        self.metrics.inc('pool_take_total', {**labels, 'result': 'hit'},
+                         help_text="Puzzle pool lookups, by outcome")
+        data = json.loads(row[2])
+        self.record_usage(json.loads(row[3]), data)
+        return {'seed': json.loads(row[1]), 'data': data}
+
+    def record_usage(self, word_ids: List[int], data: Dict[str, Any]) -> None:
+        """
+        Aggiorna nel database i contatori di utilizzo delle parole di un puzzle consegnato.
+        """
+        if not self.db_config or not word_ids:
+            return
+        guid = data['crossword_data']['metadata']['guid']
+        DatabaseUtils.update_words_usage(self.db_config, word_ids, f"pool:{guid}")
+
+    def refill(self, key: str) -> None:
+        """
+        Avvia in background le generazioni che mancano per raggiungere la profondità obiettivo.
+        """
+        if self.executor is None or self._closed:
+            return
+        depth = self.depth(key)
+        submitted = []
+        with self._lock:
+            missing = self.target_depth - depth - self._pending[key]
+            if missing <= 0:
+                return
+            self._pending[key] += missing
+            # Sotto il lock: update_lexicon non può chiudere l'executor nel frattempo
+            for _ in range(missing):
+                request = {**self._specs[key], 'seed': random.getrandbits(32)}
+                submitted.append((self.executor.submit(generate_in_worker, request),
+                                  request['seed']))
+
+        for future, seed in submitted:
+            future.add_done_callback(lambda f, key=key, seed=seed: self._store(key, seed, f))
+
+    def _store(self, key: str, seed: Any, future: Future) -> None:
+        outcome = None
+        if not future.cancelled():
+            try:
+                outcome = future.result()
+            except Exception as e:
+                logging.error(f"Puzzle pool refill failed for {key}: {str(e)}")
+
+        if outcome is not None:
+            self.metrics.merge_snapshot(outcome['metrics'])
+            if not outcome['success']:
+                self.metrics.inc('pool_refill_failures_total', {'type': self._specs[key]['type']},
+                                 help_text="Background pool generations that failed")
+                logging.warning(f"Puzzle pool refill could not generate a puzzle for {key}")
+
+        # Il puzzle viene inserito prima di liberare il posto in _pending, così un
+        # riempimento concorrente non genera puzzle in eccesso
+        with self._lock:
+            self._pending[key] -= 1
+            if self._closed or outcome is None or not outcome['success']:
+                return
+            self._connection.execute(
+                "INSERT INTO puzzles (pool_key, created, seed, data, word_ids) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, time.time(), json.dumps(seed),
+                 json.dumps(outcome['data'], ensure_ascii=False),
+                 json.dumps(outcome['word_ids'])))
+        self.metrics.set_gauge('pool_depth', {'pool_key': key}, self.depth(key),
+                               help_text="Ready puzzles in the pool, by configuration")
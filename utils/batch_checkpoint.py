@@ -0,0 +1,176 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import os
+import random
+import shutil
+from utils.db_utils import DatabaseUtils
+
+
+class CheckpointError(Exception):
+    """Manifest di checkpoint illeggibile o di una versione non supportata."""
+
+
+class BatchCheckpoint:
+    """
+    Manifest di checkpoint di un batch di cruciverba, riscritto in modo atomico (file
+    temporaneo e os.replace) dopo ogni puzzle, così un batch interrotto riprende da dove
+    si era fermato.
+    Il manifest contiene i parametri del batch, lo stato del generatore dei seed e, per ogni
+    puzzle concluso, seed, guid, directory, soluzioni (per ricostruire il UsageLedger) e
+    id delle parole con lo stato del loro utilizzo: 'pending' finché i contatori di
+    clues_usage non sono aggiornati, poi 'applied'.
+    Il puzzle in corso è annotato prima di generarlo: alla ripresa la sua directory
+    parziale viene rimossa e il puzzle rigenerato con lo stesso seed.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, data: Dict[str, Any]):
+        self.path = path
+        self.data = data
+        self.rng = random.Random()
+        state = data['rng_state']
+        self.rng.setstate((state[0], tuple(state[1]), state[2]))
+
+    @classmethod
+    def create(cls, path: str, args: Dict[str, Any], seed: Optional[int] = None) -> 'BatchCheckpoint':
+        """
+        Nuovo manifest per i parametri args; senza seed ne viene scelto uno casuale.
+        """
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        version, internal, gauss = random.Random(seed).getstate()
+        checkpoint = cls(path, {
+            'version': cls.VERSION,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'args': args,
+            'seed': seed,
+            'rng_state': [version, list(internal), gauss],
+            'in_progress': None,
+            'puzzles': []
+        })
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def load(cls, path: str) -> 'BatchCheckpoint':
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CheckpointError(f"Cannot read checkpoint {path}: {str(e)}")
+        if not isinstance(data, dict) or data.get('version') != cls.VERSION:
+            raise CheckpointError(f"Unsupported checkpoint {path}")
+        return cls(path, data)
+
+    def save(self) -> None:
+        self.data['updated'] = datetime.now().isoformat(timespec='seconds')
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    @property
+    def args(self) -> Dict[str, Any]:
+        return self.data['args']
+
+    @property
+    def puzzles(self) -> List[Dict[str, Any]]:
+        return self.data['puzzles']
+
+    @property
+    def next_number(self) -> int:
+        return len(self.puzzles) + 1
+
+    def failed(self) -> int:
+        return sum(1 for puzzle in self.puzzles if puzzle['status'] != 'generated')
+
+    def recover(self) -> Optional[str]:
+        """
+        Rimuove la directory del puzzle interrotto a metà, se esiste, e la restituisce.
+        """
+        in_progress = self.data['in_progress']
+        if in_progress is None:
+            return None
+        self.data['in_progress'] = None
+        self.save()
+        output_dir = in_progress.get('output_dir')
+        if output_dir and os.path.isdir(output_dir):
+            shutil.rmtree(output_dir)
+            return output_dir
+        return None
+
+    def replay(self, ledger) -> None:
+        """
+        Ricostruisce gli utilizzi del batch nel registro, nell'ordine di generazione.
+        """
+        for puzzle in self.puzzles:
+            if puzzle['solutions']:
+                ledger.record(puzzle['solutions'])
+
+    def next_seed(self) -> int:
+        """
+        Seed del prossimo puzzle. Lo stato salvato è quello dopo l'ultimo puzzle concluso,
+        quindi un puzzle interrotto riceve alla ripresa lo stesso seed.
+        """
+        return self.rng.getrandbits(32)
+
+    def start(self, number: int, seed: int, output_dir: Optional[str]) -> None:
+        self.data['in_progress'] = {'number': number, 'seed': seed, 'output_dir': output_dir}
+        self.save()
+
+    def complete(self, number: int, seed: int, generator, status: str,
+                 track_usage: bool) -> Dict[str, Any]:
+        """
+        Registra un puzzle concluso ('generated', 'invalid' o 'failed'). Le parole di un
+        puzzle generato restano 'pending' finché apply_usage non aggiorna clues_usage.
+        """
+        generated = status != 'failed'
+        puzzle = {
+            'number': number,
+            'seed': seed,
+            'status': status,
+            'guid': str(generator.guid),
+            'output_dir': generator.output_dir,
+            # Il registro conta anche i puzzle scartati dalla validazione (vedi record_generation)
+            'solutions': list(generator.used_solutions()) if generated else [],
+            'word_ids': list(generator.used_word_ids) if status == 'generated' else [],
+            'usage': 'pending' if track_usage and status == 'generated' else None
+        }
+        self.puzzles.append(puzzle)
+        version, internal, gauss = self.rng.getstate()
+        self.data['rng_state'] = [version, list(internal), gauss]
+        self.data['in_progress'] = None
+        self.save()
+        return puzzle
+
+    def pending_usage(self) -> List[Dict[str, Any]]:
+        return [puzzle for puzzle in self.puzzles if puzzle['usage'] == 'pending']
+
+    def apply_usage(self, db_config: Dict, puzzle: Dict[str, Any],
+                    resuming: bool = False) -> bool:
+        """
+        Aggiorna clues_usage per le parole di un puzzle e lo segna come 'applied'.
+        Riprendendo un batch, le parole il cui output_path è già la directory del puzzle
+        sono saltate: erano state contate prima dell'interruzione.
+        Restituisce False (il puzzle resta 'pending') se il database non risponde.
+        """
+        word_ids = puzzle['word_ids']
+        output_dir = puzzle['output_dir']
+        try:
+            if resuming:
+                paths = DatabaseUtils.get_usage_paths(db_config, word_ids)
+                word_ids = [word_id for word_id in word_ids if paths.get(word_id) != output_dir]
+            for word_id in word_ids:
+                DatabaseUtils.update_word_usage(db_config, word_id, output_dir)
+        except Exception as e:
+            logging.error(f"Failed to update word usage for crossword {puzzle['guid']}: "
+                          f"{str(e)}")
+            return False
+        puzzle['usage'] = 'applied'
+        self.save()
+        return True
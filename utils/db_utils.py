@@ -1,16 +1,27 @@
-from typing import List, Dict, Tuple, Optional
-import mysql.connector
+from typing import List, Dict, Tuple, Optional, Any
 import logging
+import random
+import re
+from base.lexicon_entry import LexiconEntry
 
 class DatabaseUtils:
     @staticmethod
-    def get_word_list_from_db(db_config: Dict, grid_size: int) -> List[Dict]:
+    def _driver():
         """
-        Recupera la lista di parole dal database.
+        Importa il driver MySQL solo quando il database viene effettivamente usato.
         """
+        import mysql.connector
+        return mysql.connector
+
+    @staticmethod
+    def get_word_list_from_db(db_config: Dict, grid_size: int) -> List[LexiconEntry]:
+        """
+        Recupera la lista di parole dal database come record compatti.
+        """
+        driver = DatabaseUtils._driver()
         try:
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
+            connection = driver.connect(**db_config)
+            cursor = connection.cursor()
 
             query = """
             SELECT c.id, c.solution, c.clue, c.word_pattern, c.num_words,
@@ -21,7 +32,8 @@ class DatabaseUtils:
             ORDER BY COALESCE(cu.count, 0) ASC, RAND()
             """
             cursor.execute(query, (grid_size,))
-            word_list = cursor.fetchall()
+            # Le colonne sono nello stesso ordine dei campi di LexiconEntry
+            word_list = [LexiconEntry(*row) for row in cursor]
 
             cursor.close()
             connection.close()
@@ -29,7 +41,105 @@ class DatabaseUtils:
             logging.info(f"Retrieved {len(word_list)} words from database")
             return word_list
 
-        except mysql.connector.Error as err:
+        except driver.Error as err:
+            logging.error(f"Database error: {err}")
+            raise
+
+    @staticmethod
+    def _column(name: str) -> str:
+        """
+        Valida il nome di una colonna passato dalla configurazione (non è un parametro SQL).
+        """
+        if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', name):
+            raise ValueError(f"Invalid column name: {name}")
+        return name
+
+    @staticmethod
+    def get_sync_marks(db_config: Dict, updated_column: Optional[str] = None) -> Tuple[int, Any]:
+        """
+        Punti di sincronizzazione correnti della tabella clues: id massimo e, se indicata,
+        valore massimo della colonna di ultima modifica.
+        """
+        driver = DatabaseUtils._driver()
+        try:
+            connection = driver.connect(**db_config)
+            cursor = connection.cursor()
+            if updated_column:
+                column = DatabaseUtils._column(updated_column)
+                cursor.execute(f"SELECT COALESCE(MAX(id), 0), MAX({column}) FROM clues")
+                max_id, max_updated = cursor.fetchone()
+            else:
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM clues")
+                max_id, max_updated = cursor.fetchone()[0], None
+            cursor.close()
+            connection.close()
+            return max_id, max_updated
+
+        except driver.Error as err:
+            logging.error(f"Database error: {err}")
+            raise
+
+    @staticmethod
+    def get_changed_words(db_config: Dict, since_id: int, updated_column: Optional[str] = None,
+                          since_updated: Any = None, seen: Optional[Dict[int, Tuple]] = None
+                          ) -> Tuple[List[LexiconEntry], int, Any, Dict[int, Tuple]]:
+        """
+        Recupera le voci aggiunte (id oltre since_id) o modificate (colonna di ultima
+        modifica da since_updated in poi) e restituisce anche i nuovi punti di
+        sincronizzazione.
+        Le righe con la colonna uguale a since_updated vengono rilette: una modifica fatta
+        nello stesso istante dell'ultima sincronizzazione ma confermata dopo non va persa.
+        seen contiene il contenuto (id -> campi) delle voci già lette a quel valore, che se
+        invariate vengono scartate; le voci al nuovo valore massimo sono restituite per il
+        refresh successivo.
+        """
+        driver = DatabaseUtils._driver()
+        try:
+            connection = driver.connect(**db_config)
+            cursor = connection.cursor()
+
+            column = DatabaseUtils._column(updated_column) if updated_column else None
+            updated = f", c.{column}" if column else ""
+            query = f"""
+            SELECT c.id, c.solution, c.clue, c.word_pattern, c.num_words,
+                   COALESCE(cu.count, 0) as usage_count{updated}
+            FROM clues c
+            LEFT JOIN clues_usage cu ON c.id = cu.clue_id
+            WHERE c.id > %s
+            """
+            params = [since_id]
+            if column and since_updated is not None:
+                query += f" OR c.{column} >= %s"
+                params.append(since_updated)
+            cursor.execute(query + " ORDER BY c.id", tuple(params))
+
+            rows = cursor.fetchall()
+            max_id, max_updated = since_id, since_updated
+            for row in rows:
+                max_id = max(max_id, row[0])
+                if column and row[6] is not None and \
+                        (max_updated is None or row[6] > max_updated):
+                    max_updated = row[6]
+
+            seen = seen or {}
+            changes = []
+            at_mark: Dict[int, Tuple] = {}
+            for row in rows:
+                content = tuple(row[1:5])
+                if column and row[6] is not None and row[6] == max_updated:
+                    at_mark[row[0]] = content
+                if column and row[6] == since_updated and row[0] <= since_id and \
+                        seen.get(row[0]) == content:
+                    continue
+                changes.append(LexiconEntry(*row[:6]))
+
+            cursor.close()
+            connection.close()
+
+            logging.info(f"Retrieved {len(changes)} changed words from database")
+            return changes, max_id, max_updated, at_mark
+
+        except driver.Error as err:
             logging.error(f"Database error: {err}")
             raise
 
@@ -38,11 +148,12 @@ class DatabaseUtils:
         """
         Aggiorna il contatore di utilizzo per una specifica clue e salva il percorso di output.
         """
+        driver = DatabaseUtils._driver()
         connection = None
         cursor = None
         try:
             logging.info(f"Attempting to update usage for clue_id: {clue_id}")
-            connection = mysql.connector.connect(**db_config)
+            connection = driver.connect(**db_config)
             cursor = connection.cursor()
 
             # Verifica se esiste già un record
@@ -73,7 +184,7 @@ class DatabaseUtils:
             connection.commit()
             logging.info(f"Successfully updated usage for clue_id: {clue_id}")
 
-        except mysql.connector.Error as err:
+        except driver.Error as err:
             logging.error(f"Database error updating usage: {err}")
             if connection:
                 connection.rollback()
@@ -84,6 +195,129 @@ class DatabaseUtils:
             if connection:
                 connection.close()
 
+    @staticmethod
+    def release_word_usage(db_config: Dict, clue_id: int) -> None:
+        """
+        Decrementa il contatore di utilizzo di una clue tolta da un cruciverba (es. sostituita
+        con una riparazione); il contatore non scende sotto zero.
+        """
+        driver = DatabaseUtils._driver()
+        connection = None
+        cursor = None
+        try:
+            connection = driver.connect(**db_config)
+            cursor = connection.cursor()
+            cursor.execute(
+                "UPDATE clues_usage SET count = count - 1 WHERE clue_id = %s AND count > 0",
+                (clue_id,))
+            connection.commit()
+            logging.info(f"Released usage for clue_id: {clue_id}")
+
+        except driver.Error as err:
+            logging.error(f"Database error releasing usage: {err}")
+            if connection:
+                connection.rollback()
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    @staticmethod
+    def get_usage_paths(db_config: Dict, clue_ids: List[int]) -> Dict[int, str]:
+        """
+        Ultimo output_path registrato in clues_usage per ogni clue (solo quelle presenti).
+        """
+        if not clue_ids:
+            return {}
+        driver = DatabaseUtils._driver()
+        try:
+            connection = driver.connect(**db_config)
+            cursor = connection.cursor()
+            paths = {}
+            for start in range(0, len(clue_ids), 1000):
+                chunk = clue_ids[start:start + 1000]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"SELECT clue_id, output_path FROM clues_usage "
+                               f"WHERE clue_id IN ({placeholders})", tuple(chunk))
+                paths.update(cursor.fetchall())
+            cursor.close()
+            connection.close()
+            return paths
+
+        except driver.Error as err:
+            logging.error(f"Database error: {err}")
+            raise
+
+    @staticmethod
+    def add_words_usage(db_config: Dict, usage: Dict[int, int], output_path: str) -> None:
+        """
+        Somma a clues_usage gli utilizzi di molte clue (clue_id -> utilizzi) in una sola
+        transazione: o sono registrati tutti o nessuno.
+        """
+        if not usage:
+            return
+        driver = DatabaseUtils._driver()
+        connection = None
+        cursor = None
+        try:
+            connection = driver.connect(**db_config)
+            cursor = connection.cursor()
+            clue_ids = list(usage)
+            existing = set()
+            for start in range(0, len(clue_ids), 1000):
+                chunk = clue_ids[start:start + 1000]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    f"SELECT clue_id FROM clues_usage WHERE clue_id IN ({placeholders})",
+                    tuple(chunk))
+                existing.update(row[0] for row in cursor.fetchall())
+
+            updates = [(usage[clue_id], output_path, clue_id)
+                       for clue_id in clue_ids if clue_id in existing]
+            inserts = [(clue_id, usage[clue_id], output_path)
+                       for clue_id in clue_ids if clue_id not in existing]
+            if updates:
+                cursor.executemany("""
+                UPDATE clues_usage
+                SET count = count + %s,
+                    last_used = CURRENT_TIMESTAMP,
+                    output_path = %s
+                WHERE clue_id = %s
+                """, updates)
+            if inserts:
+                cursor.executemany("""
+                INSERT INTO clues_usage (clue_id, count, last_used, output_path)
+                VALUES (%s, %s, CURRENT_TIMESTAMP, %s)
+                """, inserts)
+            connection.commit()
+            logging.info(f"Added usage for {len(clue_ids)} clues "
+                         f"({len(updates)} updated, {len(inserts)} new)")
+
+        except driver.Error as err:
+            logging.error(f"Database error adding usage: {err}")
+            if connection:
+                connection.rollback()
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    @staticmethod
+    def update_words_usage(db_config: Dict, clue_ids: List[int], output_path: str) -> None:
+        """
+        Aggiorna il contatore di utilizzo di tutte le parole di un cruciverba consegnato.
+        Gli errori vengono registrati nel log senza interrompere la consegna.
+        """
+        for clue_id in clue_ids:
+            try:
+                DatabaseUtils.update_word_usage(db_config, clue_id, output_path)
+            except Exception as e:
+                logging.error(f"Failed to update word usage for clue_id {clue_id}: {str(e)}")
+
     @staticmethod
     def find_word(word_list: List[Dict],
                  length_range: Tuple[int, int],
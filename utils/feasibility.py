@@ -0,0 +1,277 @@
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import math
+import random
+from generators.hidden_word_a import HiddenWordAGenerator
+from generators.registry import generator_registry
+from utils.lexicon_index import LexiconIndex
+from utils.metrics import GenerationMetrics
+
+
+class FeasibilityAnalyzer:
+    """
+    Stima, prima di generare, la probabilità di successo di un tipo di cruciverba con
+    certi parametri, a partire dall'indice del lessico.
+    - hidden: esatta. Una parola nascosta è utilizzabile se almeno min_words delle sue
+      lettere hanno una parola orizzontale distinta che le incrocia alla colonna chiave
+      (parole per lettera e scostamento della colonna chiave, LexiconIndex.crossing_words);
+      in tal caso il tentativo riesce, quindi basta contare le parole nascoste utilizzabili.
+    - template: consistenza d'arco (AC-3) dei domini iniziali dello schema, come nel
+      generatore, e stima del numero atteso di riempimenti dai conteggi per
+      (lunghezza, posizione, lettera).
+    - type_a, type_b, type_c: ogni passo a lunghezza fissa (prima parola e parole che la
+      incrociano) deve trovare nel lessico parole di quelle lunghezze che stiano nella
+      griglia; condizione necessaria, il resto lo decidono i tentativi di prova.
+    Queste verifiche (check) sono immediate. analyze aggiunge, per i casi che la sola
+    analisi non decide, la frazione di successi su alcuni tentativi di prova con seed fissi.
+    """
+
+    # Lunghezze cercate dai passi di type_a, type_b e type_c, nell'ordine dei passi:
+    # la prima parola (place_first_word) e le parole che la incrociano
+    STEP_LENGTHS = {
+        'type_a': ((8, 12), (6, 8)),
+        'type_b': ((8, 12), (12, 14), (5, 8)),
+        'type_c': ((8, 12), (4, 10), (6, 10))
+    }
+    # Valori predefiniti di HiddenWordGenerator e limiti della CLI
+    HIDDEN_LENGTHS = (5, 8)
+    HIDDEN_MIN_WORDS = 5
+    HIDDEN_LENGTH_RANGE = (5, 15)
+    MIN_WORDS_FLOOR = 3
+
+    def __init__(self, word_list: List):
+        self.word_list = word_list
+        self.index = LexiconIndex.for_word_list(word_list)
+
+    def position_counts(self, length: int) -> List[Dict[str, int]]:
+        """
+        Numero di parole di lunghezza data per posizione e lettera.
+        """
+        return [{letter: bin(bits).count('1') for letter, bits in position.items()}
+                for position in self.index.letter_bitsets(length)]
+
+    def crossing_counts(self, size: int, key_column: Optional[int] = None) -> Dict[str, int]:
+        """
+        Per ogni lettera, parole orizzontali (con posizione) che attraversano la colonna
+        chiave (per default quella centrale, come nel tipo hidden) con quella lettera.
+        """
+        if key_column is None:
+            key_column = size // 2
+        return self.index.crossing_counts(key_column, size, (3, min(15, size)))
+
+    def hidden_rows(self, size: int, length: int) -> array:
+        """
+        Istogramma delle parole nascoste di lunghezza data per numero di righe incrociabili
+        con parole distinte (HiddenWordAGenerator.feasible_rows): l'elemento r conta le
+        parole con r righe riempibili.
+        """
+        def build() -> array:
+            crossing = self.index.crossing_words(size // 2, size, (3, min(15, size)))
+            histogram = array('I', [0] * (length + 1))
+            solutions = self.index.solutions
+            for word_id in self.index.by_length.get(length, ()):
+                rows = HiddenWordAGenerator.feasible_rows(solutions[word_id], crossing,
+                                                          size // 2, size)
+                histogram[rows] += 1
+            return histogram
+
+        return self.index.derived(('feasibility_hidden_rows', size, length), build)
+
+    def hidden_candidates(self, size: int, length: int, min_words: int) -> int:
+        """
+        Parole nascoste di lunghezza data con almeno min_words righe incrociabili.
+        """
+        if length > size:
+            return 0
+        return sum(self.hidden_rows(size, length)[min_words:])
+
+    def suggest_hidden(self, size: int, length: Optional[int], min_words: int,
+                       max_words: Optional[int] = None) -> Optional[Dict[str, int]]:
+        """
+        Parametri fattibili più vicini (lunghezza della parola nascosta e parole minime),
+        a parità di distanza quelli con più parole nascoste utilizzabili.
+        """
+        if length is None:
+            length = self.HIDDEN_LENGTHS[1]
+        best: Optional[Tuple[Tuple[int, int], Dict[str, int]]] = None
+        for candidate_length in range(self.HIDDEN_LENGTH_RANGE[0],
+                                      min(self.HIDDEN_LENGTH_RANGE[1], size) + 1):
+            top = candidate_length if max_words is None else min(candidate_length, max_words)
+            for candidate_min in range(self.MIN_WORDS_FLOOR, top + 1):
+                candidates = self.hidden_candidates(size, candidate_length, candidate_min)
+                if not candidates:
+                    continue
+                rank = (abs(candidate_length - length) + abs(candidate_min - min_words),
+                        -candidates)
+                if best is None or rank < best[0]:
+                    best = (rank, {'hidden_word_length': candidate_length,
+                                   'min_words': candidate_min})
+        return best[1] if best else None
+
+    def _check_hidden(self, size: int, params: Dict[str, Any]) -> Dict[str, Any]:
+        min_words = params.get('min_words', self.HIDDEN_MIN_WORDS)
+        length = params.get('hidden_word_length')
+        low, high = self.HIDDEN_LENGTHS
+        lengths = [length] if length is not None else list(range(low, high + 1))
+        candidates = {candidate_length: self.hidden_candidates(size, candidate_length, min_words)
+                      for candidate_length in lengths}
+        # La lunghezza è estratta a caso tra quelle ammesse: riesce se ha parole utilizzabili
+        probability = sum(1 for count in candidates.values() if count) / len(lengths)
+
+        reason = None
+        if not probability:
+            if length is not None and length > size:
+                reason = f"a hidden word of {length} letters does not fit a {size}x{size} grid"
+            elif length is not None and min_words > length:
+                reason = f"a hidden word of {length} letters crosses at most {length} words"
+            else:
+                reason = (f"no hidden word of {'/'.join(map(str, lengths))} letters has "
+                          f"{min_words} letters crossable by distinct words at column {size // 2}")
+        crossing = self.crossing_counts(size)
+        return self._report(probability, reason, {
+            'min_words': min_words,
+            'hidden_words': {str(candidate_length):
+                             len(self.index.by_length.get(candidate_length, ()))
+                             for candidate_length in lengths},
+            'candidates': {str(candidate_length): count
+                           for candidate_length, count in candidates.items()},
+            'crossable_letters': ''.join(sorted(letter for letter, count in crossing.items()
+                                                if count))
+        }, None if probability == 1 else self.suggest_hidden(size, length, min_words,
+                                                             params.get('max_words')))
+
+    def _check_template(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        template = params.get('template')
+        if not template:
+            # Schema casuale: deciso solo dai tentativi di prova
+            return None
+        generator = generator_registry.get('template')(grid_size=len(template),
+                                                       word_list=self.word_list,
+                                                       write_output=False)
+        generator.set_template(template)
+        slots = generator.find_slots(generator.template)
+        domains = generator.initial_domains(generator.template, slots)
+        details = {
+            'slots': len(slots),
+            'slot_lengths': sorted({slot.length for slot in slots}),
+            'smallest_domain': min((bin(domain).count('1') for domain in domains), default=0)
+        }
+        if not slots:
+            return self._report(0.0, "the template has no slots to fill", details)
+        if not all(domains) or not generator._propagate(domains, slots):
+            return self._report(0.0, "the template has no consistent fill with this lexicon",
+                                details)
+        details['log10_expected_fills'] = round(self._log10_expected_fills(slots, domains), 1)
+        return self._report(None, None, details)
+
+    def _log10_expected_fills(self, slots: List, domains: List[int]) -> float:
+        """
+        Logaritmo del numero atteso di riempimenti: prodotto delle dimensioni dei domini per
+        la probabilità che le lettere di ogni incrocio coincidano.
+        """
+        total = sum(math.log10(bin(domain).count('1')) for domain in domains)
+        for slot in slots:
+            counts = self.position_counts(slot.length)
+            size = len(self.index.by_length.get(slot.length, ()))
+            for pos, other, other_pos in slot.crossings:
+                if other.index < slot.index:
+                    continue
+                other_counts = self.position_counts(other.length)[other_pos]
+                other_size = len(self.index.by_length.get(other.length, ()))
+                match = sum(count * other_counts.get(letter, 0)
+                            for letter, count in counts[pos].items()) / (size * other_size)
+                total += math.log10(match) if match else float('-inf')
+        return total
+
+    def _check_step_lengths(self, generator_type: str, size: int) -> Dict[str, Any]:
+        """
+        Parole del lessico utilizzabili da ogni passo a lunghezza fissa: se un passo non ne
+        ha nessuna (troppo lunghe per la griglia o assenti) il tentativo non può riuscire.
+        """
+        words = {}
+        reason = None
+        for step, (low, high) in enumerate(self.STEP_LENGTHS[generator_type], 1):
+            count = sum(len(self.index.by_length.get(length, ()))
+                        for length in range(low, min(high, size) + 1))
+            words[f"{low}-{high}"] = count
+            if not count and reason is None:
+                reason = (f"word {step} needs {low}-{high} letters, which do not fit "
+                          f"a {size}x{size} grid" if size < low
+                          else f"the lexicon has no words of {low}-{high} letters for word {step}")
+        return self._report(0.0 if reason else None, reason, {'step_words': words})
+
+    @staticmethod
+    def _report(probability: Optional[float], reason: Optional[str], details: Dict[str, Any],
+                suggestion: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        return {
+            'method': 'exact' if probability is not None else None,
+            'probability_per_attempt': probability,
+            'reason': reason,
+            'details': details,
+            'suggestion': suggestion
+        }
+
+    def check(self, generator_type: str, size: int,
+              params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Verifica immediata dei parametri (nessun tentativo di generazione).
+        probability_per_attempt è None se l'analisi non basta a stimarla; il risultato è
+        None per i tipi senza verifiche (es. sparse e i plugin).
+        """
+        if generator_type == 'hidden':
+            return self._check_hidden(size, params)
+        if generator_type == 'template':
+            return self._check_template(params)
+        if generator_type in self.STEP_LENGTHS:
+            return self._check_step_lengths(generator_type, size)
+        return None
+
+    @staticmethod
+    def sample(factory: Callable[[], Any], trials: int) -> float:
+        """
+        Frazione di successi su trials generazioni di prova da un tentativo, senza output,
+        registrazione degli utilizzi né metriche, con seed fissi (stato di random ripristinato).
+        I tentativi usano la ricerca first (la beam search vi ricade se non trova nulla) e
+        i log dei generatori sono silenziati fino alla fine dei tentativi.
+        """
+        state = random.getstate()
+        disabled = logging.root.manager.disable
+        logging.disable(logging.ERROR)
+        successes = 0
+        try:
+            for trial in range(trials):
+                random.seed(trial)
+                generator = factory()
+                generator.max_attempts = 1
+                generator.record_usage = False
+                generator.search_mode = 'first'
+                generator.metrics = GenerationMetrics()
+                if "Unable to generate" not in generator.generate_crossword():
+                    successes += 1
+        finally:
+            logging.disable(disabled)
+            random.setstate(state)
+        return successes / trials
+
+    def analyze(self, generator_type: str, size: int, max_attempts: int, params: Dict[str, Any],
+                factory: Optional[Callable[[], Any]] = None, trials: int = 20) -> Dict[str, Any]:
+        """
+        Stima completa: verifica immediata e, se non basta, tentativi di prova di factory.
+        probability è la probabilità di riuscire entro max_attempts tentativi.
+        """
+        report = self.check(generator_type, size, params) or self._report(None, None, {})
+        if report['probability_per_attempt'] is None and factory is not None and trials > 0:
+            report['probability_per_attempt'] = self.sample(factory, trials)
+            report['method'] = 'sampled'
+            report['details']['trials'] = trials
+        probability = report['probability_per_attempt']
+        return {
+            'type': generator_type,
+            'size': size,
+            'max_attempts': max_attempts,
+            'feasible': None if probability is None else probability > 0,
+            'probability': (None if probability is None
+                            else round(1 - (1 - probability) ** max_attempts, 4)),
+            **report
+        }
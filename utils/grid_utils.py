@@ -18,6 +18,18 @@ class GridUtils:
         return [j for j in range(len(grid[0]))
                 if any(grid[i][j] != '_' for i in range(len(grid)))]
 
+    @staticmethod
+    def compute_density(grid: List[List[str]]) -> float:
+        """
+        Calcola la frazione di celle piene nel rettangolo che contiene tutte le lettere.
+        """
+        non_empty_rows = GridUtils.get_non_empty_rows(grid)
+        if not non_empty_rows:
+            return 0.0
+        non_empty_cols = GridUtils.get_non_empty_cols(grid)
+        filled = sum(1 for i in non_empty_rows for j in non_empty_cols if grid[i][j] != '_')
+        return filled / (len(non_empty_rows) * len(non_empty_cols))
+
     @staticmethod
     def create_optimized_grid(grid: List[List[str]],
                             non_empty_rows: List[int],
@@ -35,27 +47,3 @@ class GridUtils:
         """
         return {old_idx: new_idx
                 for new_idx, old_idx in enumerate(non_empty_indices)}
-
-    @staticmethod
-    def can_place_word(grid: List[List[str]],
-                      word: str,
-                      start_row: int,
-                      start_col: int,
-                      vertical: bool = False,
-                      grid_size: int = None) -> bool:
-        """
-        Verifica se una parola può essere piazzata in una posizione specifica.
-        """
-        if grid_size is None:
-            grid_size = len(grid)
-
-        if vertical:
-            if start_row < 0 or start_row + len(word) > grid_size:
-                return False
-            return all(grid[start_row + i][start_col] in ('_', word[i])
-                      for i in range(len(word)))
-        else:
-            if start_col < 0 or start_col + len(word) > grid_size:
-                return False
-            return all(grid[start_row][start_col + i] in ('_', word[i])
-                      for i in range(len(word)))
\ No newline at end of file
@@ -0,0 +1,418 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import List, Dict, Set, Tuple, Optional, Sequence, Any, Callable, Hashable, Iterator
+import logging
+import random
+from utils.nogood_cache import NogoodCache
+
+
+class LexiconIndex:
+    """
+    Indice del lessico per lunghezza e per (lunghezza, posizione, lettera).
+    Gli id sono le posizioni nella word_list; le liste di id sono array compatti.
+    L'indice posizionale di ogni lunghezza viene costruito alla prima interrogazione.
+    """
+
+    _cache: 'OrderedDict[int, LexiconIndex]' = OrderedDict()
+    CACHE_SIZE = 8
+
+    # Estrazioni casuali tentate prima di filtrare i candidati disponibili
+    PICK_TRIES = 8
+    _BIT_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+
+    def __init__(self, word_list: List[Any]):
+        self.words = word_list
+        # Soluzioni in una lista parallela: le scansioni evitano l'accesso per chiave ai record
+        self.solutions: List[str] = [word['solution'] for word in word_list]
+        self.by_length: Dict[int, array] = {}
+        for word_id, solution in enumerate(self.solutions):
+            length = len(solution)
+            ids = self.by_length.get(length)
+            if ids is None:
+                ids = self.by_length[length] = array('I')
+            ids.append(word_id)
+        self.positions: Dict[Tuple[int, int, str], array] = {}
+        self._indexed_lengths = set()
+        # Query fallite: valgono finché il lessico non cambia, quindi vivono con l'indice
+        self.nogoods = NogoodCache()
+        self._derived: Dict[Hashable, Any] = {}
+        # Maschera delle parole utilizzabili (1) per id, impostata da un UsageLedger con
+        # finestra di esclusione; None se tutte le parole sono utilizzabili
+        self.available: Optional[bytearray] = None
+        # Id delle voci in ordine crescente e relative posizioni, per apply_changes
+        self._entry_ids: Optional[array] = None
+        self._entry_positions: Optional[array] = None
+
+    @classmethod
+    def for_word_list(cls, word_list: List[Any]) -> 'LexiconIndex':
+        """
+        Restituisce l'indice della word_list, riusandolo se già costruito.
+        L'indice tiene un riferimento alla lista, quindi il suo id resta valido in cache.
+        """
+        key = id(word_list)
+        index = cls._cache.get(key)
+        if index is not None and index.words is word_list:
+            cls._cache.move_to_end(key)
+            return index
+
+        index = cls(word_list)
+        cls.register(index)
+        logging.debug(f"Built lexicon index for {len(word_list)} words")
+        return index
+
+    @classmethod
+    def register(cls, index: 'LexiconIndex') -> None:
+        """
+        Registra in cache un indice costruito per la sua word_list (es. da apply_changes).
+        """
+        key = id(index.words)
+        cls._cache[key] = index
+        cls._cache.move_to_end(key)
+        while len(cls._cache) > cls.CACHE_SIZE:
+            cls._cache.popitem(last=False)
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """
+        Dimentica gli indici in cache (es. tra scenari di benchmark indipendenti).
+        """
+        cls._cache.clear()
+
+    # Valori derivati che dipendono solo dalle parole di una lunghezza (chiave (tipo, lunghezza, ...))
+    LENGTH_DERIVED = ('containing', 'letter_bitsets')
+
+    def apply_changes(self, changes: List[Any], max_length: Optional[int] = None) -> 'LexiconIndex':
+        """
+        Applica voci nuove o modificate (riconosciute per id) e restituisce un nuovo indice
+        su una nuova word_list, lasciando intatti lista e indice correnti: le generazioni in
+        corso continuano sui vecchi, le nuove usano i nuovi (copy-on-write).
+        Le voci nuove ricevono gli id successivi all'ultimo; una voce la cui soluzione supera
+        max_length resta al suo posto ma esce dagli indici (soluzione vuota).
+        Vengono copiati solo gli array delle lunghezze toccate; i valori derivati delle altre
+        lunghezze e, se non ci sono soluzioni nuove, i nogood restano condivisi.
+        """
+        words = list(self.words)
+        solutions = list(self.solutions)
+        entry_ids, entry_positions = (array(table.typecode, table)
+                                      for table in self._entry_lookup())
+
+        # (id parola, soluzione precedente, soluzione nuova)
+        moves: List[Tuple[int, str, str]] = []
+        for entry in changes:
+            solution = entry['solution']
+            fits = max_length is None or len(solution) <= max_length
+            k = bisect_left(entry_ids, entry['id'])
+            if k < len(entry_ids) and entry_ids[k] == entry['id']:
+                word_id = entry_positions[k]
+                words[word_id] = entry
+                solution = solution if fits else ''
+                if solution != solutions[word_id]:
+                    moves.append((word_id, solutions[word_id], solution))
+                    solutions[word_id] = solution
+            elif fits:
+                word_id = len(words)
+                entry_ids.insert(k, entry['id'])
+                entry_positions.insert(k, word_id)
+                moves.append((word_id, '', solution))
+                words.append(entry)
+                solutions.append(solution)
+
+        index = LexiconIndex.__new__(LexiconIndex)
+        index.words = words
+        index.solutions = solutions
+        index.by_length = dict(self.by_length)
+        index.positions = dict(self.positions)
+        index._indexed_lengths = set(self._indexed_lengths)
+        index._entry_ids, index._entry_positions = entry_ids, entry_positions
+        index.available = None
+
+        copied = set()
+
+        def writable(table: Dict, key: Hashable) -> array:
+            if (id(table), key) not in copied:
+                copied.add((id(table), key))
+                table[key] = array('I', table.get(key, ()))
+            return table[key]
+
+        for word_id, old_solution, new_solution in moves:
+            if old_solution:
+                ids = writable(index.by_length, len(old_solution))
+                del ids[bisect_left(ids, word_id)]
+                if len(old_solution) in index._indexed_lengths:
+                    for pos, letter in enumerate(old_solution):
+                        ids = writable(index.positions, (len(old_solution), pos, letter))
+                        del ids[bisect_left(ids, word_id)]
+            if new_solution:
+                insort(writable(index.by_length, len(new_solution)), word_id)
+                if len(new_solution) in index._indexed_lengths:
+                    for pos, letter in enumerate(new_solution):
+                        insort(writable(index.positions, (len(new_solution), pos, letter)), word_id)
+
+        touched = ({len(old) for _, old, _ in moves if old} |
+                   {len(new) for _, _, new in moves if new})
+        index._derived = {key: value for key, value in self._derived.items()
+                          if isinstance(key, tuple) and key[0] in self.LENGTH_DERIVED and
+                          key[1] not in touched}
+        added = any(new for _, _, new in moves)
+        index.nogoods = NogoodCache() if added else self.nogoods
+
+        LexiconIndex.register(index)
+        logging.debug(f"Applied {len(changes)} lexicon changes: {len(moves)} solutions moved, "
+                      f"lengths {sorted(touched)} reindexed")
+        return index
+
+    def prepare_changes(self) -> None:
+        """
+        Costruisce subito la ricerca per id usata da apply_changes.
+        """
+        self._entry_lookup()
+
+    def _entry_lookup(self) -> Tuple[array, array]:
+        """
+        Id delle voci ordinati e posizioni corrispondenti nella word_list (ricerca binaria).
+        """
+        if self._entry_ids is None:
+            pairs = sorted((word['id'], word_id) for word_id, word in enumerate(self.words)
+                           if word['id'] is not None)
+            self._entry_ids = array('q', (entry_id for entry_id, _ in pairs))
+            self._entry_positions = array('I', (word_id for _, word_id in pairs))
+        return self._entry_ids, self._entry_positions
+
+    def _ensure_length(self, length: int) -> None:
+        if length in self._indexed_lengths:
+            return
+        self._indexed_lengths.add(length)
+        solutions = self.solutions
+        for word_id in self.by_length.get(length, ()):
+            for pos, letter in enumerate(solutions[word_id]):
+                ids = self.positions.get((length, pos, letter))
+                if ids is None:
+                    ids = self.positions[(length, pos, letter)] = array('I')
+                ids.append(word_id)
+
+    def build_all(self) -> None:
+        """
+        Costruisce subito l'indice posizionale di tutte le lunghezze.
+        """
+        for length in self.by_length:
+            self._ensure_length(length)
+
+    def ids_with_letter(self, length: int, pos: int, letter: str) -> Sequence[int]:
+        """
+        Id delle parole di lunghezza data con la lettera indicata nella posizione indicata.
+        """
+        self._ensure_length(length)
+        return self.positions.get((length, pos, letter), ())
+
+    def count(self, length: int, pos: int, letter: str) -> int:
+        return len(self.ids_with_letter(length, pos, letter))
+
+    def containing(self, length: int, letter: str) -> Tuple[array, array]:
+        """
+        Tutte le occorrenze della lettera nelle parole di lunghezza data, come array paralleli
+        (id parola, posizione), ordinate per id e posizione.
+        """
+        def build() -> Tuple[array, array]:
+            pairs = sorted((word_id, pos) for pos in range(length)
+                           for word_id in self.ids_with_letter(length, pos, letter))
+            return array('I', (word_id for word_id, _ in pairs)), array('B', (pos for _, pos in pairs))
+
+        return self.derived(('containing', length, letter), build)
+
+    def letter_bitsets(self, length: int) -> List[Dict[str, int]]:
+        """
+        Per ogni posizione delle parole di lunghezza data, bitset (interi Python) per lettera:
+        il bit i indica che la i-esima parola di by_length[length] ha quella lettera lì.
+        """
+        def build() -> List[Dict[str, int]]:
+            solutions = [self.solutions[word_id] for word_id in self.by_length.get(length, ())]
+            bitsets = []
+            for pos in range(length):
+                # Colonna delle lettere in posizione pos, invertita così il bit i è la parola i
+                column = ''.join(solution[pos] for solution in solutions)[::-1]
+                letters = set(column)
+                zeros = {ord(letter): '0' for letter in letters}
+                bitsets.append({
+                    letter: int(column.translate({**zeros, ord(letter): '1'}), 2)
+                    for letter in letters
+                })
+            return bitsets
+
+        return self.derived(('letter_bitsets', length), build)
+
+    def candidates(self, length: int, pattern: Optional[str] = None) -> Sequence[int]:
+        """
+        Id delle parole di lunghezza data compatibili con il pattern ('_' = lettera libera).
+        Come in find_word, il pattern vale solo per le posizioni comuni alla parola.
+        """
+        constraints = [(i, letter) for i, letter in enumerate((pattern or '')[:length])
+                       if letter != '_']
+        if not constraints:
+            return self.by_length.get(length, ())
+
+        postings = [(self.ids_with_letter(length, pos, letter), pos, letter)
+                    for pos, letter in constraints]
+        postings.sort(key=lambda posting: len(posting[0]))
+        smallest = postings[0][0]
+        if len(postings) == 1 or not smallest:
+            return smallest
+
+        others = [(pos, letter) for _, pos, letter in postings[1:]]
+        solutions = self.solutions
+        return [word_id for word_id in smallest
+                if all(solutions[word_id][pos] == letter for pos, letter in others)]
+
+    def ids_for_solution(self, solution: str) -> Sequence[int]:
+        """
+        Id delle voci con la soluzione indicata (più di una se ripetuta nel lessico).
+        """
+        def build() -> Dict[str, Any]:
+            ids: Dict[str, Any] = {}
+            for word_id, word_solution in enumerate(self.solutions):
+                previous = ids.get(word_solution)
+                if previous is None:
+                    ids[word_solution] = word_id
+                elif isinstance(previous, int):
+                    ids[word_solution] = (previous, word_id)
+                else:
+                    ids[word_solution] = previous + (word_id,)
+            return ids
+
+        found = self.derived('solution_ids', build).get(solution, ())
+        return (found,) if isinstance(found, int) else found
+
+    def is_available(self, word_id: int) -> bool:
+        return self.available is None or bool(self.available[word_id])
+
+    def pick(self, ids: Sequence[int], rng=random) -> Optional[int]:
+        """
+        Posizione in ids di una parola disponibile scelta a caso, o None.
+        Con una maschera di disponibilità prova alcune estrazioni e poi filtra i candidati,
+        quindi la scelta resta uniforme tra le parole disponibili.
+        """
+        if not ids:
+            return None
+        available = self.available
+        if available is None:
+            return rng.randrange(len(ids))
+
+        for _ in range(self.PICK_TRIES):
+            k = rng.randrange(len(ids))
+            if available[ids[k]]:
+                return k
+        allowed = [k for k, word_id in enumerate(ids) if available[word_id]]
+        return rng.choice(allowed) if allowed else None
+
+    def shuffled(self, ids: Sequence[int], rng=random) -> Iterator[int]:
+        """
+        Posizioni in ids delle parole disponibili, in ordine casuale e generate una alla
+        volta (Fisher-Yates che ricorda solo gli scambi): chi si ferma al primo candidato
+        piazzabile paga solo le posizioni consumate, non il rimescolamento di tutti gli id.
+        """
+        size = len(ids)
+        swaps: Dict[int, int] = {}
+        for i in range(size):
+            j = rng.randrange(i, size)
+            k = swaps.get(j, j)
+            swaps[j] = swaps.get(i, i)
+            if self.available is None or self.available[ids[k]]:
+                yield k
+
+    def available_bitset(self, length: int) -> int:
+        """
+        Bitset delle parole disponibili di lunghezza data, con i bit di letter_bitsets.
+        """
+        ids = self.by_length.get(length, ())
+        if self.available is None:
+            return (1 << len(ids)) - 1
+        available = self.available
+        flags = bytes(available[word_id] for word_id in ids)[::-1]
+        return int(flags.translate(self._BIT_DIGITS) or b'0', 2)
+
+    def derived(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Valore derivato dal lessico (es. punteggi di fattibilità), calcolato una sola volta.
+        """
+        value = self._derived.get(key)
+        if value is None:
+            value = self._derived[key] = factory()
+        return value
+
+    def crossing_counts(self, column: int, row_length: int,
+                        length_range: Tuple[int, int]) -> Dict[str, int]:
+        """
+        Per ogni lettera, numero di coppie (parola, posizione) con cui una parola di una riga
+        lunga row_length può attraversare la colonna indicata con quella lettera.
+        """
+        def build() -> Dict[str, int]:
+            counts: Dict[str, int] = {}
+            for length in range(length_range[0], length_range[1] + 1):
+                if length > row_length:
+                    break
+                self._ensure_length(length)
+                first = max(0, column + length - row_length)
+                last = min(length - 1, column)
+                for (key_length, pos, letter), ids in self.positions.items():
+                    if key_length == length and first <= pos <= last:
+                        counts[letter] = counts.get(letter, 0) + len(ids)
+            return counts
+
+        return self.derived(('crossing_counts', column, row_length, tuple(length_range)), build)
+
+    def crossing_words(self, column: int, row_length: int,
+                       length_range: Tuple[int, int]) -> Dict[str, int]:
+        """
+        Come crossing_counts, ma conta le soluzioni distinte: righe diverse con la stessa
+        lettera richiedono parole diverse.
+        """
+        def build() -> Dict[str, int]:
+            words: Dict[str, Set[str]] = {}
+            solutions = self.solutions
+            for length in range(length_range[0], length_range[1] + 1):
+                if length > row_length:
+                    break
+                self._ensure_length(length)
+                first = max(0, column + length - row_length)
+                last = min(length - 1, column)
+                for (key_length, pos, letter), ids in self.positions.items():
+                    if key_length == length and first <= pos <= last:
+                        words.setdefault(letter, set()).update(solutions[word_id]
+                                                               for word_id in ids)
+            return {letter: len(found) for letter, found in words.items()}
+
+        return self.derived(('crossing_words', column, row_length, tuple(length_range)), build)
+
+    def find_word(self, length_range: Tuple[int, int], pattern: Optional[str] = None,
+                  rng=random) -> Tuple[Optional[Any], int]:
+        """
+        Sceglie a caso una parola tra quelle compatibili.
+        Restituisce la parola (o None) e il numero di candidati considerati.
+        """
+        groups = [self.candidates(length, pattern)
+                  for length in range(length_range[0], length_range[1] + 1)]
+        total = sum(len(group) for group in groups)
+        if not total:
+            return None, 0
+
+        available = self.available
+        if available is None:
+            return self.words[self._nth(groups, rng.randrange(total))], total
+
+        for _ in range(self.PICK_TRIES):
+            word_id = self._nth(groups, rng.randrange(total))
+            if available[word_id]:
+                return self.words[word_id], total
+        allowed = [word_id for group in groups for word_id in group if available[word_id]]
+        return (self.words[rng.choice(allowed)] if allowed else None), total
+
+    @staticmethod
+    def _nth(groups: List[Sequence[int]], k: int) -> int:
+        """
+        k-esimo id della concatenazione dei gruppi.
+        """
+        for group in groups:
+            if k < len(group):
+                return group[k]
+            k -= len(group)
+        raise IndexError(k)
@@ -0,0 +1,64 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import time
+from utils.db_utils import DatabaseUtils
+from utils.lexicon_index import LexiconIndex
+
+
+class LexiconSync:
+    """
+    Aggiornamento incrementale di un lessico caricato dalla tabella clues.
+    Tiene i punti di sincronizzazione (id massimo e, se la tabella ha una colonna di ultima
+    modifica, il suo valore massimo, con le voci lette a quel valore) e a ogni refresh legge
+    solo le righe aggiunte o modificate da allora; le modifiche vengono applicate agli indici in copy-on-write
+    (vedi LexiconIndex.apply_changes), senza ricaricare il lessico.
+    Le righe cancellate non vengono rilevate.
+    """
+
+    def __init__(self, db_config: Dict, updated_column: Optional[str] = None):
+        self.db_config = db_config
+        self.updated_column = updated_column
+        self.since_id = 0
+        self.since_updated: Any = None
+        self.seen: Dict[int, Tuple] = {}
+        self.version = 0
+        self.last_sync: Optional[float] = None
+
+    def mark(self) -> None:
+        """
+        Registra lo stato corrente della tabella; da chiamare prima di caricare il lessico,
+        così le modifiche fatte durante il caricamento arrivano al primo refresh.
+        """
+        self.since_id, self.since_updated = DatabaseUtils.get_sync_marks(self.db_config,
+                                                                         self.updated_column)
+        self.seen = {}
+        self.last_sync = time.time()
+
+    def fetch(self) -> Tuple[List, Tuple[int, Any, Dict[int, Tuple]]]:
+        """
+        Legge le voci cambiate dall'ultima sincronizzazione.
+        Restituisce le voci e i nuovi punti di sincronizzazione, da confermare con advance()
+        dopo aver applicato le modifiche.
+        """
+        changes, max_id, max_updated, seen = DatabaseUtils.get_changed_words(
+            self.db_config, self.since_id, self.updated_column, self.since_updated, self.seen)
+        return changes, (max_id, max_updated, seen)
+
+    def advance(self, marks: Tuple[int, Any, Dict[int, Tuple]]) -> None:
+        self.since_id, self.since_updated, self.seen = marks
+        self.version += 1
+        self.last_sync = time.time()
+
+    @staticmethod
+    def apply(word_list: List, changes: List, max_length: Optional[int] = None) -> List:
+        """
+        Nuova word_list con le modifiche applicate; il suo indice è già in cache.
+        La lista originale resta invariata per chi la sta usando.
+        """
+        if not changes:
+            return word_list
+        started = time.perf_counter()
+        index = LexiconIndex.for_word_list(word_list).apply_changes(changes, max_length)
+        logging.debug(f"Patched lexicon of {len(word_list)} words in "
+                      f"{(time.perf_counter() - started) * 1000:.1f} ms")
+        return index.words
@@ -0,0 +1,113 @@
+from typing import List, Dict, Optional
+import csv
+import json
+import logging
+import os
+import random
+from base.lexicon_entry import LexiconEntry
+
+
+class LexiconUtils:
+    """
+    Utility per lessici offline: generazione sintetica, caricamento ed esportazione su file.
+    """
+
+    # Frequenze approssimate delle lettere nella lingua italiana
+    LETTER_FREQUENCIES = {
+        'E': 11.8, 'A': 11.7, 'I': 11.3, 'O': 9.8, 'N': 6.9, 'L': 6.5, 'R': 6.4,
+        'T': 5.6, 'S': 5.0, 'C': 4.5, 'D': 3.7, 'P': 3.1, 'U': 3.0, 'M': 2.5,
+        'V': 2.1, 'G': 1.6, 'H': 1.5, 'F': 1.0, 'B': 0.9, 'Z': 0.5, 'Q': 0.5
+    }
+
+    # Distribuzione delle lunghezze delle parole (da 2 a 15 lettere)
+    LENGTH_WEIGHTS = {
+        2: 2, 3: 5, 4: 8, 5: 11, 6: 13, 7: 13, 8: 12, 9: 10,
+        10: 8, 11: 6, 12: 5, 13: 3, 14: 2, 15: 2
+    }
+
+    @staticmethod
+    def generate_synthetic_lexicon(size: int, seed: int = 0,
+                                   max_length: int = 15) -> List[LexiconEntry]:
+        """
+        Genera un lessico sintetico riproducibile con la stessa forma delle righe del database.
+        """
+        rng = random.Random(seed)
+        letters = list(LexiconUtils.LETTER_FREQUENCIES)
+        letter_weights = list(LexiconUtils.LETTER_FREQUENCIES.values())
+        lengths = [length for length in LexiconUtils.LENGTH_WEIGHTS if length <= max_length]
+        length_weights = [LexiconUtils.LENGTH_WEIGHTS[length] for length in lengths]
+
+        word_lengths = rng.choices(lengths, length_weights, k=size)
+        all_letters = rng.choices(letters, letter_weights, k=sum(word_lengths))
+
+        word_list = []
+        offset = 0
+        for i, length in enumerate(word_lengths, 1):
+            solution = ''.join(all_letters[offset:offset + length])
+            offset += length
+            word_list.append(LexiconEntry(i, solution, f"Definizione sintetica {i}"))
+
+        logging.info(f"Generated synthetic lexicon with {len(word_list)} words (seed={seed})")
+        return word_list
+
+    @staticmethod
+    def _normalize_row(row: Dict, index: int) -> LexiconEntry:
+        """
+        Completa una riga letta da file con i campi attesi dai generatori.
+        """
+        return LexiconEntry(
+            int(row['id']) if row.get('id') not in (None, '') else index,
+            str(row['solution']).strip().upper(),
+            row.get('clue') or '',
+            row.get('word_pattern') or '',
+            int(row.get('num_words') or 1),
+            int(row.get('usage_count') or 0)
+        )
+
+    @staticmethod
+    def load_lexicon_file(path: str, max_length: Optional[int] = None) -> List[LexiconEntry]:
+        """
+        Carica un lessico esportato da file (.json, .jsonl, .csv o .tsv).
+        """
+        extension = os.path.splitext(path)[1].lower()
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            if extension == '.jsonl':
+                rows = [json.loads(line) for line in f if line.strip()]
+            elif extension == '.json':
+                data = json.load(f)
+                rows = data['words'] if isinstance(data, dict) else data
+            elif extension in ('.csv', '.tsv'):
+                rows = list(csv.DictReader(f, delimiter='\t' if extension == '.tsv' else ','))
+            else:
+                raise ValueError(f"Unsupported lexicon file format: {extension}")
+
+        word_list = [LexiconUtils._normalize_row(row, i) for i, row in enumerate(rows, 1)]
+        if max_length is not None:
+            word_list = LexiconUtils.filter_by_length(word_list, max_length)
+
+        logging.info(f"Loaded {len(word_list)} words from lexicon file {path}")
+        return word_list
+
+    @staticmethod
+    def save_lexicon_file(word_list: List, path: str) -> None:
+        """
+        Esporta il lessico in formato JSONL, una riga per parola.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            for word in word_list:
+                f.write(json.dumps({
+                    'id': word.get('id'),
+                    'solution': word['solution'],
+                    'clue': word.get('clue', ''),
+                    'word_pattern': word.get('word_pattern', ''),
+                    'num_words': word.get('num_words', 1),
+                    'usage_count': word.get('usage_count', 0)
+                }, ensure_ascii=False) + '\n')
+        logging.info(f"Exported {len(word_list)} words to {path}")
+
+    @staticmethod
+    def filter_by_length(word_list: List, max_length: int) -> List:
+        """
+        Mantiene solo le parole che entrano in una griglia della dimensione data.
+        """
+        return [word for word in word_list if len(word['solution']) <= max_length]
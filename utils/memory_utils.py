@@ -0,0 +1,141 @@
+from typing import List, Dict, Optional, Any
+import sys
+from base.lexicon_entry import LexiconEntry
+
+
+class MemoryUtils:
+    """
+    Utility per misurare l'occupazione di memoria del lessico e dei suoi indici.
+    """
+
+    @staticmethod
+    def process_rss_kb() -> Optional[int]:
+        """
+        RSS corrente del processo in KB (None se non disponibile).
+        """
+        try:
+            with open('/proc/self/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:
+            return None
+
+    @staticmethod
+    def _row_bytes(word: Any, seen_strings: set) -> Dict[str, int]:
+        """
+        Byte di un record e dei suoi campi; le stringhe già contate (internate) non si ripetono.
+        """
+        sizes = {'records': sys.getsizeof(word), 'solutions': 0, 'clues': 0, 'other_fields': 0}
+        if isinstance(word, dict):
+            items = word.items()
+        else:
+            items = ((key, getattr(word, key)) for key in LexiconEntry.__slots__)
+
+        for key, value in items:
+            if isinstance(value, str):
+                if id(value) in seen_strings:
+                    continue
+                seen_strings.add(id(value))
+            elif isinstance(value, int) and -5 <= value <= 256:
+                # Interi piccoli condivisi dall'interprete
+                continue
+            field = {'solution': 'solutions', 'clue': 'clues'}.get(key, 'other_fields')
+            sizes[field] += sys.getsizeof(value)
+        return sizes
+
+    @staticmethod
+    def lexicon_breakdown(word_list: List[Any]) -> Dict[str, int]:
+        """
+        Scompone la memoria del lessico: lista, record, soluzioni, definizioni, altri campi.
+        """
+        breakdown = {'container': sys.getsizeof(word_list), 'records': 0, 'solutions': 0,
+                     'clues': 0, 'other_fields': 0}
+        seen_strings = set()
+        for word in word_list:
+            for field, size in MemoryUtils._row_bytes(word, seen_strings).items():
+                breakdown[field] += size
+        breakdown['total'] = sum(breakdown.values())
+        return breakdown
+
+    @staticmethod
+    def index_breakdown(index) -> Dict[str, int]:
+        """
+        Scompone la memoria dell'indice del lessico (per lunghezza e posizionale).
+        """
+        by_length = sys.getsizeof(index.by_length) + sum(
+            sys.getsizeof(ids) for ids in index.by_length.values())
+        positions = sys.getsizeof(index.positions) + sum(
+            sys.getsizeof(key) + sys.getsizeof(ids) for key, ids in index.positions.items())
+        return {'by_length': by_length, 'positions': positions, 'total': by_length + positions}
+
+    @staticmethod
+    def dict_rows_estimate(word_list: List[Any], sample_size: int = 1000) -> int:
+        """
+        Stima i byte che occuperebbe il lessico come lista di dizionari (righe MySQL).
+        """
+        if not word_list:
+            return 0
+        step = max(1, len(word_list) // sample_size)
+        sample = [word if isinstance(word, dict) else word.to_dict()
+                  for word in word_list[::step]]
+        sample_bytes = MemoryUtils.lexicon_breakdown(sample)['total'] - sys.getsizeof(sample)
+        return int(sample_bytes / len(sample) * len(word_list)) + sys.getsizeof(word_list)
+
+    @staticmethod
+    def lexicon_report(word_list: List[Any], index=None) -> Dict[str, Any]:
+        """
+        Report completo: lessico, indice, byte per voce e confronto con le righe dizionario.
+        """
+        lexicon = MemoryUtils.lexicon_breakdown(word_list)
+        entries = len(word_list)
+        report = {
+            'entries': entries,
+            'record_type': type(word_list[0]).__name__ if word_list else None,
+            'lexicon': lexicon,
+            'bytes_per_entry': lexicon['total'] / entries if entries else 0,
+            'dict_rows_estimate': MemoryUtils.dict_rows_estimate(word_list),
+            'process_rss_kb': MemoryUtils.process_rss_kb()
+        }
+        if index is not None:
+            report['index'] = MemoryUtils.index_breakdown(index)
+            report['index_bytes_per_entry'] = report['index']['total'] / entries if entries else 0
+        return report
+
+    @staticmethod
+    def format_report(report: Dict[str, Any]) -> str:
+        """
+        Formatta il report di memoria come testo leggibile.
+        """
+        def kb(value: int) -> str:
+            return f"{value / 1024:12.1f} KB"
+
+        lines = [
+            "Memory report",
+            "=============",
+            f"Entries:            {report['entries']}",
+            f"Record type:        {report['record_type']}",
+            "",
+            "Lexicon:"
+        ]
+        for field in ('container', 'records', 'solutions', 'clues', 'other_fields', 'total'):
+            lines.append(f"  {field:<18}{kb(report['lexicon'][field])}")
+        lines.append(f"  {'bytes/entry':<18}{report['bytes_per_entry']:12.1f}")
+        lines.append(f"  {'as dict rows':<18}{kb(report['dict_rows_estimate'])}")
+
+        if 'index' in report:
+            lines.append("")
+            lines.append("Index:")
+            for field in ('by_length', 'positions', 'total'):
+                lines.append(f"  {field:<18}{kb(report['index'][field])}")
+            lines.append(f"  {'bytes/entry':<18}{report['index_bytes_per_entry']:12.1f}")
+
+        if report.get('process_rss_kb') is not None:
+            lines.append("")
+            lines.append(f"Process RSS:        {report['process_rss_kb']} KB")
+        return '\n'.join(lines)
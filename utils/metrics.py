@@ -0,0 +1,307 @@
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+
+class GenerationMetrics:
+    """
+    Raccoglie contatori e istogrammi sulla generazione dei cruciverba.
+    Le metriche possono essere esportate come textfile Prometheus o come snapshot JSON.
+    """
+
+    ATTEMPT_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10)
+    CANDIDATE_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+    DENSITY_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+    def __init__(self, prefix: str = "crossword"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, Dict]] = {}
+        self._gauges: Dict[str, Dict[Tuple, float]] = {}
+        self._buckets: Dict[str, Tuple] = {}
+        self._help: Dict[str, str] = {}
+
+    @staticmethod
+    def _label_key(labels: Dict) -> Tuple:
+        return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, labels: Dict, value: float = 1, help_text: str = "") -> None:
+        """
+        Incrementa un contatore.
+        """
+        key = self._label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    def observe(self, name: str, labels: Dict, value: float, buckets: Tuple,
+                help_text: str = "") -> None:
+        """
+        Registra un'osservazione in un istogramma con bucket cumulativi.
+        """
+        key = self._label_key(labels)
+        with self._lock:
+            self._buckets.setdefault(name, tuple(buckets))
+            if help_text:
+                self._help.setdefault(name, help_text)
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = {'buckets': [0] * len(self._buckets[name]), 'count': 0, 'sum': 0.0}
+                series[key] = hist
+            for i, bound in enumerate(self._buckets[name]):
+                if value <= bound:
+                    hist['buckets'][i] += 1
+            hist['count'] += 1
+            hist['sum'] += value
+
+    def record_step(self, crossword_type: str, grid_size: int, step: str, success: bool) -> None:
+        """
+        Registra l'esito di un singolo passo di posizionamento.
+        """
+        self.inc('step_total',
+                 {'type': crossword_type, 'grid_size': grid_size, 'step': step,
+                  'result': 'success' if success else 'failure'},
+                 help_text="Placement steps executed, by outcome")
+
+    def record_candidates(self, crossword_type: str, grid_size: int, step: str, count: int) -> None:
+        """
+        Registra il numero di candidati considerati durante un passo.
+        """
+        self.observe('step_candidates',
+                     {'type': crossword_type, 'grid_size': grid_size, 'step': step},
+                     count, self.CANDIDATE_BUCKETS,
+                     help_text="Candidate words considered per placement step")
+
+    def record_generation(self, crossword_type: str, grid_size: int, attempts: int,
+                          success: bool) -> None:
+        """
+        Registra l'esito di una generazione completa e i tentativi utilizzati.
+        """
+        labels = {'type': crossword_type, 'grid_size': grid_size}
+        self.inc('generation_total', {**labels, 'result': 'success' if success else 'failure'},
+                 help_text="Crossword generations, by outcome")
+        self.inc('attempts_total', labels, attempts,
+                 help_text="Generation attempts used")
+        if success:
+            self.observe('attempts_per_success', labels, attempts, self.ATTEMPT_BUCKETS,
+                         help_text="Attempts needed for each successful generation")
+
+    def record_nogood_hit(self, crossword_type: str, grid_size: int, kind: str) -> None:
+        """
+        Registra una ricerca saltata perché già nota come senza soluzione.
+        """
+        self.inc('nogood_hits_total', {'type': crossword_type, 'grid_size': grid_size, 'kind': kind},
+                 help_text="Lexicon searches skipped thanks to the nogood cache")
+
+    def record_density(self, crossword_type: str, grid_size: int, density: float) -> None:
+        """
+        Registra la densità del cruciverba generato.
+        """
+        self.observe('puzzle_density', {'type': crossword_type, 'grid_size': grid_size},
+                     density, self.DENSITY_BUCKETS,
+                     help_text="Filled cells over bounding box area of generated puzzles")
+
+    def set_gauge(self, name: str, labels: Dict, value: float, help_text: str = "") -> None:
+        """
+        Imposta il valore corrente di un indicatore (es. profondità della coda).
+        """
+        key = self._label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    @staticmethod
+    def _parse_bound(bound: str):
+        value = float(bound)
+        return int(value) if bound.lstrip('-').isdigit() else value
+
+    def merge_snapshot(self, snapshot: Dict) -> None:
+        """
+        Somma nel registro contatori e istogrammi di uno snapshot prodotto altrove
+        (ad esempio da un processo worker).
+        """
+        for name, series_list in snapshot.get('counters', {}).items():
+            for series in series_list:
+                self.inc(name, series['labels'], series['value'])
+
+        with self._lock:
+            for name, series_list in snapshot.get('histograms', {}).items():
+                for series in series_list:
+                    bounds = tuple(self._parse_bound(b) for b in series['buckets'])
+                    self._buckets.setdefault(name, bounds)
+                    if self._buckets[name] != bounds:
+                        logging.warning(f"Skipping histogram {name}: bucket mismatch")
+                        continue
+                    key = self._label_key(series['labels'])
+                    target = self._histograms.setdefault(name, {}).get(key)
+                    if target is None:
+                        target = {'buckets': [0] * len(bounds), 'count': 0, 'sum': 0.0}
+                        self._histograms[name][key] = target
+                    for i, count in enumerate(series['buckets'].values()):
+                        target['buckets'][i] += count
+                    target['count'] += series['count']
+                    target['sum'] += series['sum']
+
+    def reset(self) -> None:
+        """
+        Azzera tutte le metriche raccolte.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._gauges.clear()
+
+    def snapshot(self) -> Dict:
+        """
+        Restituisce una copia serializzabile in JSON delle metriche correnti.
+        """
+        with self._lock:
+            counters = {
+                name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            gauges = {
+                name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                for name, series in self._gauges.items()
+            }
+            histograms = {
+                name: [{
+                    'labels': dict(key),
+                    'buckets': dict(zip((str(b) for b in self._buckets[name]), hist['buckets'])),
+                    'count': hist['count'],
+                    'sum': hist['sum']
+                } for key, hist in series.items()]
+                for name, series in self._histograms.items()
+            }
+        return {'timestamp': time.time(), 'counters': counters, 'gauges': gauges,
+                'histograms': histograms}
+
+    @staticmethod
+    def _format_labels(pairs: List[Tuple[str, str]]) -> str:
+        if not pairs:
+            return ""
+        body = ','.join('{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"'))
+                        for k, v in pairs)
+        return '{' + body + '}'
+
+    def to_prometheus(self) -> str:
+        """
+        Formatta le metriche nel formato di esposizione testuale di Prometheus.
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full_name = f"{self.prefix}_{name}"
+                if name in self._help:
+                    lines.append(f"# HELP {full_name} {self._help[name]}")
+                lines.append(f"# TYPE {full_name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full_name}{self._format_labels(list(key))} {value}")
+
+            for name, series in sorted(self._gauges.items()):
+                full_name = f"{self.prefix}_{name}"
+                if name in self._help:
+                    lines.append(f"# HELP {full_name} {self._help[name]}")
+                lines.append(f"# TYPE {full_name} gauge")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full_name}{self._format_labels(list(key))} {value}")
+
+            for name, series in sorted(self._histograms.items()):
+                full_name = f"{self.prefix}_{name}"
+                if name in self._help:
+                    lines.append(f"# HELP {full_name} {self._help[name]}")
+                lines.append(f"# TYPE {full_name} histogram")
+                for key, hist in sorted(series.items()):
+                    for bound, count in zip(self._buckets[name], hist['buckets']):
+                        labels = self._format_labels(list(key) + [('le', str(bound))])
+                        lines.append(f"{full_name}_bucket{labels} {count}")
+                    labels = self._format_labels(list(key) + [('le', '+Inf')])
+                    lines.append(f"{full_name}_bucket{labels} {hist['count']}")
+                    lines.append(f"{full_name}_sum{self._format_labels(list(key))} {hist['sum']}")
+                    lines.append(f"{full_name}_count{self._format_labels(list(key))} {hist['count']}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _atomic_write(path: str, content: str) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def write_prometheus_textfile(self, path: str) -> None:
+        """
+        Scrive le metriche in un textfile Prometheus (sostituzione atomica).
+        """
+        self._atomic_write(path, self.to_prometheus())
+        logging.debug(f"Metrics written to Prometheus textfile: {path}")
+
+    def write_json_snapshot(self, path: str) -> None:
+        """
+        Scrive uno snapshot JSON delle metriche (sostituzione atomica).
+        """
+        self._atomic_write(path, json.dumps(self.snapshot(), indent=2))
+        logging.debug(f"Metrics snapshot written to: {path}")
+
+
+class PeriodicMetricsExporter:
+    """
+    Esporta periodicamente le metriche su file da un thread in background.
+    Pensato per processi di lunga durata.
+    """
+
+    def __init__(self, metrics: GenerationMetrics, json_path: Optional[str] = None,
+                 prometheus_path: Optional[str] = None, interval: float = 15.0):
+        self.metrics = metrics
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def export(self) -> None:
+        """
+        Esegue subito un'esportazione.
+        """
+        try:
+            if self.json_path:
+                self.metrics.write_json_snapshot(self.json_path)
+            if self.prometheus_path:
+                self.metrics.write_prometheus_textfile(self.prometheus_path)
+        except OSError as e:
+            logging.error(f"Error exporting metrics: {str(e)}")
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.export()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Ferma il thread ed esegue un'ultima esportazione.
+        """
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self.export()
+
+
+# Registro di default condiviso da tutti i generatori del processo
+generation_metrics = GenerationMetrics()
@@ -0,0 +1,45 @@
+from collections import OrderedDict
+from typing import Hashable, Dict
+
+
+class NogoodCache:
+    """
+    Registro delle query senza soluzione (nogood) su un lessico.
+    Una chiave descrive forma dello slot e vincoli, ad esempio
+    ('word', (6, 6), '___A__'): se una query fallisce una volta fallirà sempre
+    con lo stesso lessico, quindi la ricerca può essere saltata subito.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._keys: 'OrderedDict[Hashable, None]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Hashable) -> None:
+        """
+        Registra una query fallita; oltre max_size viene scartata la meno recente.
+        """
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {'size': len(self._keys), 'hits': self.hits, 'misses': self.misses}
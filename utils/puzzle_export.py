@@ -0,0 +1,215 @@
+from typing import Any, Dict, IO, Iterable, List, Tuple
+import json
+import logging
+import struct
+from utils.puzzle_validator import PuzzleValidator
+
+
+class ExportError(Exception):
+    """Cruciverba non rappresentabile nel formato richiesto."""
+
+
+def _is_block(cell: str) -> bool:
+    return cell in ('_', '#')
+
+
+class ClueNumbering:
+    """
+    Numerazione standard delle definizioni: scorrendo la griglia per righe, ogni cella in
+    cui inizia almeno una parola riceve il numero successivo; per ogni numero viene prima
+    l'orizzontale e poi la verticale.
+    Le celle iniziali vengono dalle parole piazzate, non dalle sequenze di lettere della
+    griglia (nel tipo hidden le righe affiancate formano sequenze verticali che non sono
+    parole). Il calcolo è lineare in celle più parole; PuzzleResult.numbering lo esegue
+    una sola volta per puzzle, condiviso da tutti gli esportatori.
+    """
+
+    def __init__(self, puzzle):
+        self.rows = len(puzzle.grid)
+        self.cols = max((len(row) for row in puzzle.grid), default=0)
+        starts: Dict[Tuple[int, int], List] = {}
+        for word in puzzle.words:
+            starts.setdefault((word.y, word.x), []).append(word)
+
+        self.numbers: Dict[Tuple[int, int], int] = {}
+        self.across: List[Tuple[int, Any]] = []
+        self.down: List[Tuple[int, Any]] = []
+        for r in range(self.rows):
+            for c in range(self.cols):
+                words = starts.get((r, c))
+                if not words:
+                    continue
+                number = len(self.numbers) + 1
+                self.numbers[(r, c)] = number
+                for word in words:
+                    if word.is_horizontal:
+                        self.across.append((number, word))
+                for word in words:
+                    if not word.is_horizontal:
+                        self.down.append((number, word))
+
+    def entries(self) -> List[Tuple[int, Any]]:
+        """
+        (numero, parola) in ordine di numero, orizzontale prima della verticale.
+        """
+        entries = self.across + self.down
+        entries.sort(key=lambda entry: (entry[0], not entry[1].is_horizontal))
+        return entries
+
+    @staticmethod
+    def clue_text(word) -> str:
+        return f"{word.clue} ({word.word_pattern})" if word.word_pattern else word.clue
+
+
+class IpuzExporter:
+    """
+    Esportazione in ipuz (http://ipuz.org/v2), un documento JSON per cruciverba.
+    Le celle vuote sono caselle nere ('#'); nel tipo hidden le celle della colonna chiave
+    hanno lo stile highlight.
+    """
+
+    VERSION = 'http://ipuz.org/v2'
+    KIND = 'http://ipuz.org/crossword#1'
+
+    def document(self, puzzle) -> Dict[str, Any]:
+        numbering = puzzle.numbering
+        numbers = numbering.numbers
+        key_column = puzzle.key_column
+        cells = []
+        solution = []
+        for r, row in enumerate(puzzle.grid):
+            cell_row = []
+            solution_row = []
+            for c, letter in enumerate(row):
+                if _is_block(letter):
+                    cell_row.append('#')
+                    solution_row.append('#')
+                    continue
+                cell = numbers.get((r, c), 0)
+                if c == key_column:
+                    cell = {'cell': cell, 'style': {'highlight': True}}
+                cell_row.append(cell)
+                solution_row.append(letter)
+            cells.append(cell_row)
+            solution.append(solution_row)
+
+        def clues(entries: List[Tuple[int, Any]]) -> List:
+            return [{'number': number, 'clue': word.clue, 'enumeration': word.word_pattern}
+                    if word.word_pattern else [number, word.clue]
+                    for number, word in entries]
+
+        document = {
+            'version': self.VERSION,
+            'kind': [self.KIND],
+            'uniqueid': puzzle.guid,
+            'dimensions': {'width': numbering.cols, 'height': numbering.rows},
+            'block': '#',
+            'empty': 0,
+            'puzzle': cells,
+            'solution': solution,
+            'clues': {'Across': clues(numbering.across), 'Down': clues(numbering.down)}
+        }
+        if puzzle.hidden_word is not None:
+            document['notes'] = f"Hidden word in column {key_column + 1}"
+        return document
+
+    def render(self, puzzle) -> str:
+        return json.dumps(self.document(puzzle), ensure_ascii=False)
+
+    def save(self, puzzle, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.render(puzzle))
+        logging.info(f"Crossword exported to {path}")
+
+    def write_jsonl(self, puzzles: Iterable, stream: IO[str]) -> int:
+        """
+        Scrive un documento ipuz per riga; i cruciverba sono letti e scritti uno alla
+        volta, quindi la memoria non dipende dalla dimensione dell'archivio.
+        """
+        count = 0
+        for puzzle in puzzles:
+            stream.write(self.render(puzzle))
+            stream.write('\n')
+            count += 1
+        return count
+
+
+class PuzExporter:
+    """
+    Esportazione nel formato binario .puz (Across Lite 1.3), con le relative checksum.
+    Nel .puz la numerazione è implicita nella griglia: ogni sequenza orizzontale o
+    verticale di almeno due lettere è una parola. Un cruciverba le cui sequenze non
+    coincidono con le parole piazzate (es. tipo hidden con righe affiancate) o più grande
+    di 255 celle per lato non è rappresentabile e genera ExportError.
+    """
+
+    MAGIC = b'ACROSS&DOWN\x00'
+    VERSION = b'1.3\x00'
+    ENCODING = 'iso-8859-1'
+
+    @staticmethod
+    def checksum(data: bytes, checksum: int = 0) -> int:
+        for byte in data:
+            checksum = (checksum >> 1) | ((checksum & 1) << 15)
+            checksum = (checksum + byte) & 0xffff
+        return checksum
+
+    def _encode(self, text: str) -> bytes:
+        return text.encode(self.ENCODING, errors='replace')
+
+    def _text_checksum(self, strings: Tuple[bytes, bytes, bytes], clues: List[bytes],
+                       notes: bytes, checksum: int) -> int:
+        for text in strings:
+            if text:
+                checksum = self.checksum(text + b'\x00', checksum)
+        for clue in clues:
+            checksum = self.checksum(clue, checksum)
+        if notes:
+            checksum = self.checksum(notes + b'\x00', checksum)
+        return checksum
+
+    def render(self, puzzle) -> bytes:
+        numbering = puzzle.numbering
+        rows, cols = numbering.rows, numbering.cols
+        if rows > 255 or cols > 255:
+            raise ExportError(f"Grid of {rows}x{cols} cells is too large for .puz")
+
+        words = {(word.y, word.x, word.is_horizontal, len(word.text)) for word in puzzle.words}
+        if PuzzleValidator.grid_runs(*PuzzleValidator.flatten(puzzle.grid)) != words:
+            raise ExportError("Grid runs do not match the placed words")
+
+        solution = self._encode(''.join(
+            ''.join('.' if _is_block(cell) else cell for cell in row).ljust(cols, '.')
+            for row in puzzle.grid))
+        state = bytes(byte if byte == ord('.') else ord('-') for byte in solution)
+
+        strings = (self._encode(f"Crossword {puzzle.guid}"), b'', b'')
+        clues = [self._encode(ClueNumbering.clue_text(word))
+                 for _, word in numbering.entries()]
+        notes = b''
+
+        tail = struct.pack('<BBHHH', cols, rows, len(clues), 1, 0)
+        cib = self.checksum(tail)
+        solution_checksum = self.checksum(solution)
+        state_checksum = self.checksum(state)
+        text_checksum = self._text_checksum(strings, clues, notes, 0)
+
+        overall = self.checksum(solution, cib)
+        overall = self.checksum(state, overall)
+        overall = self._text_checksum(strings, clues, notes, overall)
+
+        partial = (cib, solution_checksum, state_checksum, text_checksum)
+        masked_low = bytes(mask ^ (value & 0xff) for mask, value in zip(b'ICHE', partial))
+        masked_high = bytes(mask ^ (value >> 8) for mask, value in zip(b'ATED', partial))
+
+        header = (struct.pack('<H', overall) + self.MAGIC + struct.pack('<H', cib) +
+                  masked_low + masked_high + self.VERSION + b'\x00\x00' +
+                  b'\x00\x00' + b'\x00' * 12 + tail)
+        body = b''.join(text + b'\x00' for text in strings + tuple(clues) + (notes,))
+        return header + solution + state + body
+
+    def save(self, puzzle, path: str) -> None:
+        data = self.render(puzzle)
+        with open(path, 'wb') as f:
+            f.write(data)
+        logging.info(f"Crossword exported to {path}")
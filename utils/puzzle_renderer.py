@@ -0,0 +1,268 @@
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+from html import escape
+
+
+class GridRenderer(ABC):
+    """
+    Parte comune dei renderer: celle da disegnare, numeri delle parole e colonna chiave.
+    Il puzzle è un PuzzleResult (grid, words, cell_size, key_column); le celle vuote
+    ('_') e le caselle nere ('#') restano del colore di fondo.
+    I numeri delle celle iniziali sono quelli della numerazione standard del puzzle
+    (PuzzleResult.numbering), gli stessi delle definizioni esportate in ipuz e .puz.
+    """
+
+    BACKGROUND = '#000000'
+    CELL = '#ffffff'
+    KEY_CELL = '#ffd966'
+    INK = '#000000'
+    BORDER = '#000000'
+
+    def __init__(self, cell_size: Optional[int] = None, show_letters: bool = True):
+        self.cell_size = cell_size
+        self.show_letters = show_letters
+
+    def layout(self, puzzle) -> Tuple[int, int, int, List[Tuple[int, int, str, bool, int]]]:
+        """
+        (righe, colonne, dimensione cella, celle): ogni cella piena è
+        (riga, colonna, lettera, evidenziata, numero o 0).
+        """
+        grid = puzzle.grid
+        rows = len(grid)
+        cols = max((len(row) for row in grid), default=0)
+        size = self.cell_size or puzzle.cell_size
+
+        numbers = puzzle.numbering.numbers
+        key_column = puzzle.key_column
+        cells = [(r, c, letter, c == key_column, numbers.get((r, c), 0))
+                 for r, row in enumerate(grid)
+                 for c, letter in enumerate(row)
+                 if letter not in ('_', '#')]
+        return rows, cols, size, cells
+
+    @abstractmethod
+    def render(self, puzzle) -> Any:
+        """
+        Disegna il puzzle: testo SVG o byte dell'immagine. Da implementare nelle sottoclassi.
+        """
+        pass
+
+    def save(self, puzzle, path: str) -> None:
+        data = self.render(puzzle)
+        mode = 'w' if isinstance(data, str) else 'wb'
+        with open(path, mode, **({'encoding': 'utf-8'} if mode == 'w' else {})) as f:
+            f.write(data)
+        logging.info(f"Crossword rendered to {path}")
+
+
+class SvgRenderer(GridRenderer):
+    """
+    Renderer SVG. Le celle sono <use> di due tile definite una volta in <defs> (normale e
+    colonna chiave); intestazione, stili e sfondo sono un modello costruito una sola volta
+    per forma della griglia (righe, colonne, dimensione cella) e i frammenti di ogni
+    cella, lettera e numero sono in cache per posizione: un puzzle si compone unendo
+    stringhe già pronte.
+    """
+
+    def __init__(self, cell_size: Optional[int] = None, show_letters: bool = True):
+        super().__init__(cell_size, show_letters)
+        self._templates: Dict[Tuple[int, int, int], str] = {}
+        self._fragments: Dict[Tuple, str] = {}
+
+    def template(self, rows: int, cols: int, size: int) -> str:
+        key = (rows, cols, size)
+        template = self._templates.get(key)
+        if template is None:
+            width, height = cols * size, rows * size
+            template = self._templates[key] = (
+                f'<svg xmlns="http://www.w3.org/2000/svg" '
+                f'xmlns:xlink="http://www.w3.org/1999/xlink" width="{width}" height="{height}" '
+                f'viewBox="0 0 {width} {height}">'
+                f'<style>.l{{font:bold {size * 0.6:g}px sans-serif;text-anchor:middle;'
+                f'fill:{self.INK}}}.n{{font:{size * 0.25:g}px sans-serif;fill:{self.INK}}}'
+                f'</style>'
+                f'<defs>'
+                f'<rect id="c" width="{size}" height="{size}" fill="{self.CELL}" '
+                f'stroke="{self.BORDER}"/>'
+                f'<rect id="k" width="{size}" height="{size}" fill="{self.KEY_CELL}" '
+                f'stroke="{self.BORDER}"/>'
+                f'</defs>'
+                f'<rect width="{width}" height="{height}" fill="{self.BACKGROUND}"/>')
+        return template
+
+    def _cell(self, r: int, c: int, size: int, highlighted: bool) -> str:
+        key = ('cell', r, c, size, highlighted)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            tile = 'k' if highlighted else 'c'
+            fragment = self._fragments[key] = \
+                f'<use xlink:href="#{tile}" x="{c * size}" y="{r * size}"/>'
+        return fragment
+
+    def _letter(self, r: int, c: int, size: int, letter: str) -> str:
+        key = ('letter', r, c, size, letter)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = self._fragments[key] = (
+                f'<text class="l" x="{(c + 0.5) * size:g}" y="{(r + 0.78) * size:g}">'
+                f'{escape(letter, quote=False)}</text>')
+        return fragment
+
+    def _number(self, r: int, c: int, size: int, number: int) -> str:
+        key = ('number', r, c, size, number)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = self._fragments[key] = (
+                f'<text class="n" x="{c * size + size * 0.08:g}" '
+                f'y="{r * size + size * 0.28:g}">{number}</text>')
+        return fragment
+
+    def render(self, puzzle) -> str:
+        rows, cols, size, cells = self.layout(puzzle)
+        parts = [self.template(rows, cols, size)]
+        parts.extend(self._cell(r, c, size, highlighted) for r, c, _, highlighted, _ in cells)
+        if self.show_letters:
+            parts.extend(self._letter(r, c, size, letter) for r, c, letter, _, _ in cells)
+        parts.extend(self._number(r, c, size, number)
+                     for r, c, _, _, number in cells if number)
+        parts.append('</svg>')
+        return ''.join(parts)
+
+
+class PngRenderer(GridRenderer):
+    """
+    Renderer PNG (richiede Pillow, importato solo qui). Le tile delle celle (lettera,
+    colonna chiave, numero) sono disegnate una sola volta per dimensione di cella e
+    ridotte a una tavolozza fissa di 16 colori; per ogni forma di griglia c'è un fondo
+    pronto da copiare. Un puzzle si compone incollando tile in modalità palette e viene
+    salvato come PNG a 4 bit: codificare un'immagine RGB costerebbe molto di più.
+    """
+
+    # Sfumature tra inchiostro e fondo della cella per l'antialiasing del testo
+    SHADES = 6
+
+    def __init__(self, cell_size: Optional[int] = None, show_letters: bool = True,
+                 font_path: Optional[str] = None, compress_level: int = 1):
+        super().__init__(cell_size, show_letters)
+        self.font_path = font_path
+        self.compress_level = compress_level
+        self._templates: Dict[Tuple[int, int, int], Any] = {}
+        self._tiles: Dict[Tuple, Any] = {}
+        self._fonts: Dict[int, Any] = {}
+        self._palette: Optional[List[int]] = None
+        self._palette_image = None
+
+    @staticmethod
+    def _pil():
+        """
+        Importa Pillow solo quando serve un PNG.
+        """
+        try:
+            from PIL import Image, ImageDraw, ImageFont
+        except ImportError:
+            raise ImportError("Pillow is required for PNG rendering (pip install Pillow)")
+        return Image, ImageDraw, ImageFont
+
+    @staticmethod
+    def _rgb(color: str) -> Tuple[int, int, int]:
+        return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+    def palette(self) -> List[int]:
+        """
+        Tavolozza fissa: fondo, cella, cella chiave e le sfumature dell'inchiostro su
+        entrambe le celle (l'inchiostro è l'ultima sfumatura).
+        """
+        if self._palette is None:
+            colors = [self._rgb(self.BACKGROUND), self._rgb(self.BORDER)]
+            ink = self._rgb(self.INK)
+            for paper in (self._rgb(self.CELL), self._rgb(self.KEY_CELL)):
+                for step in range(self.SHADES + 1):
+                    weight = step / self.SHADES
+                    colors.append(tuple(round(p + (i - p) * weight)
+                                        for p, i in zip(paper, ink)))
+            self._palette = [channel for color in colors for channel in color]
+        return self._palette
+
+    def _quantize(self, tile):
+        Image, _, _ = self._pil()
+        if self._palette_image is None:
+            self._palette_image = Image.new('P', (1, 1))
+            self._palette_image.putpalette(self.palette())
+        dither = getattr(Image, 'Dither', Image).NONE
+        return tile.quantize(palette=self._palette_image, dither=dither)
+
+    def _font(self, size: int):
+        font = self._fonts.get(size)
+        if font is None:
+            _, _, ImageFont = self._pil()
+            try:
+                font = ImageFont.truetype(self.font_path or 'DejaVuSans-Bold.ttf', size)
+            except OSError:
+                try:
+                    font = ImageFont.load_default(size)
+                except TypeError:
+                    # Pillow < 10.1: solo il font bitmap a dimensione fissa
+                    font = ImageFont.load_default()
+            self._fonts[size] = font
+        return font
+
+    @staticmethod
+    def _draw_centered(draw, box: Tuple[int, int, int, int], text: str, font, fill: str) -> None:
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+        x = box[0] + (box[2] - box[0] - (right - left)) / 2 - left
+        y = box[1] + (box[3] - box[1] - (bottom - top)) / 2 - top
+        draw.text((x, y), text, font=font, fill=fill)
+
+    def template(self, rows: int, cols: int, size: int):
+        key = (rows, cols, size)
+        template = self._templates.get(key)
+        if template is None:
+            Image, _, _ = self._pil()
+            # L'indice 0 della tavolozza è il colore di fondo
+            template = Image.new('P', (cols * size, rows * size), 0)
+            template.putpalette(self.palette())
+            self._templates[key] = template
+        return template
+
+    def tile(self, size: int, letter: str, highlighted: bool, number: int = 0):
+        """
+        Tile di una cella con bordo, sfondo, lettera ('' per nessuna) e numero (0 per
+        nessuno), già nella tavolozza del PNG.
+        """
+        key = (size, letter, highlighted, number)
+        tile = self._tiles.get(key)
+        if tile is None:
+            Image, ImageDraw, _ = self._pil()
+            tile = Image.new('RGB', (size, size), self.KEY_CELL if highlighted else self.CELL)
+            draw = ImageDraw.Draw(tile)
+            draw.rectangle((0, 0, size - 1, size - 1), outline=self.BORDER)
+            if letter:
+                self._draw_centered(draw, (0, int(size * 0.15), size, size), letter,
+                                    self._font(int(size * 0.6)), self.INK)
+            if number:
+                font = self._font(max(6, int(size * 0.25)))
+                left, top, _, _ = draw.textbbox((0, 0), str(number), font=font)
+                offset = max(2, int(size * 0.08))
+                draw.text((offset - left, offset - top), str(number), font=font, fill=self.INK)
+            tile = self._tiles[key] = self._quantize(tile)
+        return tile
+
+    def draw(self, puzzle):
+        """
+        Immagine PIL (modalità palette) del puzzle.
+        """
+        rows, cols, size, cells = self.layout(puzzle)
+        image = self.template(rows, cols, size).copy()
+        show_letters = self.show_letters
+        tile = self.tile
+        for r, c, letter, highlighted, number in cells:
+            image.paste(tile(size, letter if show_letters else '', highlighted, number),
+                        (c * size, r * size))
+        return image
+
+    def render(self, puzzle) -> bytes:
+        buffer = BytesIO()
+        self.draw(puzzle).save(buffer, 'PNG', compress_level=self.compress_level, bits=4)
+        return buffer.getvalue()
@@ -0,0 +1,170 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+import json
+import logging
+import random
+import time
+from base.word import Word
+from utils.db_utils import DatabaseUtils
+from utils.lexicon_index import LexiconIndex
+
+
+class RepairError(Exception):
+    """Parola non trovata nel cruciverba o nessun sostituto compatibile."""
+
+
+class PuzzleRepair:
+    """
+    Sostituzione di una singola parola in un cruciverba già generato (documento di
+    crossword.json), senza rigenerarlo.
+    La casella della parola viene liberata tenendo come vincoli le lettere condivise con le
+    altre parole (e con la parola nascosta nel tipo hidden); il sostituto è cercato con
+    LexiconIndex.candidates tra le parole della stessa lunghezza non già presenti nel
+    cruciverba. Le celle piene della griglia non cambiano, quindi il cruciverba resta
+    valido: le celle non condivise non formano parole nell'altra direzione.
+    """
+
+    def __init__(self, document: Dict, word_list: List, rng=random):
+        self.document = document
+        self.data = document['crossword_data']
+        self.grid: List[List[str]] = self.data['grid']
+        self.words: List[Dict] = self.data['words']
+        self.index = LexiconIndex.for_word_list(word_list)
+        self.rng = rng
+
+    @classmethod
+    def load(cls, path: str, word_list: List, rng=random) -> 'PuzzleRepair':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), word_list, rng)
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.document, f, indent=2, ensure_ascii=False)
+        logging.info(f"Repaired crossword saved to JSON: {path}")
+
+    def find_word(self, selector: str) -> int:
+        """
+        Posizione della parola indicata come numero (da 1, come nelle definizioni
+        stampate) o come testo.
+        """
+        selector = str(selector).strip()
+        if selector.isdigit():
+            number = int(selector)
+            if not 1 <= number <= len(self.words):
+                raise RepairError(f"Word number must be between 1 and {len(self.words)}")
+            return number - 1
+
+        text = selector.upper()
+        for position, word in enumerate(self.words):
+            if word['text'] == text:
+                return position
+        raise RepairError(f"Word {selector} not found in the crossword")
+
+    @staticmethod
+    def cells(word: Dict) -> List[Tuple[int, int]]:
+        if word['is_horizontal']:
+            return [(word['y'], word['x'] + i) for i in range(len(word['text']))]
+        return [(word['y'] + i, word['x']) for i in range(len(word['text']))]
+
+    @staticmethod
+    def raw_clue(word: Dict) -> str:
+        """
+        Definizione senza il pattern tra parentesi aggiunto da Word.to_dict.
+        """
+        return Word.from_dict(word).clue
+
+    def pattern(self, position: int) -> str:
+        """
+        Pattern della casella: lettere condivise con altre parole, '_' per quelle libere.
+        """
+        word = self.words[position]
+        shared: Set[Tuple[int, int]] = set()
+        for other_position, other in enumerate(self.words):
+            if other_position != position:
+                shared.update(self.cells(other))
+
+        hidden = self.data.get('hidden_word')
+        if hidden and word['is_horizontal']:
+            shared.add((word['y'], hidden['column']))
+
+        return ''.join(letter if cell in shared else '_'
+                       for letter, cell in zip(word['text'], self.cells(word)))
+
+    def entry_id(self, word: Dict) -> Optional[int]:
+        """
+        Id nel lessico della voce di una parola piazzata, riconosciuta da soluzione e
+        definizione (il JSON non contiene gli id); None se non è nel lessico.
+        """
+        ids = self.index.ids_for_solution(word['text'])
+        clue = self.raw_clue(word)
+        for word_id in ids:
+            if (self.index.words[word_id].get('clue') or "") == clue:
+                return word_id
+        return ids[0] if len(ids) == 1 else None
+
+    def _used_solutions(self) -> Set[str]:
+        used = {word['text'] for word in self.words}
+        hidden = self.data.get('hidden_word')
+        if hidden:
+            used.add(hidden['word'])
+        return used
+
+    def repair(self, position: int, keep_solution: bool = False) -> Dict[str, Any]:
+        """
+        Sostituisce la parola in posizione data e aggiorna griglia e parole del documento.
+        Con keep_solution mantiene la soluzione e cambia solo la definizione (un'altra voce
+        del lessico con la stessa soluzione).
+        Restituisce le voci del lessico vecchia (None se non trovata) e nuova, e la durata.
+        """
+        started = time.perf_counter()
+        word = self.words[position]
+        old_id = self.entry_id(word)
+        length = len(word['text'])
+        index = self.index
+
+        if keep_solution:
+            clue = self.raw_clue(word)
+            candidates = [word_id for word_id in index.ids_for_solution(word['text'])
+                          if (index.words[word_id].get('clue') or "") != clue]
+        else:
+            used = self._used_solutions()
+            solutions = index.solutions
+            candidates = [word_id for word_id in index.candidates(length, self.pattern(position))
+                          if solutions[word_id] not in used]
+
+        k = index.pick(candidates, self.rng)
+        if k is None:
+            raise RepairError(f"No replacement found for {word['text']}")
+        new_id = candidates[k]
+        entry = index.words[new_id]
+
+        for letter, (row, col) in zip(entry['solution'], self.cells(word)):
+            self.grid[row][col] = letter
+        replacement = Word(entry['solution'], word['x'], word['y'], word['is_horizontal'],
+                           entry.get('clue') or "", entry.get('word_pattern') or "",
+                           entry.get('num_words')).to_dict()
+        # Le chiavi specifiche del tipo (es. intersection) restano: le lettere condivise non cambiano
+        self.words[position] = {**word, **replacement}
+
+        elapsed = time.perf_counter() - started
+        logging.info(f"Replaced {word['text']} with {entry['solution']} "
+                     f"in {elapsed * 1000:.1f} ms")
+        return {
+            'old_entry': index.words[old_id] if old_id is not None else None,
+            'new_entry': entry,
+            'elapsed_ms': elapsed * 1000
+        }
+
+    @staticmethod
+    def update_usage(db_config: Dict, result: Dict[str, Any], output_path: str) -> None:
+        """
+        Aggiorna clues_usage dopo una riparazione: un utilizzo in più per la voce nuova e
+        uno in meno per quella sostituita. Gli errori vengono solo registrati nel log.
+        """
+        new_entry, old_entry = result['new_entry'], result['old_entry']
+        try:
+            if new_entry.get('id') is not None:
+                DatabaseUtils.update_word_usage(db_config, new_entry['id'], output_path)
+            if old_entry is not None and old_entry.get('id') is not None:
+                DatabaseUtils.release_word_usage(db_config, old_entry['id'])
+        except Exception as e:
+            logging.error(f"Failed to update word usage after repair: {str(e)}")
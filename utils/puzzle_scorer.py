@@ -0,0 +1,67 @@
+from typing import Dict, Optional
+from utils.lexicon_utils import LexiconUtils
+
+
+class PuzzleScorer:
+    """
+    Punteggio di qualità di un cruciverba, anche parziale, come somma pesata di:
+    - density: frazione di celle piene nel rettangolo che contiene le lettere;
+    - crossings: incroci per parola (1 = in media due incroci per parola);
+    - rarity: rarità media delle lettere delle parole (lettere poco frequenti valgono di più);
+    - freshness: parole poco usate secondo i contatori di clues_usage, più gli utilizzi nel
+      batch se è dato un UsageLedger (1 / (1 + utilizzi)).
+    Ogni componente è in [0, 1] e usa solo la mappa di occupazione e le voci piazzate.
+    """
+
+    DEFAULT_WEIGHTS = {'density': 1.0, 'crossings': 1.0, 'rarity': 0.5, 'freshness': 0.5}
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, usage_ledger=None):
+        self.usage_ledger = usage_ledger
+        self.weights = dict(self.DEFAULT_WEIGHTS)
+        if weights:
+            unknown = set(weights) - set(self.DEFAULT_WEIGHTS)
+            if unknown:
+                raise ValueError(f"Unknown score components: {', '.join(sorted(unknown))}")
+            self.weights.update(weights)
+
+        top = max(LexiconUtils.LETTER_FREQUENCIES.values())
+        self._letter_rarity = {letter: 1 - frequency / top
+                               for letter, frequency in LexiconUtils.LETTER_FREQUENCIES.items()}
+        self._word_rarity: Dict[str, float] = {}
+
+    def word_rarity(self, solution: str) -> float:
+        rarity = self._word_rarity.get(solution)
+        if rarity is None:
+            # Le lettere fuori dalla tabella delle frequenze (J, K, W, X, Y) sono le più rare
+            rarity = sum(self._letter_rarity.get(letter, 1.0) for letter in solution) / len(solution)
+            self._word_rarity[solution] = rarity
+        return rarity
+
+    def components(self, generator) -> Dict[str, float]:
+        """
+        Componenti del punteggio per lo stato corrente del generatore.
+        """
+        occupancy = generator.occupancy
+        entries = generator.placed_entries
+        bounds = occupancy.bounds()
+        if bounds is None or not entries:
+            return {name: 0.0 for name in self.weights}
+
+        min_row, min_col, max_row, max_col = bounds
+        area = (max_row - min_row + 1) * (max_col - min_col + 1)
+        return {
+            'density': occupancy.filled_count() / area,
+            'crossings': min(1.0, occupancy.crossing_count() / len(entries) / 2),
+            'rarity': sum(self.word_rarity(entry['solution']) for entry in entries) / len(entries),
+            'freshness': sum(1 / (1 + self.usage(entry)) for entry in entries) / len(entries)
+        }
+
+    def usage(self, entry) -> int:
+        usage = entry.get('usage_count') or 0
+        if self.usage_ledger is not None:
+            usage += self.usage_ledger.usage(entry['solution'])
+        return usage
+
+    def score(self, generator) -> float:
+        return sum(self.weights[name] * value
+                   for name, value in self.components(generator).items())
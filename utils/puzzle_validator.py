@@ -0,0 +1,173 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+import re
+from generators.registry import generator_registry
+
+
+class PuzzleValidator:
+    """
+    Verifica che la griglia di un cruciverba corrisponda alle sue parole e ne calcola le
+    statistiche. La griglia è appiattita in una stringa di byte: le lettere di una parola
+    si leggono con una slice (con passo pari alla larghezza per le verticali), le sequenze
+    di lettere con espressioni regolari su righe e colonne, e le celle coperte e gli
+    incroci sono bitmask intere; i cicli Python sono solo sulle parole.
+    Controlli:
+    - parole dentro la griglia (ad esempio dopo il rimappaggio di optimize_grid);
+    - lettere delle parole uguali a quelle della griglia (incroci in conflitto);
+    - nessuna lettera fuori dalle parole;
+    - nel tipo hidden, parola nascosta leggibile nella colonna chiave;
+    - nei tipi con posizionamento stretto, nessuna sequenza di lettere che non sia una parola.
+    """
+
+    ENCODING = 'iso-8859-1'
+    _RUN = re.compile(rb'[^_#]{2,}')
+    # Cifra binaria '1' per le celle con una lettera, '0' per le celle vuote e nere
+    _FILLED_TABLE = bytes(ord('0') if byte in b'_#' else ord('1') for byte in range(256))
+    _column_masks: Dict[Tuple[int, int], int] = {}
+
+    def __init__(self):
+        self._strict: Dict[str, bool] = {}
+
+    def is_strict(self, crossword_type: str) -> bool:
+        strict = self._strict.get(crossword_type)
+        if strict is None:
+            try:
+                generator_class = generator_registry.for_crossword_type(crossword_type)
+                strict = generator_class.strict_placement
+            except ValueError:
+                strict = False
+            self._strict[crossword_type] = strict
+        return strict
+
+    @classmethod
+    def column_mask(cls, cols: int, length: int) -> int:
+        """
+        Bitmask di length celle consecutive in colonna (bit i = cella i della griglia).
+        """
+        key = (cols, length)
+        mask = cls._column_masks.get(key)
+        if mask is None:
+            mask = cls._column_masks[key] = sum(1 << (i * cols) for i in range(length))
+        return mask
+
+    @classmethod
+    def flatten(cls, grid: List[List[str]]) -> Tuple[bytes, int, int]:
+        """
+        Griglia come stringa di byte riga per riga (righe corte completate con '_').
+        """
+        rows = len(grid)
+        cols = max((len(row) for row in grid), default=0)
+        flat = ''.join(''.join(row).ljust(cols, '_') for row in grid)
+        return flat.encode(cls.ENCODING, errors='replace'), rows, cols
+
+    @classmethod
+    def grid_runs(cls, flat: bytes, rows: int, cols: int) -> Set[Tuple[int, int, bool, int]]:
+        """
+        Sequenze di almeno due lettere: (riga, colonna, orizzontale, lunghezza).
+        """
+        runs = set()
+        for r in range(rows):
+            for match in cls._RUN.finditer(flat, r * cols, (r + 1) * cols):
+                runs.add((r, match.start() - r * cols, True, match.end() - match.start()))
+        for c in range(cols):
+            for match in cls._RUN.finditer(flat[c::cols]):
+                runs.add((match.start(), c, False, match.end() - match.start()))
+        return runs
+
+    def validate(self, puzzle) -> Dict[str, Any]:
+        """
+        Esito della verifica di un PuzzleResult: guid, valid, errori e statistiche.
+        """
+        flat, rows, cols = self.flatten(puzzle.grid)
+        errors: List[str] = []
+        if any(len(row) != cols for row in puzzle.grid):
+            errors.append("Grid rows have different lengths")
+
+        horizontal = vertical = 0
+        texts = Counter()
+        for number, word in enumerate(puzzle.words, 1):
+            text = word.text
+            length = len(text)
+            texts[text] += 1
+            x, y = word.x, word.y
+            end_x, end_y = (x + length, y + 1) if word.is_horizontal else (x + 1, y + length)
+            if x < 0 or y < 0 or end_x > cols or end_y > rows:
+                errors.append(f"Word {number} ({text}) at ({x}, {y}) is out of bounds")
+                continue
+
+            start = y * cols + x
+            if word.is_horizontal:
+                read = flat[start:start + length]
+                horizontal |= ((1 << length) - 1) << start
+            else:
+                read = flat[start:start + length * cols:cols]
+                vertical |= self.column_mask(cols, length) << start
+            if read != text.encode(self.ENCODING, errors='replace'):
+                errors.append(f"Word {number} ({text}) does not match the grid: "
+                              f"reads {read.decode(self.ENCODING)}")
+
+        for text, count in texts.items():
+            if count > 1:
+                errors.append(f"Word {text} is used {count} times")
+
+        if puzzle.hidden_word is not None:
+            # La parola nascosta conta come verticale per la copertura e per gli incroci
+            key_column = puzzle.key_column
+            column = b''
+            if key_column is not None and 0 <= key_column < cols:
+                column = flat[key_column::cols]
+            hidden = puzzle.hidden_word.encode(self.ENCODING, errors='replace')
+            row = column.find(hidden)
+            if row < 0:
+                errors.append(f"Hidden word {puzzle.hidden_word} does not read down "
+                              f"column {key_column}")
+            else:
+                vertical |= self.column_mask(cols, len(hidden)) << (row * cols + key_column)
+
+        digits = flat.translate(self._FILLED_TABLE)
+        filled = int(digits[::-1] or b'0', 2)
+        orphans = filled & ~(horizontal | vertical)
+        if orphans:
+            errors.append(f"{bin(orphans).count('1')} letters are not part of any word")
+
+        if self.is_strict(puzzle.crossword_type):
+            words = {(word.y, word.x, word.is_horizontal, len(word.text)) for word in puzzle.words}
+            extra = self.grid_runs(flat, rows, cols) - words
+            for r, c, is_horizontal, length in sorted(extra):
+                direction = 'horizontal' if is_horizontal else 'vertical'
+                errors.append(f"Letters at ({c}, {r}) form a {direction} sequence of "
+                              f"{length} that is not a placed word")
+
+        return {
+            'guid': puzzle.guid,
+            'crossword_type': puzzle.crossword_type,
+            'valid': not errors,
+            'errors': errors,
+            'stats': self._stats(puzzle, flat, rows, cols, digits, horizontal & vertical)
+        }
+
+    def _stats(self, puzzle, flat: bytes, rows: int, cols: int, digits: bytes,
+               crossings: int) -> Dict[str, Any]:
+        filled = digits.count(b'1')
+        lengths = Counter(len(word.text) for word in puzzle.words)
+        letters = Counter(flat.translate(None, b'_#').decode(self.ENCODING))
+        total_length = sum(length * count for length, count in lengths.items())
+        return {
+            'rows': rows,
+            'cols': cols,
+            'words': len(puzzle.words),
+            'filled_cells': filled,
+            'density': round(filled / (rows * cols), 4) if rows and cols else 0.0,
+            'crossings': bin(crossings).count('1'),
+            'average_length': (round(total_length / len(puzzle.words), 2)
+                               if puzzle.words else 0.0),
+            'length_histogram': {length: lengths[length] for length in sorted(lengths)},
+            'letters': {letter: letters[letter] for letter in sorted(letters)}
+        }
+
+    def validate_all(self, puzzles: Iterable) -> Iterator[Dict[str, Any]]:
+        """
+        Esiti di una sequenza di cruciverba (es. PuzzleLoader.iter_jsonl), uno alla volta.
+        """
+        for puzzle in puzzles:
+            yield self.validate(puzzle)
@@ -0,0 +1,95 @@
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set
+
+
+class UsageLedger:
+    """
+    Registro in memoria degli utilizzi delle parole in un batch di cruciverba generati
+    nello stesso processo (ad esempio un numero settimanale).
+    I contatori di clues_usage sono letti una sola volta con il lessico: il registro tiene
+    gli utilizzi del batch, condivisi da tutti i generatori a cui è assegnato.
+    Con window = K una parola usata in uno degli ultimi K cruciverba è esclusa: il registro
+    mantiene nell'indice del lessico una maschera di disponibilità per id (vedi
+    LexiconIndex.available), quindi la verifica di un candidato costa O(1). L'indice è
+    condiviso dal processo: a fine batch detach() rimuove la maschera.
+    """
+
+    def __init__(self, window: Optional[int] = None):
+        if window is not None and window < 1:
+            raise ValueError("Exclusion window must be at least 1 puzzle")
+        self.window = window
+        self.puzzles = 0
+        self.counts: Dict[str, int] = {}
+        # Soluzioni dei cruciverba nella finestra e in quanti di essi compare ogni soluzione
+        self._recent: Deque[Set[str]] = deque()
+        self._recent_counts: Dict[str, int] = {}
+        self._indexes: List = []
+
+    def attach(self, index) -> None:
+        """
+        Applica l'esclusione all'indice di un lessico (una volta per indice).
+        """
+        if self.window is None or any(attached is index for attached in self._indexes):
+            return
+        index.available = bytearray(b'\x01') * len(index.solutions)
+        self._indexes.append(index)
+        for solution in self._recent_counts:
+            self._set_available(index, solution, 0)
+
+    def detach(self) -> None:
+        """
+        Rimuove la maschera di esclusione dagli indici a cui è stata applicata.
+        """
+        for index in self._indexes:
+            index.available = None
+        self._indexes = []
+
+    @staticmethod
+    def _set_available(index, solution: str, value: int) -> None:
+        available = index.available
+        for word_id in index.ids_for_solution(solution):
+            available[word_id] = value
+
+    def usage(self, solution: str) -> int:
+        """
+        Utilizzi della soluzione nel batch.
+        """
+        return self.counts.get(solution, 0)
+
+    def is_excluded(self, solution: str) -> bool:
+        return solution in self._recent_counts
+
+    def record(self, solutions: Iterable[str]) -> None:
+        """
+        Registra le parole di un cruciverba generato e fa scorrere la finestra di esclusione.
+        """
+        solutions = set(solutions)
+        self.puzzles += 1
+        for solution in solutions:
+            self.counts[solution] = self.counts.get(solution, 0) + 1
+        if self.window is None:
+            return
+
+        self._recent.append(solutions)
+        for solution in solutions:
+            count = self._recent_counts.get(solution, 0)
+            self._recent_counts[solution] = count + 1
+            if not count:
+                for index in self._indexes:
+                    self._set_available(index, solution, 0)
+
+        while len(self._recent) > self.window:
+            for solution in self._recent.popleft():
+                count = self._recent_counts[solution] - 1
+                if count:
+                    self._recent_counts[solution] = count
+                    continue
+                del self._recent_counts[solution]
+                for index in self._indexes:
+                    self._set_available(index, solution, 1)
+
+    def repeated(self) -> Dict[str, int]:
+        """
+        Soluzioni usate in più di un cruciverba del batch, con il numero di utilizzi.
+        """
+        return {solution: count for solution, count in self.counts.items() if count > 1}
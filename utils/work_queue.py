@@ -0,0 +1,307 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import os
+import random
+import time
+from utils.db_utils import DatabaseUtils
+from utils.lexicon_utils import LexiconUtils
+
+
+class QueueError(Exception):
+    """Coda di lavoro assente, incompleta o già unita."""
+
+
+class WorkQueue:
+    """
+    Coda di lavoro su una directory condivisa (es. NFS) per distribuire un batch su più nodi.
+    Il coordinatore scrive i parametri del batch (queue.json), uno snapshot del lessico
+    (lexicon.jsonl, così i worker non interrogano il database) e gli shard, ciascuno con
+    i numeri e i seed dei suoi cruciverba: uno shard rigenerato da un altro worker produce
+    gli stessi cruciverba.
+    Un worker prende uno shard creando in modo esclusivo (O_EXCL) il suo file di lease e lo
+    rinnova aggiornandone l'mtime dopo ogni cruciverba; un lease non rinnovato da più di
+    lease_seconds è scaduto e viene riassegnato rinominandolo (la rinomina riesce a un solo
+    worker). I risultati di uno shard sono un JSONL di documenti get_json_data, uno per
+    worker, e un riepilogo con gli utilizzi delle parole che indica quel JSONL, scritti in
+    modo atomico solo se il worker ha ancora il lease: uno shard eseguito due volte viene
+    sovrascritto, non duplicato, e il riepilogo resta coerente con i suoi cruciverba.
+    merge() unisce i risultati in crosswords.jsonl e registra tutti gli utilizzi nel
+    database con una sola transazione.
+
+    Struttura della directory:
+        queue.json, lexicon.jsonl, crosswords.jsonl, merged.json
+        shards/<shard>.json, leases/<shard>.lease
+        results/<shard>.<worker>.jsonl, results/<shard>.json
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, data: Dict[str, Any]):
+        self.path = path
+        self.data = data
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.path, *parts)
+
+    @staticmethod
+    def _write_atomic(path: str, text: str) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_json(path: str) -> Any:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def create(cls, path: str, args: Dict[str, Any], word_list: List, count: int,
+               shard_size: int, lease_seconds: float, track_usage: bool,
+               seed: Optional[int] = None) -> 'WorkQueue':
+        """
+        Scrive una nuova coda per count cruciverba in shard da shard_size.
+        queue.json è scritto per ultimo: finché manca la coda non è pronta.
+        """
+        if os.path.exists(os.path.join(path, 'queue.json')):
+            raise QueueError(f"A work queue already exists in {path}")
+        for directory in ('shards', 'leases', 'results'):
+            os.makedirs(os.path.join(path, directory), exist_ok=True)
+
+        queue = cls(path, {
+            'version': cls.VERSION,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'args': args,
+            'count': count,
+            'lease_seconds': lease_seconds,
+            'track_usage': track_usage,
+            'shards': []
+        })
+        LexiconUtils.save_lexicon_file(word_list, queue.lexicon_path)
+
+        rng = random.Random(seed if seed is not None else random.SystemRandom().getrandbits(64))
+        for start in range(1, count + 1, shard_size):
+            shard_id = f"shard-{len(queue.shards) + 1:04d}"
+            numbers = list(range(start, min(start + shard_size, count + 1)))
+            cls._write_atomic(queue._path('shards', f"{shard_id}.json"), json.dumps({
+                'shard': shard_id,
+                'puzzles': [{'number': number, 'seed': rng.getrandbits(32)} for number in numbers]
+            }))
+            queue.shards.append(shard_id)
+
+        cls._write_atomic(queue._path('queue.json'), json.dumps(queue.data, ensure_ascii=False))
+        logging.info(f"Work queue with {len(queue.shards)} shards written to {path}")
+        return queue
+
+    @classmethod
+    def load(cls, path: str) -> 'WorkQueue':
+        try:
+            data = cls._read_json(os.path.join(path, 'queue.json'))
+        except (OSError, ValueError) as e:
+            raise QueueError(f"Cannot read work queue {path}: {str(e)}")
+        if not isinstance(data, dict) or data.get('version') != cls.VERSION:
+            raise QueueError(f"Unsupported work queue {path}")
+        return cls(path, data)
+
+    @property
+    def args(self) -> Dict[str, Any]:
+        return self.data['args']
+
+    @property
+    def shards(self) -> List[str]:
+        return self.data['shards']
+
+    @property
+    def lease_seconds(self) -> float:
+        return self.data['lease_seconds']
+
+    @property
+    def lexicon_path(self) -> str:
+        return self._path('lexicon.jsonl')
+
+    @property
+    def poll_interval(self) -> float:
+        """
+        Attesa tra due controlli di un worker senza shard liberi.
+        """
+        return max(0.5, min(5.0, self.lease_seconds / 10))
+
+    def load_shard(self, shard_id: str) -> Dict[str, Any]:
+        return self._read_json(self._path('shards', f"{shard_id}.json"))
+
+    def is_done(self, shard_id: str) -> bool:
+        return os.path.exists(self._path('results', f"{shard_id}.json"))
+
+    def _lease_path(self, shard_id: str) -> str:
+        return self._path('leases', f"{shard_id}.lease")
+
+    def _lease_age(self, shard_id: str) -> Optional[float]:
+        """
+        Secondi dall'ultimo rinnovo del lease, None se lo shard non è assegnato.
+        """
+        try:
+            return time.time() - os.stat(self._lease_path(shard_id)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _create_lease(self, shard_id: str, worker: str) -> bool:
+        try:
+            fd = os.open(self._lease_path(shard_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(worker)
+        return True
+
+    def claim(self, worker: str) -> Optional[str]:
+        """
+        Assegna al worker il primo shard non concluso e libero o con il lease scaduto.
+        Restituisce None se non ce ne sono.
+        """
+        for shard_id in self.shards:
+            if self.is_done(shard_id):
+                continue
+            if self._create_lease(shard_id, worker):
+                return shard_id
+
+            age = self._lease_age(shard_id)
+            if age is None or age <= self.lease_seconds:
+                continue
+            # Lease scaduto: solo il worker che riesce a rinominarlo lo riassegna
+            lease_path = self._lease_path(shard_id)
+            expired_path = f"{lease_path}.{worker}.expired"
+            try:
+                os.rename(lease_path, expired_path)
+            except FileNotFoundError:
+                continue
+            with open(expired_path, 'r', encoding='utf-8') as f:
+                previous = f.read()
+            os.remove(expired_path)
+            if self._create_lease(shard_id, worker):
+                logging.warning(f"Lease of {shard_id} held by {previous} expired "
+                                f"after {age:.0f}s: reassigned to {worker}")
+                return shard_id
+        return None
+
+    def renew(self, shard_id: str, worker: str) -> bool:
+        """
+        Rinnova il lease; False se lo shard è stato riassegnato a un altro worker.
+        """
+        lease_path = self._lease_path(shard_id)
+        try:
+            with open(lease_path, 'r', encoding='utf-8') as f:
+                if f.read() != worker:
+                    return False
+            os.utime(lease_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, shard_id: str, worker: str) -> None:
+        if self.renew(shard_id, worker):
+            os.remove(self._lease_path(shard_id))
+
+    def complete(self, shard_id: str, worker: str, documents: List[Dict],
+                 usage: Dict[int, int], failed: int) -> bool:
+        """
+        Scrive i risultati dello shard (prima i cruciverba, poi il riepilogo che lo segna
+        come concluso) e libera il lease. Restituisce False, senza segnare lo shard come
+        concluso, se il lease è stato riassegnato a un altro worker.
+        """
+        if not self.renew(shard_id, worker):
+            return False
+        results_name = f"{shard_id}.{worker}.jsonl"
+        results_path = self._path('results', results_name)
+        self._write_atomic(results_path, ''.join(
+            json.dumps(document, ensure_ascii=False) + '\n' for document in documents))
+        if not self.renew(shard_id, worker):
+            os.remove(results_path)
+            return False
+        self._write_atomic(self._path('results', f"{shard_id}.json"), json.dumps({
+            'shard': shard_id,
+            'worker': worker,
+            'results': results_name,
+            'completed': datetime.now().isoformat(timespec='seconds'),
+            'generated': len(documents),
+            'failed': failed,
+            'usage': {str(clue_id): count for clue_id, count in usage.items()}
+        }))
+        self.release(shard_id, worker)
+        return True
+
+    def status(self) -> Dict[str, int]:
+        done = leased = expired = 0
+        for shard_id in self.shards:
+            if self.is_done(shard_id):
+                done += 1
+                continue
+            age = self._lease_age(shard_id)
+            if age is not None:
+                if age > self.lease_seconds:
+                    expired += 1
+                else:
+                    leased += 1
+        return {
+            'shards': len(self.shards),
+            'done': done,
+            'leased': leased,
+            'expired': expired,
+            'pending': len(self.shards) - done - leased - expired
+        }
+
+    def merge(self, db_config: Optional[Dict]) -> Dict[str, Any]:
+        """
+        Unisce i risultati di tutti gli shard in crosswords.jsonl e registra gli utilizzi
+        delle parole in clues_usage in un solo passaggio. Una coda si unisce una sola volta.
+        """
+        if os.path.exists(self._path('merged.json')):
+            raise QueueError(f"Work queue {self.path} was already merged")
+        status = self.status()
+        if status['done'] < status['shards']:
+            raise QueueError(f"{status['shards'] - status['done']} of {status['shards']} "
+                             f"shards are not finished")
+
+        crosswords_path = os.path.abspath(self._path('crosswords.jsonl'))
+        usage: Dict[int, int] = {}
+        generated = failed = 0
+        tmp_path = f"{crosswords_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            for shard_id in self.shards:
+                summary = self._read_json(self._path('results', f"{shard_id}.json"))
+                generated += summary['generated']
+                failed += summary['failed']
+                for clue_id, count in summary['usage'].items():
+                    clue_id = int(clue_id)
+                    usage[clue_id] = usage.get(clue_id, 0) + count
+                with open(self._path('results', summary['results']), 'r',
+                          encoding='utf-8') as f:
+                    for line in f:
+                        out.write(line)
+        os.replace(tmp_path, crosswords_path)
+
+        recorded = False
+        if self.data['track_usage'] and usage:
+            # Una unione interrotta dopo il commit ha già impostato output_path su questa coda
+            paths = DatabaseUtils.get_usage_paths(db_config, list(usage))
+            if crosswords_path in paths.values():
+                logging.warning(f"Word usage of {self.path} was already recorded")
+            else:
+                DatabaseUtils.add_words_usage(db_config, usage, crosswords_path)
+                recorded = True
+
+        report = {
+            'generated': generated,
+            'failed': failed,
+            'distinct_words': len(usage),
+            'word_uses': sum(usage.values()),
+            'usage_recorded': recorded,
+            'crosswords': crosswords_path
+        }
+        self._write_atomic(self._path('merged.json'), json.dumps(
+            {**report, 'merged': datetime.now().isoformat(timespec='seconds')}))
+        return report
+